@@ -8,7 +8,7 @@ from alembic import context
 
 # Import models for autogenerate
 from app.db.database import Base
-from app.db.models import Component, ComponentTranslation, CompatibilityRule, BuildConfiguration
+from app.db.models import Component, ComponentScore, CompatibilityRule, BuildConfiguration
 from app.core.config import settings
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,84 @@
+"""Switch JSON columns to JSONB with GIN indexes
+
+Revision ID: 002_jsonb_specs
+Revises: 001_initial
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '002_jsonb_specs'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # JSONB stores a decoded binary form, so containment filters such as
+    # specs @> '{"ram_type": "DDR5"}' no longer re-parse every row
+    op.alter_column(
+        'components', 'specs',
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        postgresql_using='specs::jsonb'
+    )
+    op.alter_column(
+        'compatibility_rules', 'rule_logic',
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        postgresql_using='rule_logic::jsonb'
+    )
+    op.alter_column(
+        'build_configurations', 'components',
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        postgresql_using='components::jsonb'
+    )
+
+    # jsonb_path_ops indexes are smaller and only serve @>, which is all we need.
+    # CONCURRENTLY cannot run inside a transaction, so build them in autocommit
+    # mode to keep the scraper writing while the indexes are built.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_components_specs_gin', 'components', ['specs'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'specs': 'jsonb_path_ops'},
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_compatibility_rules_rule_logic_gin', 'compatibility_rules', ['rule_logic'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'rule_logic': 'jsonb_path_ops'},
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_compatibility_rules_rule_logic_gin',
+            table_name='compatibility_rules',
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_components_specs_gin',
+            table_name='components',
+            postgresql_concurrently=True
+        )
+    op.alter_column(
+        'build_configurations', 'components',
+        type_=postgresql.JSON(astext_type=sa.Text()),
+        postgresql_using='components::json'
+    )
+    op.alter_column(
+        'compatibility_rules', 'rule_logic',
+        type_=postgresql.JSON(astext_type=sa.Text()),
+        postgresql_using='rule_logic::json'
+    )
+    op.alter_column(
+        'components', 'specs',
+        type_=postgresql.JSON(astext_type=sa.Text()),
+        postgresql_using='specs::json'
+    )
@@ -0,0 +1,44 @@
+"""Composite indexes for the agent's component lookups
+
+Revision ID: 003_composite_indexes
+Revises: 002_jsonb_specs
+Create Date: 2024-02-01 00:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_composite_indexes'
+down_revision = '002_jsonb_specs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # get_parts always filters on type + stock and ranges over price
+        op.create_index(
+            'ix_components_type_stock_price', 'components',
+            ['component_type', 'in_stock', 'price_dzd'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_components_type_bench', 'components',
+            ['component_type', sa.text('benchmark_score DESC NULLS LAST')],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+        # Superseded by the composite indexes above
+        op.drop_index(op.f('ix_components_price_dzd'), table_name='components', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_components_in_stock'), table_name='components', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_components_in_stock'), 'components', ['in_stock'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_components_price_dzd'), 'components', ['price_dzd'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_components_type_bench', table_name='components', postgresql_concurrently=True)
+        op.drop_index('ix_components_type_stock_price', table_name='components', postgresql_concurrently=True)
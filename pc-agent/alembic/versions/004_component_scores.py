@@ -0,0 +1,60 @@
+"""Move use-case scores into a narrow component_scores table
+
+Revision ID: 004_component_scores
+Revises: 003_composite_indexes
+Create Date: 2024-02-05 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_component_scores'
+down_revision = '003_composite_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # benchmark_score stays on components: get_parts filters and sorts on it.
+    # The use-case scores are only read by rate_performance, which should not
+    # have to pull the whole wide component row to get three floats.
+    op.create_table(
+        'component_scores',
+        sa.Column('component_id', sa.Integer(), nullable=False),
+        sa.Column('gaming_score', sa.Float(), nullable=True),
+        sa.Column('productivity_score', sa.Float(), nullable=True),
+        sa.Column('ai_score', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['component_id'], ['components.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('component_id')
+    )
+
+    op.execute("""
+        INSERT INTO component_scores (component_id, gaming_score, productivity_score, ai_score)
+        SELECT id, gaming_score, productivity_score, ai_score
+        FROM components
+        WHERE gaming_score IS NOT NULL
+           OR productivity_score IS NOT NULL
+           OR ai_score IS NOT NULL
+    """)
+
+    op.drop_column('components', 'ai_score')
+    op.drop_column('components', 'productivity_score')
+    op.drop_column('components', 'gaming_score')
+
+
+def downgrade() -> None:
+    op.add_column('components', sa.Column('gaming_score', sa.Float(), nullable=True))
+    op.add_column('components', sa.Column('productivity_score', sa.Float(), nullable=True))
+    op.add_column('components', sa.Column('ai_score', sa.Float(), nullable=True))
+
+    op.execute("""
+        UPDATE components c
+        SET gaming_score = s.gaming_score,
+            productivity_score = s.productivity_score,
+            ai_score = s.ai_score
+        FROM component_scores s
+        WHERE s.component_id = c.id
+    """)
+
+    op.drop_table('component_scores')
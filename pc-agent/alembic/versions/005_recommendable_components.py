@@ -0,0 +1,38 @@
+"""Materialized view of recommendable components
+
+Revision ID: 005_recommendable_components
+Revises: 004_component_scores
+Create Date: 2024-02-10 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005_recommendable_components'
+down_revision = '004_component_scores'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Pre-filtered candidate set for get_parts; refreshed by the
+    # refresh_recommendable_components Celery task.
+    op.execute("""
+        CREATE MATERIALIZED VIEW recommendable_components AS
+        SELECT id, component_type, name, price_dzd, condition,
+               benchmark_score, specs, seller_location
+        FROM components
+        WHERE in_stock = TRUE
+          AND benchmark_score IS NOT NULL
+          AND price_dzd > 0
+    """)
+    # The unique index is required for REFRESH ... CONCURRENTLY
+    op.execute("CREATE UNIQUE INDEX ix_recommendable_components_id ON recommendable_components (id)")
+    op.execute(
+        "CREATE INDEX ix_recommendable_components_type_price "
+        "ON recommendable_components (component_type, price_dzd)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS recommendable_components")
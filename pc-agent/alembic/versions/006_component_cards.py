@@ -0,0 +1,123 @@
+"""Pre-rendered per-locale component cards
+
+Revision ID: 006_component_cards
+Revises: 005_recommendable_components
+Create Date: 2024-02-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_component_cards'
+down_revision = '005_recommendable_components'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('components', sa.Column('card_en', sa.Text(), nullable=True))
+    op.add_column('components', sa.Column('card_fr', sa.Text(), nullable=True))
+    op.add_column('components', sa.Column('card_ar', sa.Text(), nullable=True))
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION component_card(c components, card_locale text) RETURNS text AS $$
+            SELECT concat_ws(' | ',
+                '#' || c.id,
+                COALESCE(
+                    (SELECT t.name FROM component_translations t
+                     WHERE t.component_id = c.id AND t.locale = card_locale AND t.name IS NOT NULL
+                     LIMIT 1),
+                    c.name
+                ),
+                c.manufacturer,
+                round(c.price_dzd::numeric) || ' DZD',
+                lower(c.condition::text),
+                'score ' || c.benchmark_score,
+                c.seller_location,
+                (SELECT string_agg(key || ': ' || value, ', ') FROM jsonb_each_text(c.specs))
+            )
+        $$ LANGUAGE sql STABLE
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION components_set_cards() RETURNS trigger AS $$
+        BEGIN
+            NEW.card_en := component_card(NEW, 'en');
+            NEW.card_fr := component_card(NEW, 'fr');
+            NEW.card_ar := component_card(NEW, 'ar');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER components_set_cards
+            BEFORE INSERT OR UPDATE OF name, manufacturer, price_dzd, condition, benchmark_score, specs
+            ON components
+            FOR EACH ROW EXECUTE FUNCTION components_set_cards()
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION component_translations_touch_card() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                UPDATE components SET name = name WHERE id = OLD.component_id;
+            ELSE
+                UPDATE components SET name = name WHERE id = NEW.component_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER component_translations_touch_card
+            AFTER INSERT OR UPDATE OR DELETE ON component_translations
+            FOR EACH ROW EXECUTE FUNCTION component_translations_touch_card()
+    """)
+
+    # Backfill: touching name fires components_set_cards for every row
+    op.execute("UPDATE components SET name = name")
+
+    # Expose the cards through the recommendable components view
+    op.execute("DROP MATERIALIZED VIEW recommendable_components")
+    op.execute("""
+        CREATE MATERIALIZED VIEW recommendable_components AS
+        SELECT id, component_type, name, price_dzd, condition,
+               benchmark_score, specs, seller_location,
+               card_en, card_fr, card_ar
+        FROM components
+        WHERE in_stock = TRUE
+          AND benchmark_score IS NOT NULL
+          AND price_dzd > 0
+    """)
+    op.execute("CREATE UNIQUE INDEX ix_recommendable_components_id ON recommendable_components (id)")
+    op.execute(
+        "CREATE INDEX ix_recommendable_components_type_price "
+        "ON recommendable_components (component_type, price_dzd)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW recommendable_components")
+    op.execute("""
+        CREATE MATERIALIZED VIEW recommendable_components AS
+        SELECT id, component_type, name, price_dzd, condition,
+               benchmark_score, specs, seller_location
+        FROM components
+        WHERE in_stock = TRUE
+          AND benchmark_score IS NOT NULL
+          AND price_dzd > 0
+    """)
+    op.execute("CREATE UNIQUE INDEX ix_recommendable_components_id ON recommendable_components (id)")
+    op.execute(
+        "CREATE INDEX ix_recommendable_components_type_price "
+        "ON recommendable_components (component_type, price_dzd)"
+    )
+
+    op.execute("DROP TRIGGER IF EXISTS component_translations_touch_card ON component_translations")
+    op.execute("DROP FUNCTION IF EXISTS component_translations_touch_card()")
+    op.execute("DROP TRIGGER IF EXISTS components_set_cards ON components")
+    op.execute("DROP FUNCTION IF EXISTS components_set_cards()")
+    op.execute("DROP FUNCTION IF EXISTS component_card(components, text)")
+
+    op.drop_column('components', 'card_ar')
+    op.drop_column('components', 'card_fr')
+    op.drop_column('components', 'card_en')
@@ -0,0 +1,44 @@
+"""Single-query candidate lookup for the agent
+
+Revision ID: 007_recommend_candidates
+Revises: 006_component_cards
+Create Date: 2024-02-15 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '007_recommend_candidates'
+down_revision = '006_component_cards'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Builds the per-type candidate JSON in Postgres so the agent needs one
+    # round trip instead of one get_parts call per component type
+    op.execute("""
+        CREATE OR REPLACE FUNCTION recommend_candidates(price_caps jsonb, card_locale text, per_type int)
+        RETURNS json AS $$
+            SELECT json_object_agg(caps.key, (
+                SELECT COALESCE(json_agg(c.card), '[]'::json)
+                FROM (
+                    SELECT CASE card_locale
+                               WHEN 'fr' THEN r.card_fr
+                               WHEN 'ar' THEN r.card_ar
+                               ELSE r.card_en
+                           END AS card
+                    FROM recommendable_components r
+                    WHERE r.component_type = upper(caps.key)::componenttype
+                      AND r.price_dzd <= caps.value::float8
+                    ORDER BY r.benchmark_score / r.price_dzd DESC
+                    LIMIT per_type
+                ) c
+            ))
+            FROM jsonb_each_text(price_caps) AS caps
+        $$ LANGUAGE sql STABLE
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS recommend_candidates(jsonb, text, int)")
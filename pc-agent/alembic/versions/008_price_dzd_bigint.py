@@ -0,0 +1,56 @@
+"""Store price_dzd as whole dinars in a BIGINT
+
+Revision ID: 008_price_dzd_bigint
+Revises: 007_recommend_candidates
+Create Date: 2024-02-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_price_dzd_bigint'
+down_revision = '007_recommend_candidates'
+branch_labels = None
+depends_on = None
+
+
+def _create_recommendable_components() -> None:
+    op.execute("""
+        CREATE MATERIALIZED VIEW recommendable_components AS
+        SELECT id, component_type, name, price_dzd, condition,
+               benchmark_score, specs, seller_location,
+               card_en, card_fr, card_ar
+        FROM components
+        WHERE in_stock = TRUE
+          AND benchmark_score IS NOT NULL
+          AND price_dzd > 0
+    """)
+    op.execute("CREATE UNIQUE INDEX ix_recommendable_components_id ON recommendable_components (id)")
+    op.execute(
+        "CREATE INDEX ix_recommendable_components_type_price "
+        "ON recommendable_components (component_type, price_dzd)"
+    )
+
+
+def upgrade() -> None:
+    # The view depends on price_dzd, so it has to be rebuilt around the type change
+    op.execute("DROP MATERIALIZED VIEW recommendable_components")
+    op.alter_column(
+        'components', 'price_dzd',
+        type_=sa.BigInteger(),
+        existing_nullable=False,
+        postgresql_using='round(price_dzd)::bigint'
+    )
+    _create_recommendable_components()
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW recommendable_components")
+    op.alter_column(
+        'components', 'price_dzd',
+        type_=sa.Float(),
+        existing_nullable=False,
+        postgresql_using='price_dzd::double precision'
+    )
+    _create_recommendable_components()
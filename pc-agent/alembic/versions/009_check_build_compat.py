@@ -0,0 +1,94 @@
+"""Rule-driven compatibility check in the database
+
+Revision ID: 009_check_build_compat
+Revises: 008_price_dzd_bigint
+Create Date: 2024-02-22 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009_check_build_compat'
+down_revision = '008_price_dzd_bigint'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Evaluates compatibility_rules.rule_logic against the selected components
+    # so check_compatibility needs a single round trip
+    op.execute("""
+        CREATE OR REPLACE FUNCTION check_build_compat(component_ids int[]) RETURNS json AS $$
+            WITH build AS (
+                SELECT c.component_type, c.tdp_watts, c.specs, to_jsonb(c) AS doc
+                FROM components c
+                WHERE c.id = ANY(component_ids)
+            ),
+            rules AS (
+                SELECT * FROM compatibility_rules WHERE is_active
+            ),
+            field_issues AS (
+                -- equals: both fields must match; compatible: field_2 must contain field_1
+                SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                       COALESCE(r.rule_logic->>'severity', 'critical') AS severity,
+                       format('%s (%s vs %s)', r.description, v.value_1, v.value_2) AS description
+                FROM rules r
+                JOIN build a ON a.component_type = r.component_type_1
+                JOIN build b ON b.component_type = r.component_type_2
+                CROSS JOIN LATERAL (
+                    SELECT a.doc->>(r.rule_logic->>'field_1') AS value_1,
+                           b.doc->>(r.rule_logic->>'field_2') AS value_2
+                ) v
+                WHERE r.rule_logic->>'operator' IN ('equals', 'compatible')
+                  AND v.value_1 IS NOT NULL
+                  AND v.value_2 IS NOT NULL
+                  AND CASE r.rule_logic->>'operator'
+                          WHEN 'equals' THEN v.value_1 <> v.value_2
+                          ELSE strpos(v.value_2, v.value_1) = 0
+                      END
+            ),
+            power AS (
+                SELECT count(*) AS found,
+                       COALESCE(sum(tdp_watts), 0) AS total_tdp,
+                       COALESCE(sum(tdp_watts) FILTER (WHERE component_type <> 'PSU'), 0) AS system_tdp,
+                       bool_or(component_type = 'PSU') AS has_psu,
+                       COALESCE(max((specs->>'wattage')::numeric) FILTER (WHERE component_type = 'PSU'), 0) AS psu_wattage
+                FROM build
+            ),
+            power_issues AS (
+                -- greater_than: PSU wattage must exceed the rest of the build's TDP times the multiplier
+                SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                       COALESCE(r.rule_logic->>'severity', 'warning') AS severity,
+                       format(
+                           'PSU %sW may be insufficient. Recommended: %sW',
+                           p.psu_wattage,
+                           round(p.system_tdp * (r.rule_logic->>'multiplier')::numeric)
+                       ) AS description
+                FROM rules r
+                CROSS JOIN power p
+                WHERE r.rule_logic->>'operator' = 'greater_than'
+                  AND p.has_psu
+                  AND p.psu_wattage < p.system_tdp * (r.rule_logic->>'multiplier')::numeric
+            ),
+            issues AS (
+                SELECT * FROM field_issues
+                UNION ALL
+                SELECT * FROM power_issues
+            )
+            SELECT json_build_object(
+                'found', p.found,
+                'compatible', NOT EXISTS (SELECT 1 FROM issues WHERE severity = 'critical'),
+                'issues', COALESCE(
+                    (SELECT json_agg(json_build_object('severity', severity, 'type', type, 'description', description))
+                     FROM issues),
+                    '[]'::json
+                ),
+                'total_tdp_watts', p.total_tdp
+            )
+            FROM power p
+        $$ LANGUAGE sql STABLE
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP FUNCTION IF EXISTS check_build_compat(int[])")
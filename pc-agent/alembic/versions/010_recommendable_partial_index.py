@@ -0,0 +1,34 @@
+"""Partial index over recommendable components
+
+Revision ID: 010_recommendable_partial_index
+Revises: 009_check_build_compat
+Create Date: 2024-02-25 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_recommendable_partial_index'
+down_revision = '009_check_build_compat'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Same predicate as the recommendable_components view, so the view
+    # refresh and any live-table lookups only touch qualifying rows
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_components_recommendable', 'components',
+            ['component_type', 'price_dzd'],
+            unique=False,
+            postgresql_include=['benchmark_score'],
+            postgresql_where=sa.text('in_stock = TRUE AND benchmark_score IS NOT NULL AND price_dzd > 0'),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_components_recommendable', table_name='components', postgresql_concurrently=True)
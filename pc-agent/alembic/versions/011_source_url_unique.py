@@ -0,0 +1,42 @@
+"""Unique source_url for scraper upserts
+
+Revision ID: 011_source_url_unique
+Revises: 010_recommendable_partial_index
+Create Date: 2024-02-26 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_source_url_unique'
+down_revision = '010_recommendable_partial_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Older scrapes matched on name and price, so a listing may exist more
+    # than once. Keep the newest row as the listing's owner.
+    op.execute("""
+        UPDATE components AS older
+        SET source_url = NULL
+        FROM components AS newer
+        WHERE older.source_url = newer.source_url
+          AND older.id < newer.id
+    """)
+    
+    # Arbiter index for INSERT ... ON CONFLICT (source_url) in the scraper
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_components_source_url', 'components',
+            ['source_url'],
+            unique=True,
+            postgresql_where=sa.text('source_url IS NOT NULL'),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ux_components_source_url', table_name='components', postgresql_concurrently=True)
@@ -0,0 +1,214 @@
+"""Compatibility rule component types as an enum array
+
+Revision ID: 012_compat_rule_type_array
+Revises: 011_source_url_unique
+Create Date: 2024-02-27 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '012_compat_rule_type_array'
+down_revision = '011_source_url_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'compatibility_rules',
+        sa.Column('component_types', postgresql.ARRAY(postgresql.ENUM(name='componenttype', create_type=False)), nullable=True)
+    )
+    op.execute("UPDATE compatibility_rules SET component_types = ARRAY[component_type_1, component_type_2]")
+    op.alter_column('compatibility_rules', 'component_types', nullable=False)
+    op.create_check_constraint(
+        'ck_compatibility_rules_type_pair', 'compatibility_rules',
+        'cardinality(component_types) = 2'
+    )
+    
+    # Rules now join on component_types[1] / component_types[2]
+    op.execute("""
+        CREATE OR REPLACE FUNCTION check_build_compat(component_ids int[]) RETURNS json AS $$
+            WITH build AS (
+                SELECT c.component_type, c.tdp_watts, c.specs, to_jsonb(c) AS doc
+                FROM components c
+                WHERE c.id = ANY(component_ids)
+            ),
+            rules AS (
+                SELECT * FROM compatibility_rules WHERE is_active
+            ),
+            field_rules AS (
+                -- Pairwise rules apply only when both of their types are in the build
+                SELECT * FROM rules
+                WHERE component_types <@ ARRAY(SELECT DISTINCT component_type FROM build)
+            ),
+            field_issues AS (
+                -- equals: both fields must match; compatible: field_2 must contain field_1
+                SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                       COALESCE(r.rule_logic->>'severity', 'critical') AS severity,
+                       format('%s (%s vs %s)', r.description, v.value_1, v.value_2) AS description
+                FROM field_rules r
+                JOIN build a ON a.component_type = r.component_types[1]
+                JOIN build b ON b.component_type = r.component_types[2]
+                CROSS JOIN LATERAL (
+                    SELECT a.doc->>(r.rule_logic->>'field_1') AS value_1,
+                           b.doc->>(r.rule_logic->>'field_2') AS value_2
+                ) v
+                WHERE r.rule_logic->>'operator' IN ('equals', 'compatible')
+                  AND v.value_1 IS NOT NULL
+                  AND v.value_2 IS NOT NULL
+                  AND CASE r.rule_logic->>'operator'
+                          WHEN 'equals' THEN v.value_1 <> v.value_2
+                          ELSE strpos(v.value_2, v.value_1) = 0
+                      END
+            ),
+            power AS (
+                SELECT count(*) AS found,
+                       COALESCE(sum(tdp_watts), 0) AS total_tdp,
+                       COALESCE(sum(tdp_watts) FILTER (WHERE component_type <> 'PSU'), 0) AS system_tdp,
+                       bool_or(component_type = 'PSU') AS has_psu,
+                       COALESCE(max((specs->>'wattage')::numeric) FILTER (WHERE component_type = 'PSU'), 0) AS psu_wattage
+                FROM build
+            ),
+            power_issues AS (
+                -- greater_than: PSU wattage must exceed the rest of the build's TDP times the multiplier
+                SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                       COALESCE(r.rule_logic->>'severity', 'warning') AS severity,
+                       format(
+                           'PSU %sW may be insufficient. Recommended: %sW',
+                           p.psu_wattage,
+                           round(p.system_tdp * (r.rule_logic->>'multiplier')::numeric)
+                       ) AS description
+                FROM rules r
+                CROSS JOIN power p
+                WHERE r.rule_logic->>'operator' = 'greater_than'
+                  AND p.has_psu
+                  AND p.psu_wattage < p.system_tdp * (r.rule_logic->>'multiplier')::numeric
+            ),
+            issues AS (
+                SELECT * FROM field_issues
+                UNION ALL
+                SELECT * FROM power_issues
+            )
+            SELECT json_build_object(
+                'found', p.found,
+                'compatible', NOT EXISTS (SELECT 1 FROM issues WHERE severity = 'critical'),
+                'issues', COALESCE(
+                    (SELECT json_agg(json_build_object('severity', severity, 'type', type, 'description', description))
+                     FROM issues),
+                    '[]'::json
+                ),
+                'total_tdp_watts', p.total_tdp
+            )
+            FROM power p
+        $$ LANGUAGE sql STABLE
+    """)
+    
+    op.drop_column('compatibility_rules', 'component_type_2')
+    op.drop_column('compatibility_rules', 'component_type_1')
+    
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_compatibility_rules_component_types_gin', 'compatibility_rules',
+            ['component_types'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_compatibility_rules_component_types_gin',
+            table_name='compatibility_rules',
+            postgresql_concurrently=True
+        )
+    
+    componenttype = postgresql.ENUM(name='componenttype', create_type=False)
+    op.add_column('compatibility_rules', sa.Column('component_type_1', componenttype, nullable=True))
+    op.add_column('compatibility_rules', sa.Column('component_type_2', componenttype, nullable=True))
+    op.execute("""
+        UPDATE compatibility_rules
+        SET component_type_1 = component_types[1],
+            component_type_2 = component_types[2]
+    """)
+    op.alter_column('compatibility_rules', 'component_type_1', nullable=False)
+    op.alter_column('compatibility_rules', 'component_type_2', nullable=False)
+    
+    op.execute("""
+        CREATE OR REPLACE FUNCTION check_build_compat(component_ids int[]) RETURNS json AS $$
+            WITH build AS (
+                SELECT c.component_type, c.tdp_watts, c.specs, to_jsonb(c) AS doc
+                FROM components c
+                WHERE c.id = ANY(component_ids)
+            ),
+            rules AS (
+                SELECT * FROM compatibility_rules WHERE is_active
+            ),
+            field_issues AS (
+                -- equals: both fields must match; compatible: field_2 must contain field_1
+                SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                       COALESCE(r.rule_logic->>'severity', 'critical') AS severity,
+                       format('%s (%s vs %s)', r.description, v.value_1, v.value_2) AS description
+                FROM rules r
+                JOIN build a ON a.component_type = r.component_type_1
+                JOIN build b ON b.component_type = r.component_type_2
+                CROSS JOIN LATERAL (
+                    SELECT a.doc->>(r.rule_logic->>'field_1') AS value_1,
+                           b.doc->>(r.rule_logic->>'field_2') AS value_2
+                ) v
+                WHERE r.rule_logic->>'operator' IN ('equals', 'compatible')
+                  AND v.value_1 IS NOT NULL
+                  AND v.value_2 IS NOT NULL
+                  AND CASE r.rule_logic->>'operator'
+                          WHEN 'equals' THEN v.value_1 <> v.value_2
+                          ELSE strpos(v.value_2, v.value_1) = 0
+                      END
+            ),
+            power AS (
+                SELECT count(*) AS found,
+                       COALESCE(sum(tdp_watts), 0) AS total_tdp,
+                       COALESCE(sum(tdp_watts) FILTER (WHERE component_type <> 'PSU'), 0) AS system_tdp,
+                       bool_or(component_type = 'PSU') AS has_psu,
+                       COALESCE(max((specs->>'wattage')::numeric) FILTER (WHERE component_type = 'PSU'), 0) AS psu_wattage
+                FROM build
+            ),
+            power_issues AS (
+                -- greater_than: PSU wattage must exceed the rest of the build's TDP times the multiplier
+                SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                       COALESCE(r.rule_logic->>'severity', 'warning') AS severity,
+                       format(
+                           'PSU %sW may be insufficient. Recommended: %sW',
+                           p.psu_wattage,
+                           round(p.system_tdp * (r.rule_logic->>'multiplier')::numeric)
+                       ) AS description
+                FROM rules r
+                CROSS JOIN power p
+                WHERE r.rule_logic->>'operator' = 'greater_than'
+                  AND p.has_psu
+                  AND p.psu_wattage < p.system_tdp * (r.rule_logic->>'multiplier')::numeric
+            ),
+            issues AS (
+                SELECT * FROM field_issues
+                UNION ALL
+                SELECT * FROM power_issues
+            )
+            SELECT json_build_object(
+                'found', p.found,
+                'compatible', NOT EXISTS (SELECT 1 FROM issues WHERE severity = 'critical'),
+                'issues', COALESCE(
+                    (SELECT json_agg(json_build_object('severity', severity, 'type', type, 'description', description))
+                     FROM issues),
+                    '[]'::json
+                ),
+                'total_tdp_watts', p.total_tdp
+            )
+            FROM power p
+        $$ LANGUAGE sql STABLE
+    """)
+    
+    op.drop_constraint('ck_compatibility_rules_type_pair', 'compatibility_rules', type_='check')
+    op.drop_column('compatibility_rules', 'component_types')
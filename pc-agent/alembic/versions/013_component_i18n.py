@@ -0,0 +1,113 @@
+"""Inline component translations into components.i18n
+
+Revision ID: 013_component_i18n
+Revises: 012_compat_rule_type_array
+Create Date: 2024-02-28 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '013_component_i18n'
+down_revision = '012_compat_rule_type_array'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('components', sa.Column('i18n', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    
+    # Cards read the localized name from the row itself instead of a subquery
+    op.execute("""
+        CREATE OR REPLACE FUNCTION component_card(c components, card_locale text) RETURNS text AS $$
+            SELECT concat_ws(' | ',
+                '#' || c.id,
+                COALESCE(c.i18n -> card_locale ->> 'name', c.name),
+                c.manufacturer,
+                c.price_dzd || ' DZD',
+                lower(c.condition::text),
+                'score ' || c.benchmark_score,
+                c.seller_location,
+                (SELECT string_agg(key || ': ' || value, ', ') FROM jsonb_each_text(c.specs))
+            )
+        $$ LANGUAGE sql STABLE
+    """)
+    op.execute("DROP TRIGGER IF EXISTS components_set_cards ON components")
+    op.execute("""
+        CREATE TRIGGER components_set_cards
+            BEFORE INSERT OR UPDATE OF name, manufacturer, price_dzd, condition, benchmark_score, specs, i18n
+            ON components
+            FOR EACH ROW EXECUTE FUNCTION components_set_cards()
+    """)
+    op.execute("DROP TRIGGER IF EXISTS component_translations_touch_card ON component_translations")
+    op.execute("DROP FUNCTION IF EXISTS component_translations_touch_card()")
+    
+    # Backfill; setting i18n also re-renders the cards through the trigger
+    op.execute("""
+        UPDATE components c
+        SET i18n = t.i18n
+        FROM (
+            SELECT component_id,
+                   jsonb_object_agg(locale, jsonb_strip_nulls(jsonb_build_object(
+                       'name', name,
+                       'description', description,
+                       'features', features
+                   ))) AS i18n
+            FROM component_translations
+            GROUP BY component_id
+        ) t
+        WHERE t.component_id = c.id
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION component_card(c components, card_locale text) RETURNS text AS $$
+            SELECT concat_ws(' | ',
+                '#' || c.id,
+                COALESCE(
+                    (SELECT t.name FROM component_translations t
+                     WHERE t.component_id = c.id AND t.locale = card_locale AND t.name IS NOT NULL
+                     LIMIT 1),
+                    c.name
+                ),
+                c.manufacturer,
+                c.price_dzd || ' DZD',
+                lower(c.condition::text),
+                'score ' || c.benchmark_score,
+                c.seller_location,
+                (SELECT string_agg(key || ': ' || value, ', ') FROM jsonb_each_text(c.specs))
+            )
+        $$ LANGUAGE sql STABLE
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION component_translations_touch_card() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                UPDATE components SET name = name WHERE id = OLD.component_id;
+            ELSE
+                UPDATE components SET name = name WHERE id = NEW.component_id;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER component_translations_touch_card
+            AFTER INSERT OR UPDATE OR DELETE ON component_translations
+            FOR EACH ROW EXECUTE FUNCTION component_translations_touch_card()
+    """)
+    op.execute("DROP TRIGGER IF EXISTS components_set_cards ON components")
+    op.execute("""
+        CREATE TRIGGER components_set_cards
+            BEFORE INSERT OR UPDATE OF name, manufacturer, price_dzd, condition, benchmark_score, specs
+            ON components
+            FOR EACH ROW EXECUTE FUNCTION components_set_cards()
+    """)
+    
+    op.drop_column('components', 'i18n')
+    
+    # Re-render cards from component_translations
+    op.execute("UPDATE components SET name = name")
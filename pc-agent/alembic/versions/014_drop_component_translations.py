@@ -0,0 +1,44 @@
+"""Drop component_translations
+
+Revision ID: 014_drop_component_translations
+Revises: 013_component_i18n
+Create Date: 2024-02-29 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014_drop_component_translations'
+down_revision = '013_component_i18n'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Translations live in components.i18n since 013
+    op.drop_index('ix_component_translations_locale', table_name='component_translations')
+    op.drop_table('component_translations')
+
+
+def downgrade() -> None:
+    op.create_table(
+        'component_translations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('component_id', sa.Integer(), nullable=False),
+        sa.Column('locale', sa.String(length=5), nullable=False),
+        sa.Column('name', sa.String(length=500), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('features', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['component_id'], ['components.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_component_translations_locale', 'component_translations', ['locale'], unique=False)
+    
+    op.execute("""
+        INSERT INTO component_translations (component_id, locale, name, description, features)
+        SELECT c.id, t.key, t.value ->> 'name', t.value ->> 'description', t.value ->> 'features'
+        FROM components c
+        CROSS JOIN LATERAL jsonb_each(c.i18n) t
+        WHERE c.i18n IS NOT NULL
+    """)
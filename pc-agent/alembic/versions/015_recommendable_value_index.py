@@ -0,0 +1,29 @@
+"""Value-ordered index on recommendable_components
+
+Revision ID: 015_recommendable_value_index
+Revises: 014_drop_component_translations
+Create Date: 2024-03-01 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '015_recommendable_value_index'
+down_revision = '014_drop_component_translations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # get_parts and recommend_candidates filter on component_type and take the
+    # top rows by score per DZD; this serves that order without a sort
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recommendable_components_type_value
+            ON recommendable_components (component_type, (benchmark_score / price_dzd) DESC)
+        """)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_recommendable_components_type_value")
@@ -0,0 +1,82 @@
+"""Stored value_ratio column for score-per-DZD ordering
+
+Revision ID: 016_value_ratio
+Revises: 015_recommendable_value_index
+Create Date: 2024-03-02 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '016_value_ratio'
+down_revision = '015_recommendable_value_index'
+branch_labels = None
+depends_on = None
+
+
+def _create_recommendable_components(value_ratio: bool) -> None:
+    op.execute(f"""
+        CREATE MATERIALIZED VIEW recommendable_components AS
+        SELECT id, component_type, name, price_dzd, condition,
+               benchmark_score, {'value_ratio, ' if value_ratio else ''}specs, seller_location,
+               card_en, card_fr, card_ar
+        FROM components
+        WHERE in_stock = TRUE
+          AND benchmark_score IS NOT NULL
+          AND price_dzd > 0
+    """)
+    op.execute("CREATE UNIQUE INDEX ix_recommendable_components_id ON recommendable_components (id)")
+    op.execute(
+        "CREATE INDEX ix_recommendable_components_type_price "
+        "ON recommendable_components (component_type, price_dzd)"
+    )
+    order_key = "value_ratio" if value_ratio else "(benchmark_score / price_dzd)"
+    op.execute(
+        "CREATE INDEX ix_recommendable_components_type_value "
+        f"ON recommendable_components (component_type, {order_key} DESC)"
+    )
+
+
+def _create_recommend_candidates(order_by: str) -> None:
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION recommend_candidates(price_caps jsonb, card_locale text, per_type int)
+        RETURNS json AS $$
+            SELECT json_object_agg(caps.key, (
+                SELECT COALESCE(json_agg(c.card), '[]'::json)
+                FROM (
+                    SELECT CASE card_locale
+                               WHEN 'fr' THEN r.card_fr
+                               WHEN 'ar' THEN r.card_ar
+                               ELSE r.card_en
+                           END AS card
+                    FROM recommendable_components r
+                    WHERE r.component_type = upper(caps.key)::componenttype
+                      AND r.price_dzd <= caps.value::float8
+                    ORDER BY {order_by} DESC
+                    LIMIT per_type
+                ) c
+            ))
+            FROM jsonb_each_text(price_caps) AS caps
+        $$ LANGUAGE sql STABLE
+    """)
+
+
+def upgrade() -> None:
+    op.add_column(
+        'components',
+        sa.Column('value_ratio', sa.Float(), sa.Computed('benchmark_score / NULLIF(price_dzd, 0)', persisted=True))
+    )
+    
+    # Rebuild the view so it carries the stored ratio
+    op.execute("DROP MATERIALIZED VIEW recommendable_components")
+    _create_recommendable_components(value_ratio=True)
+    _create_recommend_candidates("r.value_ratio")
+
+
+def downgrade() -> None:
+    op.execute("DROP MATERIALIZED VIEW recommendable_components")
+    _create_recommendable_components(value_ratio=False)
+    _create_recommend_candidates("r.benchmark_score / r.price_dzd")
+    
+    op.drop_column('components', 'value_ratio')
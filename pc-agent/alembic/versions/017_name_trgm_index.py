@@ -0,0 +1,34 @@
+"""Trigram index for component name search
+
+Revision ID: 017_name_trgm_index
+Revises: 016_value_ratio
+Create Date: 2024-03-03 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '017_name_trgm_index'
+down_revision = '016_value_ratio'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    
+    # Lets list_components' name ILIKE '%term%' use an index instead of a seq scan
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_components_name_trgm', 'components',
+            ['name'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_components_name_trgm', table_name='components', postgresql_concurrently=True)
@@ -0,0 +1,127 @@
+"""Generated wattage and capacity columns from specs
+
+Revision ID: 018_spec_columns
+Revises: 017_name_trgm_index
+Create Date: 2024-03-04 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '018_spec_columns'
+down_revision = '017_name_trgm_index'
+branch_labels = None
+depends_on = None
+
+# Integer value of a numeric specs field; non-numeric values become NULL
+SPEC_INT_SQL = "CASE WHEN jsonb_typeof(specs->'{field}') = 'number' THEN (specs->>'{field}')::numeric::integer END"
+
+
+def _create_check_build_compat(wattage: str) -> None:
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION check_build_compat(component_ids int[]) RETURNS json AS $$
+            WITH build AS (
+                SELECT c.component_type, c.tdp_watts, {wattage} AS wattage, to_jsonb(c) AS doc
+                FROM components c
+                WHERE c.id = ANY(component_ids)
+            ),
+            rules AS (
+                SELECT * FROM compatibility_rules WHERE is_active
+            ),
+            field_rules AS (
+                -- Pairwise rules apply only when both of their types are in the build
+                SELECT * FROM rules
+                WHERE component_types <@ ARRAY(SELECT DISTINCT component_type FROM build)
+            ),
+            field_issues AS (
+                -- equals: both fields must match; compatible: field_2 must contain field_1
+                SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                       COALESCE(r.rule_logic->>'severity', 'critical') AS severity,
+                       format('%s (%s vs %s)', r.description, v.value_1, v.value_2) AS description
+                FROM field_rules r
+                JOIN build a ON a.component_type = r.component_types[1]
+                JOIN build b ON b.component_type = r.component_types[2]
+                CROSS JOIN LATERAL (
+                    SELECT a.doc->>(r.rule_logic->>'field_1') AS value_1,
+                           b.doc->>(r.rule_logic->>'field_2') AS value_2
+                ) v
+                WHERE r.rule_logic->>'operator' IN ('equals', 'compatible')
+                  AND v.value_1 IS NOT NULL
+                  AND v.value_2 IS NOT NULL
+                  AND CASE r.rule_logic->>'operator'
+                          WHEN 'equals' THEN v.value_1 <> v.value_2
+                          ELSE strpos(v.value_2, v.value_1) = 0
+                      END
+            ),
+            power AS (
+                SELECT count(*) AS found,
+                       COALESCE(sum(tdp_watts), 0) AS total_tdp,
+                       COALESCE(sum(tdp_watts) FILTER (WHERE component_type <> 'PSU'), 0) AS system_tdp,
+                       bool_or(component_type = 'PSU') AS has_psu,
+                       COALESCE(max(wattage) FILTER (WHERE component_type = 'PSU'), 0) AS psu_wattage
+                FROM build
+            ),
+            power_issues AS (
+                -- greater_than: PSU wattage must exceed the rest of the build's TDP times the multiplier
+                SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                       COALESCE(r.rule_logic->>'severity', 'warning') AS severity,
+                       format(
+                           'PSU %sW may be insufficient. Recommended: %sW',
+                           p.psu_wattage,
+                           round(p.system_tdp * (r.rule_logic->>'multiplier')::numeric)
+                       ) AS description
+                FROM rules r
+                CROSS JOIN power p
+                WHERE r.rule_logic->>'operator' = 'greater_than'
+                  AND p.has_psu
+                  AND p.psu_wattage < p.system_tdp * (r.rule_logic->>'multiplier')::numeric
+            ),
+            issues AS (
+                SELECT * FROM field_issues
+                UNION ALL
+                SELECT * FROM power_issues
+            )
+            SELECT json_build_object(
+                'found', p.found,
+                'compatible', NOT EXISTS (SELECT 1 FROM issues WHERE severity = 'critical'),
+                'issues', COALESCE(
+                    (SELECT json_agg(json_build_object('severity', severity, 'type', type, 'description', description))
+                     FROM issues),
+                    '[]'::json
+                ),
+                'total_tdp_watts', p.total_tdp
+            )
+            FROM power p
+        $$ LANGUAGE sql STABLE
+    """)
+
+
+def upgrade() -> None:
+    for field in ('wattage', 'capacity_gb'):
+        op.add_column(
+            'components',
+            sa.Column(field, sa.Integer(), sa.Computed(SPEC_INT_SQL.format(field=field), persisted=True))
+        )
+    
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_components_psu_wattage', 'components',
+            ['wattage'],
+            unique=False,
+            postgresql_where=sa.text("component_type = 'PSU'"),
+            postgresql_concurrently=True
+        )
+    
+    # PSU wattage now comes from the stored column instead of a specs cast
+    _create_check_build_compat("c.wattage")
+
+
+def downgrade() -> None:
+    _create_check_build_compat("(c.specs->>'wattage')::numeric")
+    
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_components_psu_wattage', table_name='components', postgresql_concurrently=True)
+    
+    op.drop_column('components', 'capacity_gb')
+    op.drop_column('components', 'wattage')
@@ -0,0 +1,31 @@
+"""Drop the single-column component_type index
+
+Revision ID: 019_drop_redundant_type_index
+Revises: 018_spec_columns
+Create Date: 2024-03-05 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '019_drop_redundant_type_index'
+down_revision = '018_spec_columns'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Every component_type filter is served by the composites that lead with it
+    # (ix_components_type_stock_price, ix_components_type_bench)
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_components_component_type'), table_name='components', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix_components_component_type'), 'components',
+            ['component_type'],
+            unique=False,
+            postgresql_concurrently=True
+        )
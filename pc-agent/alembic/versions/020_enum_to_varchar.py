@@ -0,0 +1,234 @@
+"""Store component type and condition as VARCHAR with CHECK constraints
+
+Revision ID: 020_enum_to_varchar
+Revises: 019_drop_redundant_type_index
+Create Date: 2024-03-06 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '020_enum_to_varchar'
+down_revision = '019_drop_redundant_type_index'
+branch_labels = None
+depends_on = None
+
+COMPONENT_TYPES = ('cpu', 'gpu', 'motherboard', 'ram', 'storage', 'psu', 'case', 'cooling')
+CONDITIONS = ('new', 'used', 'refurbished')
+
+
+def _in_list(values) -> str:
+    return ", ".join(f"'{value}'" for value in values)
+
+
+def _create_recommendable_components() -> None:
+    op.execute("""
+        CREATE MATERIALIZED VIEW recommendable_components AS
+        SELECT id, component_type, name, price_dzd, condition,
+               benchmark_score, value_ratio, specs, seller_location,
+               card_en, card_fr, card_ar
+        FROM components
+        WHERE in_stock = TRUE
+          AND benchmark_score IS NOT NULL
+          AND price_dzd > 0
+    """)
+    op.execute("CREATE UNIQUE INDEX ix_recommendable_components_id ON recommendable_components (id)")
+    op.execute(
+        "CREATE INDEX ix_recommendable_components_type_price "
+        "ON recommendable_components (component_type, price_dzd)"
+    )
+    op.execute(
+        "CREATE INDEX ix_recommendable_components_type_value "
+        "ON recommendable_components (component_type, value_ratio DESC)"
+    )
+
+
+def _create_card_trigger() -> None:
+    op.execute("""
+        CREATE TRIGGER components_set_cards
+            BEFORE INSERT OR UPDATE OF name, manufacturer, price_dzd, condition, benchmark_score, specs, i18n
+            ON components
+            FOR EACH ROW EXECUTE FUNCTION components_set_cards()
+    """)
+
+
+def _create_recommend_candidates(caps_type: str) -> None:
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION recommend_candidates(price_caps jsonb, card_locale text, per_type int)
+        RETURNS json AS $$
+            SELECT json_object_agg(caps.key, (
+                SELECT COALESCE(json_agg(c.card), '[]'::json)
+                FROM (
+                    SELECT CASE card_locale
+                               WHEN 'fr' THEN r.card_fr
+                               WHEN 'ar' THEN r.card_ar
+                               ELSE r.card_en
+                           END AS card
+                    FROM recommendable_components r
+                    WHERE r.component_type = {caps_type}
+                      AND r.price_dzd <= caps.value::float8
+                    ORDER BY r.value_ratio DESC
+                    LIMIT per_type
+                ) c
+            ))
+            FROM jsonb_each_text(price_caps) AS caps
+        $$ LANGUAGE sql STABLE
+    """)
+
+
+def _create_check_build_compat(psu: str) -> None:
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION check_build_compat(component_ids int[]) RETURNS json AS $$
+            WITH build AS (
+                SELECT c.component_type, c.tdp_watts, c.wattage, to_jsonb(c) AS doc
+                FROM components c
+                WHERE c.id = ANY(component_ids)
+            ),
+            rules AS (
+                SELECT * FROM compatibility_rules WHERE is_active
+            ),
+            field_rules AS (
+                -- Pairwise rules apply only when both of their types are in the build
+                SELECT * FROM rules
+                WHERE component_types <@ ARRAY(SELECT DISTINCT component_type FROM build)
+            ),
+            field_issues AS (
+                -- equals: both fields must match; compatible: field_2 must contain field_1
+                SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                       COALESCE(r.rule_logic->>'severity', 'critical') AS severity,
+                       format('%s (%s vs %s)', r.description, v.value_1, v.value_2) AS description
+                FROM field_rules r
+                JOIN build a ON a.component_type = r.component_types[1]
+                JOIN build b ON b.component_type = r.component_types[2]
+                CROSS JOIN LATERAL (
+                    SELECT a.doc->>(r.rule_logic->>'field_1') AS value_1,
+                           b.doc->>(r.rule_logic->>'field_2') AS value_2
+                ) v
+                WHERE r.rule_logic->>'operator' IN ('equals', 'compatible')
+                  AND v.value_1 IS NOT NULL
+                  AND v.value_2 IS NOT NULL
+                  AND CASE r.rule_logic->>'operator'
+                          WHEN 'equals' THEN v.value_1 <> v.value_2
+                          ELSE strpos(v.value_2, v.value_1) = 0
+                      END
+            ),
+            power AS (
+                SELECT count(*) AS found,
+                       COALESCE(sum(tdp_watts), 0) AS total_tdp,
+                       COALESCE(sum(tdp_watts) FILTER (WHERE component_type <> '{psu}'), 0) AS system_tdp,
+                       bool_or(component_type = '{psu}') AS has_psu,
+                       COALESCE(max(wattage) FILTER (WHERE component_type = '{psu}'), 0) AS psu_wattage
+                FROM build
+            ),
+            power_issues AS (
+                -- greater_than: PSU wattage must exceed the rest of the build's TDP times the multiplier
+                SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                       COALESCE(r.rule_logic->>'severity', 'warning') AS severity,
+                       format(
+                           'PSU %sW may be insufficient. Recommended: %sW',
+                           p.psu_wattage,
+                           round(p.system_tdp * (r.rule_logic->>'multiplier')::numeric)
+                       ) AS description
+                FROM rules r
+                CROSS JOIN power p
+                WHERE r.rule_logic->>'operator' = 'greater_than'
+                  AND p.has_psu
+                  AND p.psu_wattage < p.system_tdp * (r.rule_logic->>'multiplier')::numeric
+            ),
+            issues AS (
+                SELECT * FROM field_issues
+                UNION ALL
+                SELECT * FROM power_issues
+            )
+            SELECT json_build_object(
+                'found', p.found,
+                'compatible', NOT EXISTS (SELECT 1 FROM issues WHERE severity = 'critical'),
+                'issues', COALESCE(
+                    (SELECT json_agg(json_build_object('severity', severity, 'type', type, 'description', description))
+                     FROM issues),
+                    '[]'::json
+                ),
+                'total_tdp_watts', p.total_tdp
+            )
+            FROM power p
+        $$ LANGUAGE sql STABLE
+    """)
+
+
+def _drop_type_dependents() -> None:
+    # Objects that pin the column types: ALTER COLUMN TYPE refuses to run under
+    # the view or a trigger naming the column, and the partial index predicate
+    # compares against a typed literal
+    op.execute("DROP MATERIALIZED VIEW recommendable_components")
+    op.execute("DROP TRIGGER components_set_cards ON components")
+    op.drop_index('ix_components_psu_wattage', table_name='components')
+
+
+def upgrade() -> None:
+    _drop_type_dependents()
+    
+    # Enum labels are the member names (CPU); the columns now hold the values (cpu)
+    op.execute("ALTER TABLE components ALTER COLUMN component_type TYPE varchar(16) USING lower(component_type::text)")
+    op.execute("ALTER TABLE components ALTER COLUMN condition TYPE varchar(16) USING lower(condition::text)")
+    op.execute(
+        "ALTER TABLE compatibility_rules ALTER COLUMN component_types TYPE varchar(16)[] "
+        "USING lower(component_types::text)::varchar(16)[]"
+    )
+    op.execute("DROP TYPE componenttype")
+    op.execute("DROP TYPE condition")
+    
+    op.create_check_constraint(
+        'ck_components_component_type', 'components',
+        f"component_type IN ({_in_list(COMPONENT_TYPES)})"
+    )
+    op.create_check_constraint(
+        'ck_components_condition', 'components',
+        f"condition IN ({_in_list(CONDITIONS)})"
+    )
+    op.create_check_constraint(
+        'ck_compatibility_rules_component_types', 'compatibility_rules',
+        f"component_types <@ ARRAY[{_in_list(COMPONENT_TYPES)}]::varchar[]"
+    )
+    
+    op.create_index(
+        'ix_components_psu_wattage', 'components',
+        ['wattage'],
+        unique=False,
+        postgresql_where=sa.text("component_type = 'psu'")
+    )
+    _create_card_trigger()
+    _create_recommendable_components()
+    _create_recommend_candidates("caps.key")
+    _create_check_build_compat("psu")
+
+
+def downgrade() -> None:
+    _drop_type_dependents()
+    op.drop_constraint('ck_compatibility_rules_component_types', 'compatibility_rules', type_='check')
+    op.drop_constraint('ck_components_condition', 'components', type_='check')
+    op.drop_constraint('ck_components_component_type', 'components', type_='check')
+    
+    postgresql.ENUM(*(value.upper() for value in COMPONENT_TYPES), name='componenttype').create(op.get_bind())
+    postgresql.ENUM(*(value.upper() for value in CONDITIONS), name='condition').create(op.get_bind())
+    op.execute(
+        "ALTER TABLE components ALTER COLUMN component_type TYPE componenttype "
+        "USING upper(component_type)::componenttype"
+    )
+    op.execute("ALTER TABLE components ALTER COLUMN condition TYPE condition USING upper(condition)::condition")
+    op.execute(
+        "ALTER TABLE compatibility_rules ALTER COLUMN component_types TYPE componenttype[] "
+        "USING upper(component_types::text)::componenttype[]"
+    )
+    
+    op.create_index(
+        'ix_components_psu_wattage', 'components',
+        ['wattage'],
+        unique=False,
+        postgresql_where=sa.text("component_type = 'PSU'")
+    )
+    _create_card_trigger()
+    _create_recommendable_components()
+    _create_recommend_candidates("upper(caps.key)::componenttype")
+    _create_check_build_compat("PSU")
@@ -1,38 +1,109 @@
 """Main LangChain agent for PC build recommendations."""
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
+from importlib.metadata import PackageNotFoundError, version
+import hashlib
+import json
+import re
 import structlog
+from fastapi.concurrency import run_in_threadpool
 
 from app.core.config import settings
-from app.agent.tools import get_parts, check_compatibility, normalize_price, rate_performance
+from app.core.cache import cache
+from app.agent.tools import (
+    get_build_candidates,
+    get_parts,
+    check_compatibility,
+    check_builds_compatibility,
+    evaluate_build,
+    normalize_price,
+    rate_performance,
+    shared_component_rows,
+)
 
 logger = structlog.get_logger()
 
-# Try different import paths for LangChain compatibility
-try:
-    from langchain.agents import AgentExecutor, create_openai_tools_agent
-except ImportError:
+# Recommendations are cached per budget bucket; the TTL matches the refresh
+# interval of the recommendable components view the agent reads from.
+RECOMMENDATION_CACHE_PREFIX = "recommendation"
+RECOMMENDATION_CACHE_TTL = 900
+RECOMMENDATION_BUDGET_BUCKET_DZD = 5000
+
+
+# Leading release numbers of a version string; pre-release and local suffixes
+# such as "1.0a1" or "0.3rc1" are ignored
+_VERSION_RE = re.compile(r"(\d+)(?:\.(\d+))?")
+
+
+def _package_version(distribution: str) -> Tuple[int, int]:
+    """Installed (major, minor) version of a distribution, or (0, 0) if absent."""
     try:
-        from langchain.agents.agent import AgentExecutor
-        from langchain.agents.openai_tools import create_openai_tools_agent
-    except ImportError:
-        try:
-            from langchain.agents.agent_executor import AgentExecutor
-            from langchain.agents.openai_tools import create_openai_tools_agent
-        except ImportError:
-            # Fallback: use a simpler approach for Gemini
-            AgentExecutor = None
-            create_openai_tools_agent = None
-
-try:
-    from langchain_openai import ChatOpenAI
-except ImportError:
-    ChatOpenAI = None
+        match = _VERSION_RE.match(version(distribution))
+    except PackageNotFoundError:
+        return (0, 0)
+    if not match:
+        return (0, 0)
+    return int(match.group(1)), int(match.group(2) or 0)
+
 
-try:
+# Resolve LangChain import paths once from the installed versions instead of
+# probing candidate modules with try/except at every worker start
+_LANGCHAIN_VERSION = _package_version("langchain")
+_LANGCHAIN_CLASSIC_VERSION = _package_version("langchain-classic")
+_LANGCHAIN_CORE_VERSION = _package_version("langchain-core")
+
+if _LANGCHAIN_VERSION >= (1, 0) and _LANGCHAIN_CLASSIC_VERSION > (0, 0):
+    # 1.x moved the legacy agent executor into langchain-classic
+    from langchain_classic.agents import AgentExecutor, create_openai_tools_agent
+    from langchain_classic.agents.format_scratchpad.openai_tools import format_to_openai_tool_messages
+    from langchain_classic.agents.output_parsers.openai_tools import OpenAIToolsAgentOutputParser
+elif (0, 1) <= _LANGCHAIN_VERSION < (1, 0):
+    from langchain.agents import AgentExecutor, create_openai_tools_agent
+    from langchain.agents.format_scratchpad.openai_tools import format_to_openai_tool_messages
+    from langchain.agents.output_parsers.openai_tools import OpenAIToolsAgentOutputParser
+elif (0, 0) < _LANGCHAIN_VERSION < (0, 1):
+    from langchain.agents.agent import AgentExecutor
+    from langchain.agents.openai_tools import create_openai_tools_agent
+    format_to_openai_tool_messages = None
+    OpenAIToolsAgentOutputParser = None
+else:
+    # No agent executor available: fall back to direct LLM/Gemini calls
+    AgentExecutor = None
+    create_openai_tools_agent = None
+    format_to_openai_tool_messages = None
+    OpenAIToolsAgentOutputParser = None
+
+if _LANGCHAIN_CORE_VERSION > (0, 0):
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langchain_core.runnables import RunnablePassthrough
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+elif _LANGCHAIN_VERSION > (0, 0):
     from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-except ImportError:
+    RunnablePassthrough = None
+    convert_to_openai_tool = None
+else:
     ChatPromptTemplate = None
     MessagesPlaceholder = None
+    RunnablePassthrough = None
+    convert_to_openai_tool = None
+
+if _package_version("langchain-openai") > (0, 0):
+    from langchain_openai import ChatOpenAI
+else:
+    ChatOpenAI = None
+
+AGENT_TOOLS = [
+    get_build_candidates,
+    get_parts,
+    check_compatibility,
+    check_builds_compatibility,
+    normalize_price,
+    rate_performance,
+    evaluate_build
+]
+
+# Tool JSON schemas are derived from the tool signatures once per process
+# rather than by create_openai_tools_agent on every agent construction
+_TOOL_SCHEMAS = [convert_to_openai_tool(t) for t in AGENT_TOOLS] if convert_to_openai_tool else None
 
 
 class PCBuildAgent:
@@ -45,10 +116,13 @@ You have access to a database of PC components available in Algeria (primarily f
 All prices are in Algerian Dinar (DZD).
 
 Your tools:
-1. get_parts: Query components by type, price range, and specifications
-2. check_compatibility: Verify that selected components work together
-3. normalize_price: Convert prices to DZD if needed
-4. rate_performance: Evaluate build performance for specific use cases
+1. get_build_candidates: Fetch candidates for every component type in one call - start here
+2. get_parts: Query components by type, price range, and specifications to refine a choice
+3. check_compatibility: Verify that selected components work together
+4. check_builds_compatibility: Verify several candidate builds in one call
+5. normalize_price: Convert prices to DZD if needed
+6. rate_performance: Evaluate build performance for specific use cases
+7. evaluate_build: Check compatibility and rate performance of the final build in one call
 
 Guidelines:
 - Always prioritize compatibility - a working build is better than a powerful incompatible one
@@ -66,7 +140,51 @@ Budget allocation guidelines:
 - Productivity: CPU 35%, RAM 20%, GPU 15%, Storage 20%, PSU 7%, Case 3%
 - AI/ML: GPU 60%, CPU 15%, RAM 15%, Storage 7%, PSU 3%
 
+For every build request, recommend a complete PC build including:
+- CPU (Processor)
+- GPU (Graphics Card)
+- Motherboard
+- RAM (Memory)
+- Storage (SSD/HDD)
+- PSU (Power Supply)
+- Case (optional, if budget allows)
+
+Steps:
+1. Use get_build_candidates once to get options for every component
+2. Use get_parts only if a component needs a narrower search
+3. Select the best value components that fit the budget
+4. Compare candidate builds with check_builds_compatibility if you have several
+5. Verify and rate the final build with a single evaluate_build call
+
+Respond in the user's preferred language with:
+- Selected components with prices
+- Total cost
+- Compatibility status
+- Performance rating for the requested use case
+- Brief explanation of choices
+
 Always verify compatibility before finalizing a build recommendation.
+"""
+    
+    # Tool summary appended to the system instruction for direct Gemini calls
+    GEMINI_TOOLS_DESCRIPTION = """
+Available tools:
+1. get_build_candidates(budget_dzd, use_case, locale, limit_per_type) - Query candidates for all components
+2. get_parts(component_type, max_price_dzd, min_benchmark_score, condition, limit, locale) - Query components
+3. check_compatibility(component_ids) - Check component compatibility
+4. check_builds_compatibility(builds) - Check compatibility of several builds at once
+5. normalize_price(price_str, source_currency) - Normalize prices
+6. rate_performance(component_ids, use_case) - Rate build performance
+7. evaluate_build(component_ids, use_case) - Check compatibility and rate performance together
+"""
+    
+    # Only the per-request values; the static instructions live in SYSTEM_PROMPT
+    # so providers can reuse their prompt cache across requests
+    QUERY_TEMPLATE = """I need a PC build recommendation with the following requirements:
+
+Budget: {budget_dzd:,.0f} DZD
+Use Case: {use_case}
+Preferred Language: {language}
 """
     
     def __init__(self):
@@ -115,56 +233,35 @@ Always verify compatibility before finalizing a build recommendation.
                 self.use_direct_gemini = False
             except ImportError:
                 # Fallback: use google-generativeai directly
-                logger.warning("langchain_google_genai not found, using direct Gemini API")
+                logger.warning("gemini_direct_fallback", reason="langchain_google_genai not installed")
                 self.llm = None
                 self.use_direct_gemini = True
         else:
             raise ValueError(f"Unsupported LLM provider: {settings.LLM_PROVIDER}")
         
         # Define tools
-        self.tools = [
-            get_parts,
-            check_compatibility,
-            normalize_price,
-            rate_performance
-        ]
+        self.tools = AGENT_TOOLS
+        self._gemini = None
         
         # For Gemini with direct API, skip LangChain agent setup
         if settings.LLM_PROVIDER == "gemini" and self.use_direct_gemini:
             self.prompt = None
             self.agent = None
             self.executor = None
-        elif AgentExecutor is None or create_openai_tools_agent is None or ChatPromptTemplate is None:
+        elif AgentExecutor is None or create_openai_tools_agent is None or _PROMPT is None:
             # LangChain imports failed, use direct approach
-            logger.warning("LangChain agent components not available, using direct LLM calls")
+            logger.warning("agent_components_unavailable", fallback="direct_llm")
             self.prompt = None
             self.agent = None
             self.executor = None
         else:
-            # Create prompt template
-            try:
-                self.prompt = ChatPromptTemplate.from_messages([
-                    ("system", self.SYSTEM_PROMPT),
-                    MessagesPlaceholder(variable_name="chat_history", optional=True) if MessagesPlaceholder else None,
-                    ("user", "{input}"),
-                    MessagesPlaceholder(variable_name="agent_scratchpad") if MessagesPlaceholder else None,
-                ])
-            except Exception as e:
-                logger.warning(f"Could not create prompt template: {str(e)}")
-                self.prompt = None
+            self.prompt = _PROMPT
             
             # Create agent
-            if self.prompt and create_openai_tools_agent:
-                try:
-                    self.agent = create_openai_tools_agent(
-                        llm=self.llm,
-                        tools=self.tools,
-                        prompt=self.prompt
-                    )
-                except Exception as e:
-                    logger.warning(f"Could not create OpenAI tools agent: {str(e)}")
-                    self.agent = None
-            else:
+            try:
+                self.agent = _create_tools_agent(self.llm)
+            except Exception as e:
+                logger.warning("agent_create_failed", error=str(e))
                 self.agent = None
             
             # Create executor
@@ -178,14 +275,18 @@ Always verify compatibility before finalizing a build recommendation.
                         handle_parsing_errors=True
                     )
                 except Exception as e:
-                    logger.warning(f"Could not create AgentExecutor: {str(e)}")
+                    logger.warning("agent_executor_create_failed", error=str(e))
                     self.executor = None
             else:
                 self.executor = None
         
-        logger.info(f"PC Build Agent initialized with {settings.LLM_PROVIDER}")
+        logger.info(
+            "agent_initialized",
+            provider=settings.LLM_PROVIDER,
+            system_prompt_sha256=SYSTEM_PROMPT_SHA256
+        )
     
-    def recommend_build(
+    async def recommend_build(
         self,
         budget_dzd: float,
         use_case: str,
@@ -205,69 +306,47 @@ Always verify compatibility before finalizing a build recommendation.
             Build recommendation with components and explanation
         """
         try:
-            # Construct user query
-            locale_names = {"ar": "Arabic", "fr": "French", "en": "English"}
-            language = locale_names.get(locale, "French")
+            # Identical requests within a budget bucket reuse the last answer
+            cache_key = self._cache_key(budget_dzd, use_case, locale, preferences)
+            # The Redis client is blocking; keep its calls off the event loop
+            cached_result = await run_in_threadpool(self._cached_build, cache_key, budget_dzd)
+            if cached_result is not None:
+                logger.info("serving_cached_build", budget_dzd=budget_dzd, use_case=use_case)
+                return {**cached_result, "budget_dzd": budget_dzd}
             
-            query = f"""
-I need a PC build recommendation with the following requirements:
-
-Budget: {budget_dzd:,.0f} DZD
-Use Case: {use_case}
-Preferred Language: {language}
-
-Please recommend a complete PC build including:
-- CPU (Processor)
-- GPU (Graphics Card)
-- Motherboard
-- RAM (Memory)
-- Storage (SSD/HDD)
-- PSU (Power Supply)
-- Case (optional, if budget allows)
-
-For each component:
-1. Use get_parts to find suitable options
-2. Select the best value components that fit the budget
-3. Verify compatibility with check_compatibility
-4. Rate the final build with rate_performance
-
-Provide your response in {language} with:
-- Selected components with prices
-- Total cost
-- Compatibility status
-- Performance rating for {use_case}
-- Brief explanation of choices
-"""
-            
-            if preferences:
-                query += f"\n\nAdditional preferences: {preferences}"
+            query = self._build_query(budget_dzd, use_case, locale, preferences)
             
             # Execute agent
-            logger.info(f"Generating build for {budget_dzd} DZD, use case: {use_case}")
+            logger.info("generating_build", budget_dzd=budget_dzd, use_case=use_case)
             
             if self.executor:
-                # Use LangChain agent executor
-                result = self.executor.invoke({"input": query})
+                # Use LangChain agent executor; sync tools run in a worker thread
+                # with a copy of this context, so they see the shared row cache
+                with shared_component_rows():
+                    result = await self.executor.ainvoke({"input": query})
                 output = result.get("output", "")
             elif settings.LLM_PROVIDER == "gemini" and (hasattr(self, 'use_direct_gemini') and self.use_direct_gemini):
                 # Use direct Gemini API with function calling
-                output = self._call_gemini_with_tools(query)
-            elif self.llm and hasattr(self.llm, 'invoke'):
+                output = await self._call_gemini_with_tools(query)
+            elif self.llm and hasattr(self.llm, 'ainvoke'):
                 # Fallback: direct LLM call
                 try:
-                    response = self.llm.invoke(query)
+                    response = await self.llm.ainvoke([
+                        ("system", self.SYSTEM_PROMPT),
+                        ("user", query),
+                    ])
                     output = response.content if hasattr(response, 'content') else str(response)
                 except Exception as e:
-                    logger.error(f"Error calling LLM: {str(e)}")
+                    logger.error("llm_call_failed", error=str(e))
                     output = f"Error: {str(e)}"
             else:
                 # Last resort: use direct Gemini
                 if settings.LLM_PROVIDER == "gemini":
-                    output = self._call_gemini_with_tools(query)
+                    output = await self._call_gemini_with_tools(query)
                 else:
                     output = "Error: Could not execute agent - no executor or LLM available"
             
-            return {
+            result = {
                 "success": True,
                 "recommendation": output,
                 "budget_dzd": budget_dzd,
@@ -275,8 +354,13 @@ Provide your response in {language} with:
                 "locale": locale
             }
             
+            if not output.startswith("Error"):
+                await run_in_threadpool(cache.set, cache_key, result, RECOMMENDATION_CACHE_TTL)
+            
+            return result
+            
         except Exception as e:
-            logger.error(f"Error generating build recommendation: {str(e)}")
+            logger.error("build_recommendation_failed", budget_dzd=budget_dzd, use_case=use_case, error=str(e))
             return {
                 "success": False,
                 "error": str(e),
@@ -284,41 +368,213 @@ Provide your response in {language} with:
                 "use_case": use_case
             }
     
-    def _call_gemini_with_tools(self, query: str) -> str:
-        """Call Gemini API directly with function calling support."""
+    async def stream_build(
+        self,
+        budget_dzd: float,
+        use_case: str,
+        locale: str = "fr",
+        preferences: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate a PC build recommendation, yielding text as the LLM produces it.
+        
+        Args:
+            budget_dzd: Budget in Algerian Dinar
+            use_case: Primary use case (gaming, productivity, ai_ml, etc.)
+            locale: Preferred language (ar, fr, en)
+            preferences: Additional user preferences
+            
+        Yields:
+            Chunks of the recommendation text
+        """
+        cache_key = self._cache_key(budget_dzd, use_case, locale, preferences)
+        # The Redis client is blocking; keep its calls off the event loop
+        cached_result = await run_in_threadpool(self._cached_build, cache_key, budget_dzd)
+        if cached_result is not None:
+            logger.info("serving_cached_build", budget_dzd=budget_dzd, use_case=use_case)
+            yield cached_result["recommendation"]
+            return
+        
+        query = self._build_query(budget_dzd, use_case, locale, preferences)
+        logger.info("streaming_build", budget_dzd=budget_dzd, use_case=use_case)
+        
+        if self.executor:
+            # Only model tokens are forwarded; tool calls and results stay server-side
+            chunks = self._stream_executor(query)
+        elif self.use_direct_gemini or self.llm is None:
+            chunks = self._stream_gemini(query)
+        else:
+            chunks = self._stream_llm(query)
+        
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        
+        output = "".join(parts)
+        if output and not output.startswith("Error"):
+            await run_in_threadpool(cache.set, cache_key, {
+                "success": True,
+                "recommendation": output,
+                "budget_dzd": budget_dzd,
+                "use_case": use_case,
+                "locale": locale
+            }, RECOMMENDATION_CACHE_TTL)
+    
+    def _cache_key(
+        self,
+        budget_dzd: float,
+        use_case: str,
+        locale: str,
+        preferences: Optional[Dict[str, Any]]
+    ) -> str:
+        """Build the recommendation cache key for a request."""
+        budget_bucket = round(budget_dzd / RECOMMENDATION_BUDGET_BUCKET_DZD) * RECOMMENDATION_BUDGET_BUCKET_DZD
+        return cache._generate_key(
+            RECOMMENDATION_CACHE_PREFIX,
+            budget_bucket,
+            use_case,
+            locale,
+            json.dumps(preferences or {}, sort_keys=True, default=str)
+        )
+    
+    def _cached_build(self, cache_key: str, budget_dzd: float) -> Optional[Dict[str, Any]]:
+        """
+        Cached recommendation for a request, if it fits the request's budget.
+        
+        The bucket spans budgets on both sides of the request, and a build
+        made for a larger budget may cost more than this one allows, so only
+        builds generated for at most this budget are reused.
+        """
+        cached_result = cache.get(cache_key)
+        if cached_result is None or cached_result.get("budget_dzd", float("inf")) > budget_dzd:
+            return None
+        return cached_result
+    
+    def _build_query(
+        self,
+        budget_dzd: float,
+        use_case: str,
+        locale: str,
+        preferences: Optional[Dict[str, Any]]
+    ) -> str:
+        """Construct the user query for a build request."""
+        locale_names = {"ar": "Arabic", "fr": "French", "en": "English"}
+        language = locale_names.get(locale, "French")
+        
+        query = self.QUERY_TEMPLATE.format(
+            budget_dzd=budget_dzd,
+            use_case=use_case,
+            language=language
+        )
+        
+        if preferences:
+            query += f"\n\nAdditional preferences: {preferences}"
+        
+        return query
+    
+    async def _stream_executor(self, query: str) -> AsyncIterator[str]:
+        """Stream the agent's model tokens through the tool-calling loop."""
+        async for event in self.executor.astream_events({"input": query}, version="v1"):
+            if event["event"] == "on_chat_model_stream":
+                content = event["data"]["chunk"].content
+                if content:
+                    yield content
+    
+    async def _stream_llm(self, query: str) -> AsyncIterator[str]:
+        """Stream a direct LLM call without tools."""
         try:
+            async for chunk in self.llm.astream([
+                ("system", self.SYSTEM_PROMPT),
+                ("user", query),
+            ]):
+                if chunk.content:
+                    yield chunk.content
+        except Exception as e:
+            logger.error("llm_stream_failed", error=str(e))
+            yield f"Error: {str(e)}"
+    
+    async def _stream_gemini(self, query: str) -> AsyncIterator[str]:
+        """Stream a direct Gemini API call."""
+        try:
+            response = await self._gemini_model().generate_content_async(
+                self._gemini_prompt(query),
+                stream=True
+            )
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            logger.error("gemini_stream_failed", error=str(e))
+            yield f"Error generating recommendation: {str(e)}"
+    
+    def _gemini_model(self):
+        """Return the direct Gemini model, configuring the client on first use."""
+        if self._gemini is None:
             import google.generativeai as genai
-            from app.core.config import settings
             
-            # Configure Gemini
             genai.configure(api_key=settings.GEMINI_API_KEY)
-            model = genai.GenerativeModel(settings.GEMINI_MODEL)
-            
-            # Create tools description for Gemini
-            tools_description = """
-Available tools:
-1. get_parts(component_type, max_price_dzd, min_benchmark_score, condition, limit) - Query components
-2. check_compatibility(component_ids) - Check component compatibility
-3. normalize_price(price_str, source_currency) - Normalize prices
-4. rate_performance(component_ids, use_case) - Rate build performance
-"""
-            
-            # Enhanced prompt with tool descriptions
-            enhanced_query = f"""{self.SYSTEM_PROMPT}
-
-{tools_description}
-
-User Request:
+            # Static instructions go in system_instruction so every request
+            # shares a byte-identical prefix the provider can cache
+            self._gemini = genai.GenerativeModel(
+                settings.GEMINI_MODEL,
+                system_instruction=self.SYSTEM_PROMPT + self.GEMINI_TOOLS_DESCRIPTION
+            )
+        return self._gemini
+    
+    def _gemini_prompt(self, query: str) -> str:
+        """Build the per-request message used for direct Gemini calls."""
+        return f"""User Request:
 {query}
 
 Please provide a detailed PC build recommendation. You can use the tools above to query the database for components.
 """
-            
-            # Call Gemini
-            response = model.generate_content(enhanced_query)
+    
+    async def _call_gemini_with_tools(self, query: str) -> str:
+        """Call Gemini API directly with function calling support."""
+        try:
+            response = await self._gemini_model().generate_content_async(self._gemini_prompt(query))
             return response.text
             
         except Exception as e:
-            logger.error(f"Error calling Gemini directly: {str(e)}")
+            logger.error("gemini_call_failed", error=str(e))
             return f"Error generating recommendation: {str(e)}"
 
+
+def _create_prompt(system_prompt: str):
+    """Create the agent prompt template, or None if it cannot be built."""
+    if ChatPromptTemplate is None:
+        return None
+    try:
+        return ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            MessagesPlaceholder(variable_name="chat_history", optional=True) if MessagesPlaceholder else None,
+            ("user", "{input}"),
+            MessagesPlaceholder(variable_name="agent_scratchpad") if MessagesPlaceholder else None,
+        ])
+    except Exception as e:
+        logger.warning("prompt_template_create_failed", error=str(e))
+        return None
+
+
+def _create_tools_agent(llm):
+    """Build the OpenAI tools agent runnable around the precomputed tool schemas."""
+    if _TOOL_SCHEMAS is None or RunnablePassthrough is None or OpenAIToolsAgentOutputParser is None:
+        return create_openai_tools_agent(llm=llm, tools=AGENT_TOOLS, prompt=_PROMPT)
+    
+    # Same pipeline create_openai_tools_agent assembles, minus re-deriving the schemas
+    return (
+        RunnablePassthrough.assign(
+            agent_scratchpad=lambda x: format_to_openai_tool_messages(x["intermediate_steps"])
+        )
+        | _PROMPT
+        | llm.bind(tools=_TOOL_SCHEMAS)
+        | OpenAIToolsAgentOutputParser()
+    )
+
+
+_PROMPT = _create_prompt(PCBuildAgent.SYSTEM_PROMPT)
+
+# Provider prompt caches match on a byte-exact prefix; the hash is logged at
+# startup so a changed prompt (and the resulting cache misses) is visible
+SYSTEM_PROMPT_SHA256 = hashlib.sha256(PCBuildAgent.SYSTEM_PROMPT.encode("utf-8")).hexdigest()
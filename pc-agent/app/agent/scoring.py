@@ -0,0 +1,76 @@
+"""Use-case performance scoring for PC builds."""
+from typing import Any, Dict, Mapping
+
+import numpy as np
+
+USE_CASES = ("gaming", "productivity", "ai_ml")
+
+# Feature vector layout for one build
+FEATURES = (
+    "gpu_gaming", "gpu_productivity", "gpu_ai",
+    "cpu_gaming", "cpu_productivity", "cpu_ai",
+    "ram",
+)
+
+# Contribution of each feature (columns) to each use-case score (rows).
+# GPU drives gaming and AI, CPU all workloads, RAM productivity and AI.
+WEIGHTS = np.array([
+    # gpu_g  gpu_p  gpu_a  cpu_g  cpu_p  cpu_a  ram
+    [0.6,   0.0,   0.0,   0.3,   0.0,   0.0,   0.0],  # gaming
+    [0.0,   0.3,   0.0,   0.0,   0.5,   0.0,   0.2],  # productivity
+    [0.0,   0.0,   0.7,   0.0,   0.0,   0.2,   0.1],  # ai_ml
+])
+
+# Blend of the use-case scores into the overall score
+OVERALL_WEIGHTS = np.array([0.33, 0.33, 0.34])
+
+# RAM capacity that earns the full RAM score
+RAM_REFERENCE_GB = 32
+
+
+def build_features(comp_map: Mapping[str, Any]) -> np.ndarray:
+    """
+    Build the feature vector for one build.
+    
+    Args:
+        comp_map: Component type -> row with gaming_score, productivity_score,
+            ai_score and capacity_gb attributes
+        
+    Returns:
+        Feature vector ordered as FEATURES; missing parts contribute 0
+    """
+    features = np.zeros(len(FEATURES))
+    for offset, part in ((0, "gpu"), (3, "cpu")):
+        component = comp_map.get(part)
+        if component is not None:
+            features[offset] = component.gaming_score or 0
+            features[offset + 1] = component.productivity_score or 0
+            features[offset + 2] = component.ai_score or 0
+    
+    ram = comp_map.get("ram")
+    if ram is not None:
+        ram_capacity = ram.capacity_gb or 0
+        features[6] = min(ram_capacity / RAM_REFERENCE_GB * 100, 100)
+    
+    return features
+
+
+def score_builds(features: np.ndarray) -> np.ndarray:
+    """
+    Score one or many builds in a single matrix product.
+    
+    Args:
+        features: Feature vectors, shape (len(FEATURES),) or (n_builds, len(FEATURES))
+        
+    Returns:
+        Scores ordered as USE_CASES followed by overall, shape (4,) or (n_builds, 4)
+    """
+    use_case_scores = features @ WEIGHTS.T
+    overall = use_case_scores @ OVERALL_WEIGHTS
+    return np.concatenate([use_case_scores, overall[..., np.newaxis]], axis=-1)
+
+
+def rate_build(comp_map: Mapping[str, Any]) -> Dict[str, float]:
+    """Score a single build, keyed by use case plus "overall"."""
+    scores = score_builds(build_features(comp_map))
+    return {name: float(score) for name, score in zip(USE_CASES + ("overall",), scores)}
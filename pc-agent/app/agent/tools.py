@@ -1,15 +1,100 @@
 """LangChain tools for the PC build agent."""
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import List, Dict, Any, Optional
+import json
+import re
 from langchain.tools import tool
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, case
+from sqlalchemy import and_, or_, case, text
 import structlog
 
-from app.db.models import Component, ComponentType, Condition
+from app.core.config import settings
+from app.db.models import CARD_LOCALES, Component, ComponentScore, ComponentType, Condition, RecommendableComponent
 from app.db.database import SessionLocal
+from app.agent.scoring import rate_build
+from app.agent.tools_cache import ttl_cache
 
 logger = structlog.get_logger()
 
+# Rating rows fetched during one recommendation, keyed by component id. The
+# agent scopes a fresh dict per request; outside one, nothing is shared.
+_rating_rows: ContextVar[Optional[Dict[int, Any]]] = ContextVar("rating_rows", default=None)
+
+
+@contextmanager
+def shared_component_rows():
+    """Share rate_performance's component rows across tool calls in one request."""
+    token = _rating_rows.set({})
+    try:
+        yield
+    finally:
+        _rating_rows.reset(token)
+
+
+# Per-part price ceilings as a share of the total budget, used to pick
+# candidates. Shares are upper bounds per part, so they need not sum to 1.
+CANDIDATE_BUDGET_SHARES = {
+    "gaming": {"gpu": 0.50, "cpu": 0.25, "motherboard": 0.15, "ram": 0.10, "storage": 0.08, "psu": 0.06, "case": 0.05},
+    "productivity": {"cpu": 0.35, "ram": 0.20, "gpu": 0.15, "motherboard": 0.15, "storage": 0.20, "psu": 0.07, "case": 0.05},
+    "ai_ml": {"gpu": 0.60, "cpu": 0.15, "motherboard": 0.12, "ram": 0.15, "storage": 0.07, "psu": 0.06, "case": 0.04},
+}
+DEFAULT_BUDGET_SHARES = CANDIDATE_BUDGET_SHARES["productivity"]
+
+
+# First number in a price string once separators are stripped
+_PRICE_RE = re.compile(r"(\d+(?:\.\d+)?)")
+
+# DZD per unit of each supported source currency
+_CURRENCY_RATES_DZD = {
+    "DZD": 1.0,
+    "USD": settings.USD_TO_DZD_RATE,
+    "EUR": settings.EUR_TO_DZD_RATE,
+}
+
+
+# Enum members by value, for validating tool arguments without raising
+_COMPONENT_TYPES = {ct.value: ct for ct in ComponentType}
+_CONDITIONS = {c.value: c for c in Condition}
+
+# Per-process cache: the scraper refreshes the view from a Celery worker, so
+# API processes are never told about it and the TTL alone bounds staleness
+@ttl_cache(maxsize=1024, ttl=300)
+def _query_parts(
+    component_type: ComponentType,
+    max_price_dzd: Optional[float],
+    min_benchmark_score: Optional[float],
+    condition: Optional[Condition],
+    limit: int,
+    locale: str
+) -> List[str]:
+    """Fetch component cards from the recommendable components view."""
+    db = SessionLocal()
+    try:
+        card_column = getattr(RecommendableComponent, f"card_{locale}")
+        
+        # The view already excludes out-of-stock, unscored and unpriced rows,
+        # and the cards are pre-rendered by the database
+        query = db.query(card_column).filter(
+            RecommendableComponent.component_type == component_type
+        )
+        
+        if max_price_dzd:
+            query = query.filter(RecommendableComponent.price_dzd <= max_price_dzd)
+        
+        if min_benchmark_score:
+            query = query.filter(RecommendableComponent.benchmark_score >= min_benchmark_score)
+        
+        if condition:
+            query = query.filter(RecommendableComponent.condition == condition)
+        
+        # Order by value (performance per DZD)
+        query = query.order_by(RecommendableComponent.value_ratio.desc())
+        
+        return [card for (card,) in query.limit(limit).all()]
+    finally:
+        db.close()
+
 
 @tool
 def get_parts(
@@ -17,7 +102,8 @@ def get_parts(
     max_price_dzd: Optional[float] = None,
     min_benchmark_score: Optional[float] = None,
     condition: Optional[str] = None,
-    limit: int = 20
+    limit: int = 20,
+    locale: str = "en"
 ) -> str:
     """
     Query the database for PC components matching criteria.
@@ -28,68 +114,104 @@ def get_parts(
         min_benchmark_score: Minimum benchmark score
         condition: Component condition (new, used, refurbished)
         limit: Maximum number of results
+        locale: Language for component names (en, fr, ar)
         
     Returns:
-        JSON string with matching components
+        List of component cards: "#id | name | manufacturer | price | condition | score | location | specs"
     """
-    db = SessionLocal()
     try:
         # Validate component type
-        try:
-            component_type_enum = ComponentType(component_type.lower())
-        except ValueError:
-            return f"Error: Invalid component type: {component_type}. Valid types: {[ct.value for ct in ComponentType]}"
-        
-        query = db.query(Component).filter(
-            Component.component_type == component_type_enum,
-            Component.in_stock == True
-        )
-        
-        if max_price_dzd:
-            query = query.filter(Component.price_dzd <= max_price_dzd)
-        
-        if min_benchmark_score:
-            query = query.filter(Component.benchmark_score >= min_benchmark_score)
+        component_type_enum = _COMPONENT_TYPES.get(component_type.lower())
+        if component_type_enum is None:
+            return f"Error: Invalid component type: {component_type}. Valid types: {list(_COMPONENT_TYPES)}"
         
+        condition_enum = None
         if condition:
-            try:
-                condition_enum = Condition(condition.lower())
-                query = query.filter(Component.condition == condition_enum)
-            except ValueError:
+            condition_enum = _CONDITIONS.get(condition.lower())
+            if condition_enum is None:
                 logger.warning(f"Invalid condition: {condition}")
         
-        # Order by value (performance per DZD) with null/zero safety
-        query = query.filter(
-            Component.benchmark_score.isnot(None),
-            Component.price_dzd > 0
-        ).order_by(
-            (Component.benchmark_score / Component.price_dzd).desc()
-        )
-        
-        components = query.limit(limit).all()
+        if locale not in CARD_LOCALES:
+            locale = CARD_LOCALES[0]
         
-        results = []
-        for comp in components:
-            results.append({
-                "id": comp.id,
-                "name": comp.name,
-                "price_dzd": comp.price_dzd,
-                "condition": comp.condition.value,
-                "benchmark_score": comp.benchmark_score,
-                "specs": comp.specs,
-                "location": comp.seller_location,
-            })
+        results = _query_parts(
+            component_type_enum,
+            max_price_dzd,
+            min_benchmark_score,
+            condition_enum,
+            limit,
+            locale
+        )
         
         logger.info(f"Found {len(results)} {component_type} components")
-        return str(results)
+        return json.dumps(results, ensure_ascii=False, separators=(",", ":"))
         
     except Exception as e:
         logger.error(f"Error querying parts: {str(e)}")
         return f"Error: {str(e)}"
+
+
+@tool
+def get_build_candidates(
+    budget_dzd: float,
+    use_case: str,
+    locale: str = "en",
+    limit_per_type: int = 10
+) -> str:
+    """
+    Fetch candidate components for every part of a build in a single query.
+    
+    Args:
+        budget_dzd: Total build budget in Algerian Dinar
+        use_case: Use case driving the budget split (gaming, productivity, ai_ml, etc.)
+        locale: Language for component names (en, fr, ar)
+        limit_per_type: Maximum candidates per component type
+        
+    Returns:
+        JSON object mapping component type to a list of component cards
+    """
+    db = SessionLocal()
+    try:
+        if locale not in CARD_LOCALES:
+            locale = CARD_LOCALES[0]
+        
+        shares = CANDIDATE_BUDGET_SHARES.get(use_case, DEFAULT_BUDGET_SHARES)
+        price_caps = {comp_type: budget_dzd * share for comp_type, share in shares.items()}
+        
+        candidates = db.execute(
+            text("SELECT recommend_candidates(CAST(:price_caps AS jsonb), :locale, :per_type)"),
+            {"price_caps": json.dumps(price_caps), "locale": locale, "per_type": limit_per_type}
+        ).scalar() or {}
+        
+        logger.info(f"Fetched build candidates for {len(candidates)} component types")
+        return json.dumps(candidates, ensure_ascii=False, separators=(",", ":"))
+        
+    except Exception as e:
+        logger.error(f"Error fetching build candidates: {str(e)}")
+        return f"Error: {str(e)}"
     finally:
         db.close()
 
 
+def build_compat(db: Session, component_ids: List[int]) -> Dict[str, Any]:
+    """Run check_build_compat() for one build."""
+    # Rules from compatibility_rules are evaluated inside the database
+    return db.execute(
+        text("SELECT check_build_compat(CAST(:component_ids AS int[]))"),
+        {"component_ids": list(component_ids)}
+    ).scalar()
+
+
+def _compat_summary(compat: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a check_build_compat() result for the agent."""
+    return {
+        "compatible": compat["compatible"],
+        "compatibility_score": 100 if compat["compatible"] else 50,
+        "issues": compat["issues"],
+        "total_tdp_watts": compat["total_tdp_watts"]
+    }
+
+
 @tool
 def check_compatibility(component_ids: List[int]) -> str:
     """
@@ -103,93 +225,59 @@ def check_compatibility(component_ids: List[int]) -> str:
     """
     db = SessionLocal()
     try:
-        components = db.query(Component).filter(
-            Component.id.in_(component_ids)
-        ).all()
+        compat = build_compat(db, component_ids)
         
-        if len(components) != len(component_ids):
+        if compat["found"] != len(component_ids):
             return "Error: Some component IDs not found"
         
-        # Build component map
-        comp_map = {comp.component_type.value: comp for comp in components}
-        
-        issues = []
-        compatible = True
-        
-        # Check CPU-Motherboard socket compatibility
-        if "cpu" in comp_map and "motherboard" in comp_map:
-            cpu = comp_map["cpu"]
-            mobo = comp_map["motherboard"]
-            
-            if cpu.socket_type and mobo.socket_type:
-                if cpu.socket_type != mobo.socket_type:
-                    issues.append({
-                        "severity": "critical",
-                        "type": "socket_mismatch",
-                        "description": f"CPU socket {cpu.socket_type} incompatible with motherboard socket {mobo.socket_type}"
-                    })
-                    compatible = False
+        result = _compat_summary(compat)
         
-        # Check RAM compatibility
-        if "ram" in comp_map and "motherboard" in comp_map:
-            ram = comp_map["ram"]
-            mobo = comp_map["motherboard"]
-            
-            if ram.ram_type and mobo.ram_type:
-                if ram.ram_type != mobo.ram_type:
-                    issues.append({
-                        "severity": "critical",
-                        "type": "ram_type_mismatch",
-                        "description": f"RAM type {ram.ram_type} incompatible with motherboard {mobo.ram_type}"
-                    })
-                    compatible = False
+        logger.info(f"Compatibility check: {result['compatible']}, {len(result['issues'])} issues")
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str)
         
-        # Check PSU wattage
-        if "psu" in comp_map:
-            psu = comp_map["psu"]
-            total_tdp = sum(
-                comp.tdp_watts or 0 
-                for comp in components 
-                if comp.component_type != ComponentType.PSU
-            )
-            
-            psu_wattage = psu.specs.get("wattage", 0) if psu.specs else 0
-            recommended_wattage = total_tdp * 1.3  # 30% headroom
-            
-            if psu_wattage < recommended_wattage:
-                issues.append({
-                    "severity": "warning",
-                    "type": "insufficient_psu",
-                    "description": f"PSU {psu_wattage}W may be insufficient. Recommended: {recommended_wattage:.0f}W"
-                })
+    except Exception as e:
+        logger.error(f"Error checking compatibility: {str(e)}")
+        return f"Error: {str(e)}"
+    finally:
+        db.close()
+
+
+@tool
+def check_builds_compatibility(builds: List[List[int]]) -> str:
+    """
+    Check compatibility of several candidate builds at once.
+    
+    Args:
+        builds: List of builds, each a list of component IDs
         
-        # Check form factor compatibility
-        if "motherboard" in comp_map and "case" in comp_map:
-            mobo = comp_map["motherboard"]
-            case = comp_map["case"]
-            
-            if mobo.form_factor and case.form_factor:
-                # Simplified check - in reality, need more complex logic
-                if mobo.form_factor not in case.form_factor:
-                    issues.append({
-                        "severity": "critical",
-                        "type": "form_factor_mismatch",
-                        "description": f"Motherboard {mobo.form_factor} may not fit in {case.form_factor} case"
-                    })
-                    compatible = False
+    Returns:
+        JSON list with one compatibility analysis per build, in input order
+    """
+    db = SessionLocal()
+    try:
+        # One statement evaluates every build instead of one tool call each
+        rows = db.execute(
+            text(
+                "SELECT check_build_compat(ARRAY(SELECT jsonb_array_elements_text(b.ids)::int)) "
+                "FROM jsonb_array_elements(CAST(:builds AS jsonb)) WITH ORDINALITY AS b(ids, ord) "
+                "ORDER BY b.ord"
+            ),
+            {"builds": json.dumps([list(ids) for ids in builds])}
+        ).scalars().all()
         
-        result = {
-            "compatible": compatible,
-            "compatibility_score": 100 if compatible else (50 if issues else 100),
-            "issues": issues,
-            "total_tdp_watts": sum(comp.tdp_watts or 0 for comp in components)
-        }
+        results = []
+        for component_ids, compat in zip(builds, rows):
+            if compat["found"] != len(component_ids):
+                results.append({"component_ids": component_ids, "error": "Some component IDs not found"})
+                continue
+            results.append({"component_ids": component_ids, **_compat_summary(compat)})
         
-        logger.info(f"Compatibility check: {compatible}, {len(issues)} issues")
-        return str(result)
+        compatible = sum(1 for result in results if result.get("compatible"))
+        logger.info(f"Batch compatibility check: {compatible}/{len(results)} builds compatible")
+        return json.dumps(results, ensure_ascii=False, separators=(",", ":"), default=str)
         
     except Exception as e:
-        logger.error(f"Error checking compatibility: {str(e)}")
+        logger.error(f"Error checking builds compatibility: {str(e)}")
         return f"Error: {str(e)}"
     finally:
         db.close()
@@ -205,36 +293,77 @@ def normalize_price(price_str: str, source_currency: str = "DZD") -> str:
         source_currency: Source currency (DZD, USD, EUR)
 
     Returns:
-        Normalized price in DZD as string
+        Normalized price in whole DZD as string
     """
-    from app.core.config import settings
-    import re
-
     try:
         # Extract numeric value
         price_str = price_str.replace(",", "").replace(" ", "")
-        match = re.search(r"(\d+(?:\.\d+)?)", price_str)
+        match = _PRICE_RE.search(price_str)
 
         if not match:
             return "Error: Could not extract price"
 
         price = float(match.group(1))
 
-        # Convert to DZD
-        if source_currency == "USD":
-            price_dzd = price * settings.USD_TO_DZD_RATE
-        elif source_currency == "EUR":
-            price_dzd = price * settings.EUR_TO_DZD_RATE
-        else:
-            price_dzd = price
+        # Convert to DZD; unknown currencies are taken as DZD
+        price_dzd = price * _CURRENCY_RATES_DZD.get(source_currency, 1.0)
 
-        return str(price_dzd)
+        return str(round(price_dzd))
 
     except Exception as e:
         logger.error(f"Error normalizing price: {str(e)}")
         return f"Error: {str(e)}"
 
 
+def _rating_components(db: Session, component_ids: List[int]) -> List[Any]:
+    """Fetch the rows rate_build needs, reusing rows shared within the request."""
+    # Rows already fetched earlier in this recommendation are reused
+    shared_rows = _rating_rows.get()
+    rows = {} if shared_rows is None else {
+        component_id: shared_rows[component_id]
+        for component_id in component_ids
+        if component_id in shared_rows
+    }
+    missing_ids = [component_id for component_id in component_ids if component_id not in rows]
+    
+    if missing_ids:
+        # Plain rows with only the rated columns; no ORM instances to hydrate
+        fetched = db.query(
+            Component.id,
+            Component.component_type,
+            Component.capacity_gb,
+            ComponentScore.gaming_score,
+            ComponentScore.productivity_score,
+            ComponentScore.ai_score
+        ).outerjoin(
+            Component.scores
+        ).filter(
+            Component.id.in_(missing_ids)
+        ).all()
+        rows.update((row.id, row) for row in fetched)
+        if shared_rows is not None:
+            shared_rows.update(rows)
+    
+    return list(rows.values())
+
+
+def _performance_summary(components: List[Any], use_case: str) -> Dict[str, Any]:
+    """Rate a build's rows for a use case."""
+    comp_map = {comp.component_type.value: comp for comp in components}
+
+    scores = rate_build(comp_map)
+
+    # Get use-case specific score
+    use_case_score = scores.get(use_case, scores["overall"])
+
+    return {
+        "use_case": use_case,
+        "use_case_score": use_case_score,
+        "all_scores": scores,
+        "rating": "excellent" if use_case_score >= 80 else "good" if use_case_score >= 60 else "fair"
+    }
+
+
 @tool
 def rate_performance(component_ids: List[int], use_case: str) -> str:
     """
@@ -249,65 +378,52 @@ def rate_performance(component_ids: List[int], use_case: str) -> str:
     """
     db = SessionLocal()
     try:
-        components = db.query(Component).filter(
-            Component.id.in_(component_ids)
-        ).all()
+        result = _performance_summary(_rating_components(db, component_ids), use_case)
+        use_case_score = result["use_case_score"]
 
-        comp_map = {comp.component_type.value: comp for comp in components}
-
-        # Calculate use-case specific scores
-        scores = {
-            "gaming": 0,
-            "productivity": 0,
-            "ai_ml": 0,
-            "overall": 0
-        }
+        logger.info(f"Performance rating for {use_case}: {use_case_score:.1f}")
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str)
 
-        # GPU heavily influences gaming and AI
-        if "gpu" in comp_map:
-            gpu = comp_map["gpu"]
-            scores["gaming"] += (gpu.gaming_score or 0) * 0.6
-            scores["ai_ml"] += (gpu.ai_score or 0) * 0.7
-            scores["productivity"] += (gpu.productivity_score or 0) * 0.3
-
-        # CPU influences all workloads
-        if "cpu" in comp_map:
-            cpu = comp_map["cpu"]
-            scores["gaming"] += (cpu.gaming_score or 0) * 0.3
-            scores["ai_ml"] += (cpu.ai_score or 0) * 0.2
-            scores["productivity"] += (cpu.productivity_score or 0) * 0.5
-
-        # RAM influences productivity and AI
-        if "ram" in comp_map:
-            ram = comp_map["ram"]
-            ram_capacity = ram.specs.get("capacity_gb", 0) if ram.specs else 0
-            ram_score = min(ram_capacity / 32 * 100, 100)  # Normalize to 32GB
-            scores["productivity"] += ram_score * 0.2
-            scores["ai_ml"] += ram_score * 0.1
-
-        # Calculate overall score
-        scores["overall"] = (
-            scores["gaming"] * 0.33 +
-            scores["productivity"] * 0.33 +
-            scores["ai_ml"] * 0.34
-        )
+    except Exception as e:
+        logger.error(f"Error rating performance: {str(e)}")
+        return f"Error: {str(e)}"
+    finally:
+        db.close()
 
-        # Get use-case specific score
-        use_case_score = scores.get(use_case, scores["overall"])
 
+@tool
+def evaluate_build(component_ids: List[int], use_case: str) -> str:
+    """
+    Check compatibility and rate performance of a build in one call.
+    
+    Args:
+        component_ids: List of component IDs in the build
+        use_case: Use case to rate for (gaming, productivity, ai_ml, etc.)
+        
+    Returns:
+        JSON string with the compatibility analysis and performance ratings
+    """
+    db = SessionLocal()
+    try:
+        # Both checks share one session instead of one tool call each
+        compat = build_compat(db, component_ids)
+        
+        if compat["found"] != len(component_ids):
+            return "Error: Some component IDs not found"
+        
         result = {
-            "use_case": use_case,
-            "use_case_score": use_case_score,
-            "all_scores": scores,
-            "rating": "excellent" if use_case_score >= 80 else "good" if use_case_score >= 60 else "fair"
+            "compatibility": _compat_summary(compat),
+            "performance": _performance_summary(_rating_components(db, component_ids), use_case)
         }
-
-        logger.info(f"Performance rating for {use_case}: {use_case_score:.1f}")
-        return str(result)
-
+        
+        logger.info(
+            f"Build evaluation: compatible={result['compatibility']['compatible']}, "
+            f"{use_case} score {result['performance']['use_case_score']:.1f}"
+        )
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str)
+        
     except Exception as e:
-        logger.error(f"Error rating performance: {str(e)}")
+        logger.error(f"Error evaluating build: {str(e)}")
         return f"Error: {str(e)}"
     finally:
         db.close()
-
@@ -0,0 +1,51 @@
+"""In-process caching for agent tool queries."""
+import time
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from typing import Callable
+
+
+def ttl_cache(maxsize: int = 1024, ttl: float = 300):
+    """
+    Decorator for an LRU cache whose entries also expire after a fixed TTL.
+    
+    Tools run in worker threads under the async agent, so access is locked.
+    Exceptions are not cached.
+    
+    Args:
+        maxsize: Maximum number of cached entries
+        ttl: Time to live in seconds
+    """
+    def decorator(func: Callable) -> Callable:
+        entries = OrderedDict()
+        lock = Lock()
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            
+            with lock:
+                entry = entries.get(key)
+                if entry is not None and entry[0] > now:
+                    entries.move_to_end(key)
+                    return entry[1]
+            
+            result = func(*args, **kwargs)
+            
+            with lock:
+                entries[key] = (now + ttl, result)
+                entries.move_to_end(key)
+                while len(entries) > maxsize:
+                    entries.popitem(last=False)
+            
+            return result
+        
+        def cache_clear():
+            with lock:
+                entries.clear()
+        
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
@@ -1,10 +1,13 @@
 """API routes for PC build recommendation system."""
-from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import func, text
+from functools import lru_cache
 from typing import Optional, List
 import structlog
-import json
+import orjson
 import re
 
 from app.db.database import get_db
@@ -15,26 +18,44 @@ from app.schemas.response import (
     ComponentListResponse,
     ComponentResponse,
     CompatibilityCheckResponse,
+    CompatibilityIssue,
     HealthResponse,
     ErrorResponse
 )
 from app.agent.pc_agent import PCBuildAgent
+from app.agent.tools import check_compatibility
+from app.parsers.agent_response_parser import parse_agent_response
 from app.core.cache import cached, cache
 from app.core.config import settings
 
 logger = structlog.get_logger()
 router = APIRouter()
 
-# Initialize agent (singleton)
-_agent_instance = None
+# Columns list_components needs, one per ComponentResponse field
+_LIST_COLUMNS = tuple(getattr(Component, field) for field in ComponentResponse.model_fields)
 
+_SUPPORTED_LOCALES = frozenset(settings.SUPPORTED_LOCALES)
 
-def get_agent() -> PCBuildAgent:
-    """Get or create agent instance."""
-    global _agent_instance
-    if _agent_instance is None:
-        _agent_instance = PCBuildAgent()
-    return _agent_instance
+def get_agent(request: Request) -> PCBuildAgent:
+    """Return the agent created for this worker at startup."""
+    agent = getattr(request.app.state, "agent", None)
+    if agent is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Recommendation agent is not available"
+        )
+    return agent
+
+
+@lru_cache(maxsize=512)
+def _parse_locale(accept_language: str) -> str:
+    """Pick the first supported locale from a raw Accept-Language header."""
+    for lang in accept_language.lower().split(","):
+        lang_code = lang.split(";")[0].strip()[:2]
+        if lang_code in _SUPPORTED_LOCALES:
+            return lang_code
+
+    return settings.DEFAULT_LOCALE
 
 
 def detect_locale(accept_language: Optional[str] = Header(None)) -> str:
@@ -42,14 +63,8 @@ def detect_locale(accept_language: Optional[str] = Header(None)) -> str:
     if not accept_language:
         return settings.DEFAULT_LOCALE
 
-    # Parse Accept-Language header
-    languages = accept_language.lower().split(",")
-    for lang in languages:
-        lang_code = lang.split(";")[0].strip()[:2]
-        if lang_code in settings.SUPPORTED_LOCALES:
-            return lang_code
-
-    return settings.DEFAULT_LOCALE
+    # Clients send a handful of distinct headers, so parses are cached
+    return _parse_locale(accept_language)
 
 
 @router.post(
@@ -73,11 +88,14 @@ async def recommend_pc_build(
     """
     try:
         logger.info(
-            f"Build request: {request.budget_dzd} DZD, {request.use_case}, locale: {request.locale}"
+            "build_request",
+            budget_dzd=request.budget_dzd,
+            use_case=request.use_case.value,
+            locale=request.locale.value
         )
 
         # Generate recommendation using agent
-        result = agent.recommend_build(
+        result = await agent.recommend_build(
             budget_dzd=request.budget_dzd,
             use_case=request.use_case.value,
             locale=request.locale.value,
@@ -90,10 +108,10 @@ async def recommend_pc_build(
                 detail=result.get("error", "Failed to generate recommendation")
             )
 
-        # Parse agent output and construct BuildRecommendation response
-        from app.parsers.agent_response_parser import parse_agent_response
-        
-        parsed_response = parse_agent_response(
+        # Parse agent output and construct BuildRecommendation response.
+        # Parsing looks components up in the database; keep it off the event loop
+        parsed_response = await run_in_threadpool(
+            parse_agent_response,
             agent_output=result.get("recommendation", ""),
             budget_dzd=request.budget_dzd,
             use_case=request.use_case.value,
@@ -113,19 +131,54 @@ async def recommend_pc_build(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in recommend_pc_build: {str(e)}")
+        logger.error("recommend_pc_build_failed", error=str(e))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
 
 
+@router.post("/recommend/stream")
+async def stream_pc_build(
+    request: BuildRequest,
+    agent: PCBuildAgent = Depends(get_agent)
+):
+    """
+    Stream a PC build recommendation as Server-Sent Events.
+
+    Each `data` event carries a `delta` with the next piece of the agent's
+    answer; a final `done` event (or `error`) closes the stream.
+    """
+    logger.info(
+        "stream_build_request",
+        budget_dzd=request.budget_dzd,
+        use_case=request.use_case.value,
+        locale=request.locale.value
+    )
+
+    async def events():
+        try:
+            async for chunk in agent.stream_build(
+                budget_dzd=request.budget_dzd,
+                use_case=request.use_case.value,
+                locale=request.locale.value,
+                preferences=request.preferences
+            ):
+                yield f"data: {orjson.dumps({'delta': chunk}).decode()}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            logger.error("stream_pc_build_failed", error=str(e))
+            yield f"event: error\ndata: {orjson.dumps({'detail': str(e)}).decode()}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @router.get(
     "/components",
     response_model=ComponentListResponse
 )
 @cached(prefix="components", ttl=1800)  # Cache for 30 minutes
-async def list_components(
+def list_components(
     query: ComponentQuery = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -133,8 +186,8 @@ async def list_components(
     List available PC components with filtering and pagination.
     """
     try:
-        # Build query
-        db_query = db.query(Component)
+        # Build query over plain columns; rows skip ORM hydration and the identity map
+        db_query = db.query(*_LIST_COLUMNS)
 
         if query.component_type:
             db_query = db_query.filter(Component.component_type == query.component_type)
@@ -158,15 +211,20 @@ async def list_components(
         if query.in_stock_only:
             db_query = db_query.filter(Component.in_stock == True)
 
-        # Get total count
-        total = db_query.count()
+        # Counting every match costs a full scan of the filtered set, so only do it on request
+        total = None
+        if query.include_total:
+            total = db_query.with_entities(func.count(Component.id)).scalar()
 
-        # Apply pagination
-        components = db_query.offset(query.offset).limit(query.limit).all()
+        # Fetch one extra row to tell whether another page follows
+        components = db_query.offset(query.offset).limit(query.limit + 1).all()
+        has_more = len(components) > query.limit
+        components = components[:query.limit]
 
         return ComponentListResponse(
-            components=[ComponentResponse.model_validate(c) for c in components],
+            components=[ComponentResponse(**row._mapping) for row in components],
             total=total,
+            has_more=has_more,
             limit=query.limit,
             offset=query.offset
         )
@@ -191,20 +249,38 @@ async def check_component_compatibility(
     Check compatibility between selected components.
     """
     try:
-        from app.agent.tools import check_compatibility
-
         # Use the tool directly
-        result_str = check_compatibility.invoke({"component_ids": request.component_ids})
+        result_str = await run_in_threadpool(
+            check_compatibility.invoke, {"component_ids": request.component_ids}
+        )
+
+        # The tool reports failures as "Error: ..." text instead of JSON
+        if result_str.startswith("Error"):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND if "IDs not found" in result_str else status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=result_str
+            )
 
-        # Parse result (simplified - in production, parse properly)
-        # TODO: Properly parse the tool output
+        result = orjson.loads(result_str)
         return CompatibilityCheckResponse(
-            compatible=True,
-            compatibility_score=100.0,
-            issues=[],
+            compatible=result["compatible"],
+            compatibility_score=result["compatibility_score"],
+            issues=[
+                CompatibilityIssue(
+                    severity=issue.get("severity", "warning"),
+                    # Rule results do not say which parts clash; report the whole build
+                    component_ids=request.component_ids,
+                    issue_type=issue.get("type", "unknown"),
+                    description=issue.get("description", ""),
+                    suggestion=issue.get("suggestion")
+                )
+                for issue in result["issues"]
+            ],
             recommendations=[]
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error checking compatibility: {str(e)}")
         raise HTTPException(
@@ -214,7 +290,7 @@ async def check_component_compatibility(
 
 
 @router.get("/health", response_model=HealthResponse)
-async def health_check(db: Session = Depends(get_db)):
+def health_check(request: Request, db: Session = Depends(get_db)):
     """
     Health check endpoint for monitoring.
     """
@@ -243,12 +319,11 @@ async def health_check(db: Session = Depends(get_db)):
     except Exception as e:
         health["redis"] = f"unhealthy: {str(e)}"
 
-    # Check LLM (basic check)
-    try:
-        agent = get_agent()
+    # Check LLM (agent is built once at startup)
+    if getattr(request.app.state, "agent", None) is not None:
         health["llm"] = f"healthy ({settings.LLM_PROVIDER})"
-    except Exception as e:
-        health["llm"] = f"unhealthy: {str(e)}"
+    else:
+        health["llm"] = "unhealthy: agent failed to initialize"
         health["status"] = "degraded"
 
     return HealthResponse(**health)
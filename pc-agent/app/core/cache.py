@@ -1,27 +1,52 @@
 """Redis caching layer for performance optimization."""
-import json
 import hashlib
+import time
+from collections import OrderedDict
+from threading import RLock
 from typing import Optional, Any, Callable
 from functools import wraps
+import orjson
 import redis
 import structlog
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
 
 logger = structlog.get_logger()
 
 
+def _serialize_default(value: Any) -> Any:
+    """Serialize values orjson has no native encoding for, such as Pydantic models."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
 class CacheManager:
     """Redis cache manager."""
     
     def __init__(self):
         """Initialize Redis connection."""
+        # Process-local LRU in front of Redis: key -> (expires_at, serialized value).
+        # Values are decoded on every read, like Redis hits, so each caller gets
+        # its own plain JSON value. Short TTL bounds staleness after
+        # invalidations from other processes.
+        self._local = OrderedDict()
+        self._local_lock = RLock()
+        
         try:
-            self.redis_client = redis.from_url(
+            # One bounded pool per process; MAX_CONNECTIONS is shared across workers.
+            # Callers wait for a free connection instead of opening unbounded extras.
+            pool = redis.BlockingConnectionPool.from_url(
                 settings.REDIS_URL,
-                decode_responses=True,
-                socket_connect_timeout=5
+                max_connections=max(settings.MAX_CONNECTIONS // settings.WORKER_COUNT, 1),
+                timeout=5,
+                decode_responses=False,  # orjson reads and writes bytes directly
+                socket_connect_timeout=5,
+                socket_keepalive=True,
+                health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL
             )
+            self.redis_client = redis.Redis(connection_pool=pool)
             self.redis_client.ping()
             logger.info("Redis connection established")
         except Exception as e:
@@ -30,20 +55,53 @@ class CacheManager:
     
     def _generate_key(self, prefix: str, *args, **kwargs) -> str:
         """Generate cache key from arguments."""
-        key_data = f"{prefix}:{args}:{sorted(kwargs.items())}"
-        key_hash = hashlib.md5(key_data.encode()).hexdigest()
+        key_data = repr((args, sorted(kwargs.items())))
+        # Non-cryptographic use; BLAKE2b is faster than MD5 and needs no extra dependency
+        key_hash = hashlib.blake2b(key_data.encode(), digest_size=16).hexdigest()
         return f"pcbuild:{prefix}:{key_hash}"
     
+    def _get_local(self, key: str) -> Optional[bytes]:
+        """Get serialized value from the in-process layer, dropping it if expired."""
+        with self._local_lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry[1]
+    
+    def _set_local(self, key: str, value: bytes, ttl: int) -> None:
+        """Store serialized value in the in-process layer, evicting least recently used entries."""
+        expires_at = time.monotonic() + min(ttl, settings.LOCAL_CACHE_TTL)
+        with self._local_lock:
+            self._local[key] = (expires_at, value)
+            self._local.move_to_end(key)
+            while len(self._local) > settings.LOCAL_CACHE_MAXSIZE:
+                self._local.popitem(last=False)
+    
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache."""
+        value = self._get_local(key)
+        if value is not None:
+            logger.debug(f"Local cache hit: {key}")
+            return orjson.loads(value)
+        
         if not self.redis_client:
             return None
         
         try:
-            value = self.redis_client.get(key)
+            # Value and remaining TTL in one round trip, so the local copy never outlives Redis
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.ttl(key)
+            value, ttl = pipe.execute()
             if value:
                 logger.debug(f"Cache hit: {key}")
-                return json.loads(value)
+                if ttl > 0:
+                    self._set_local(key, value, ttl)
+                return orjson.loads(value)
             logger.debug(f"Cache miss: {key}")
             return None
         except Exception as e:
@@ -57,8 +115,9 @@ class CacheManager:
         
         try:
             ttl = ttl or settings.REDIS_CACHE_TTL
-            serialized = json.dumps(value)
+            serialized = orjson.dumps(value, default=_serialize_default)
             self.redis_client.setex(key, ttl, serialized)
+            self._set_local(key, serialized, ttl)
             logger.debug(f"Cache set: {key} (TTL: {ttl}s)")
             return True
         except Exception as e:
@@ -67,6 +126,9 @@ class CacheManager:
     
     def delete(self, key: str) -> bool:
         """Delete key from cache."""
+        with self._local_lock:
+            self._local.pop(key, None)
+        
         if not self.redis_client:
             return False
         
@@ -80,6 +142,11 @@ class CacheManager:
     
     def clear_pattern(self, pattern: str) -> int:
         """Clear all keys matching pattern."""
+        local_prefix = f"pcbuild:{pattern}"
+        with self._local_lock:
+            for key in [key for key in self._local if key.startswith(local_prefix)]:
+                del self._local[key]
+        
         if not self.redis_client:
             return 0
         
@@ -98,6 +165,11 @@ class CacheManager:
 cache = CacheManager()
 
 
+def _key_kwargs(kwargs: dict) -> dict:
+    """Drop injected database sessions, whose repr differs per request, from key arguments."""
+    return {name: value for name, value in kwargs.items() if not isinstance(value, Session)}
+
+
 def cached(prefix: str, ttl: Optional[int] = None):
     """
     Decorator to cache function results (supports both sync and async).
@@ -107,7 +179,6 @@ def cached(prefix: str, ttl: Optional[int] = None):
         ttl: Time to live in seconds (optional)
     """
     def decorator(func: Callable) -> Callable:
-        import asyncio
         from inspect import iscoroutinefunction
         
         if iscoroutinefunction(func):
@@ -115,7 +186,7 @@ def cached(prefix: str, ttl: Optional[int] = None):
             @wraps(func)
             async def async_wrapper(*args, **kwargs):
                 # Generate cache key
-                cache_key = cache._generate_key(prefix, *args, **kwargs)
+                cache_key = cache._generate_key(prefix, *args, **_key_kwargs(kwargs))
                 
                 # Try to get from cache
                 cached_result = cache.get(cache_key)
@@ -125,8 +196,9 @@ def cached(prefix: str, ttl: Optional[int] = None):
                 # Execute async function
                 result = await func(*args, **kwargs)
                 
-                # Store in cache
-                cache.set(cache_key, result, ttl)
+                # Store in cache; None reads back as a miss, so it is not stored
+                if result is not None:
+                    cache.set(cache_key, result, ttl)
                 
                 return result
             
@@ -136,7 +208,7 @@ def cached(prefix: str, ttl: Optional[int] = None):
             @wraps(func)
             def sync_wrapper(*args, **kwargs):
                 # Generate cache key
-                cache_key = cache._generate_key(prefix, *args, **kwargs)
+                cache_key = cache._generate_key(prefix, *args, **_key_kwargs(kwargs))
                 
                 # Try to get from cache
                 cached_result = cache.get(cache_key)
@@ -146,8 +218,9 @@ def cached(prefix: str, ttl: Optional[int] = None):
                 # Execute function
                 result = func(*args, **kwargs)
                 
-                # Store in cache
-                cache.set(cache_key, result, ttl)
+                # Store in cache; None reads back as a miss, so it is not stored
+                if result is not None:
+                    cache.set(cache_key, result, ttl)
                 
                 return result
             
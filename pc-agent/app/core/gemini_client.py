@@ -1,4 +1,5 @@
 """Gemini AI client (legacy support)."""
+from threading import Lock
 import google.generativeai as genai
 from app.core.config import settings
 import structlog
@@ -6,12 +7,17 @@ import structlog
 logger = structlog.get_logger()
 
 _model = None
+_model_lock = Lock()
 
 
 def _get_model():
     """Get or create Gemini model instance."""
     global _model
-    if _model is None:
+    if _model is not None:
+        return _model
+    with _model_lock:
+        if _model is not None:
+            return _model
         if not settings.GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY not configured")
         try:
@@ -1,16 +1,33 @@
 """Database connection and session management."""
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-# Create database engine
+
+def _engine_url(database_url: str) -> URL:
+    """Run plain postgresql:// URLs on psycopg 3, which can prepare statements server-side."""
+    url = make_url(database_url)
+    if url.drivername in ("postgresql", "postgresql+psycopg2"):
+        url = url.set(drivername="postgresql+psycopg")
+    return url
+
+
+# Create database engine. The tool queries repeat with only their parameters
+# changing, so psycopg prepares them per connection once past the threshold.
 engine = create_engine(
-    settings.DATABASE_URL,
+    _engine_url(settings.DATABASE_URL),
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    echo=settings.DEBUG
+    # Keep enough connections warm for concurrent requests and their tool
+    # calls instead of opening overflow connections under normal load
+    pool_size=20,
+    max_overflow=10,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    echo=settings.DEBUG,
+    # Room for every tool, route and scraper statement shape in the compiled SQL cache
+    query_cache_size=1200,
+    connect_args={"prepare_threshold": settings.DB_PREPARE_THRESHOLD}
 )
 
 # Create session factory
@@ -1,13 +1,23 @@
 """SQLAlchemy models for hardware catalog."""
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON, Enum as SQLEnum
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, Float, DateTime, Boolean, Text, ForeignKey, Index, CheckConstraint,
+    Computed, MetaData, Table, DDL, event,
+    Enum as SQLEnum,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from datetime import datetime
+from typing import List, Type
 import enum
 
 from app.db.database import Base
 
 
+# Integer value of a numeric specs field, used by the generated spec columns
+SPEC_INT_SQL = "CASE WHEN jsonb_typeof(specs->'{field}') = 'number' THEN (specs->>'{field}')::numeric::integer END"
+
+
 class ComponentType(str, enum.Enum):
     """Hardware component types."""
     CPU = "cpu"
@@ -27,25 +37,46 @@ class Condition(str, enum.Enum):
     REFURBISHED = "refurbished"
 
 
+def _enum_values(enum_cls: Type[enum.Enum]) -> List[str]:
+    """Store enum values ("cpu"), not member names, in the database."""
+    return [member.value for member in enum_cls]
+
+
+def _varchar_enum(enum_cls: Type[enum.Enum]) -> SQLEnum:
+    """
+    Enum column stored as VARCHAR rather than a PostgreSQL ENUM type.
+    
+    Adding a value then only swaps a CHECK constraint instead of running
+    ALTER TYPE; Python code still reads and writes enum members.
+    """
+    return SQLEnum(enum_cls, native_enum=False, length=16, values_callable=_enum_values)
+
+
+def _sql_in_list(enum_cls: Type[enum.Enum]) -> str:
+    """Quoted, comma-separated enum values for CHECK constraints."""
+    return ", ".join(f"'{value}'" for value in _enum_values(enum_cls))
+
+
 class Component(Base):
     """Hardware component model."""
     __tablename__ = "components"
 
-    id = Column(Integer, primary_key=True, index=True)
-    component_type = Column(SQLEnum(ComponentType), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    # Type lookups are served by the composite indexes below, which lead with it
+    component_type = Column(_varchar_enum(ComponentType), nullable=False)
     
     # Basic info
     name = Column(String(500), nullable=False, index=True)
     manufacturer = Column(String(100), index=True)
     model = Column(String(200), index=True)
     
-    # Pricing (in DZD)
-    price_dzd = Column(Float, nullable=False, index=True)
+    # Pricing (whole DZD; the dinar has no fractional part in practice)
+    price_dzd = Column(BigInteger, nullable=False)
     original_price = Column(String(100))  # Original scraped price string
     
     # Availability
-    condition = Column(SQLEnum(Condition), default=Condition.NEW, index=True)
-    in_stock = Column(Boolean, default=True, index=True)
+    condition = Column(_varchar_enum(Condition), default=Condition.NEW, index=True)
+    in_stock = Column(Boolean, default=True)
     stock_quantity = Column(Integer, default=0)
     
     # Source
@@ -54,14 +85,15 @@ class Component(Base):
     seller_name = Column(String(200))
     seller_location = Column(String(200))  # Wilaya in Algeria
     
-    # Specifications (JSON for flexibility)
-    specs = Column(JSON)  # Store detailed specs as JSON
+    # Specifications (JSONB for flexibility and indexed containment queries)
+    specs = Column(JSONB)  # Store detailed specs as JSONB
+    # Hot spec fields promoted to stored columns; non-numeric values become NULL
+    wattage = Column(Integer, Computed(SPEC_INT_SQL.format(field="wattage"), persisted=True))  # For PSUs
+    capacity_gb = Column(Integer, Computed(SPEC_INT_SQL.format(field="capacity_gb"), persisted=True))  # For RAM/storage
     
-    # Performance benchmarks
+    # Performance benchmarks (use-case scores live in ComponentScore)
     benchmark_score = Column(Float)  # Overall performance score
-    gaming_score = Column(Float)
-    productivity_score = Column(Float)
-    ai_score = Column(Float)
+    value_ratio = Column(Float, Computed("benchmark_score / NULLIF(price_dzd, 0)", persisted=True))  # Score per DZD
     
     # Compatibility data
     socket_type = Column(String(50))  # For CPU/Motherboard
@@ -77,25 +109,57 @@ class Component(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_scraped_at = Column(DateTime(timezone=True))
     
+    # Localized fields keyed by locale: {"ar": {"name": ..., "description": ..., "features": ...}, ...}
+    i18n = Column(JSONB)
+    
+    # Pre-rendered LLM-facing summaries, maintained by a database trigger
+    card_en = Column(Text)
+    card_fr = Column(Text)
+    card_ar = Column(Text)
+    
     # Relationships
-    translations = relationship("ComponentTranslation", back_populates="component", cascade="all, delete-orphan")
+    scores = relationship("ComponentScore", back_populates="component", uselist=False, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        CheckConstraint(f"component_type IN ({_sql_in_list(ComponentType)})", name="ck_components_component_type"),
+        CheckConstraint(f"condition IN ({_sql_in_list(Condition)})", name="ck_components_condition"),
+        Index("ix_components_specs_gin", "specs", postgresql_using="gin", postgresql_ops={"specs": "jsonb_path_ops"}),
+        # Match get_parts: equality on type/stock, range on price, ordering by score
+        Index("ix_components_type_stock_price", "component_type", "in_stock", "price_dzd"),
+        Index("ix_components_type_bench", "component_type", benchmark_score.desc().nulls_last()),
+        # Only the rows the agent can recommend; mirrors the recommendable_components predicate
+        Index(
+            "ix_components_recommendable",
+            "component_type",
+            "price_dzd",
+            postgresql_include=["benchmark_score"],
+            postgresql_where=(in_stock == True) & benchmark_score.isnot(None) & (price_dzd > 0),
+        ),
+        # PSU wattage lookups ("PSUs of at least 750W")
+        Index("ix_components_psu_wattage", "wattage", postgresql_where=text("component_type = 'psu'")),
+        # Substring search in list_components (name ILIKE '%term%')
+        Index("ix_components_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        # Conflict target for the scraper's upserts; one row per listing
+        Index(
+            "ux_components_source_url",
+            "source_url",
+            unique=True,
+            postgresql_where=source_url.isnot(None),
+        ),
+    )
 
-class ComponentTranslation(Base):
-    """Multilingual translations for components."""
-    __tablename__ = "component_translations"
 
-    id = Column(Integer, primary_key=True, index=True)
-    component_id = Column(Integer, ForeignKey("components.id"), nullable=False)
-    
-    locale = Column(String(5), nullable=False, index=True)  # ar, fr, en
+class ComponentScore(Base):
+    """Use-case performance scores, kept narrow for the rating path."""
+    __tablename__ = "component_scores"
+
+    component_id = Column(Integer, ForeignKey("components.id", ondelete="CASCADE"), primary_key=True)
     
-    # Translated fields
-    name = Column(String(500))
-    description = Column(Text)
-    features = Column(Text)  # Bullet points or JSON
+    gaming_score = Column(Float)
+    productivity_score = Column(Float)
+    ai_score = Column(Float)
     
-    component = relationship("Component", back_populates="translations")
+    component = relationship("Component", back_populates="scores")
 
 
 class CompatibilityRule(Base):
@@ -104,17 +168,32 @@ class CompatibilityRule(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     
-    component_type_1 = Column(SQLEnum(ComponentType), nullable=False)
-    component_type_2 = Column(SQLEnum(ComponentType), nullable=False)
+    # Ordered pair: rule_logic field_1 reads the first type, field_2 the second
+    component_types = Column(ARRAY(_varchar_enum(ComponentType)), nullable=False)
     
     rule_type = Column(String(50), nullable=False)  # socket_match, power_requirement, etc.
-    rule_logic = Column(JSON)  # Store rule logic as JSON
+    rule_logic = Column(JSONB)  # Store rule logic as JSONB
     
     description = Column(Text)
     is_active = Column(Boolean, default=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        CheckConstraint("cardinality(component_types) = 2", name="ck_compatibility_rules_type_pair"),
+        CheckConstraint(
+            f"component_types <@ ARRAY[{_sql_in_list(ComponentType)}]::varchar[]",
+            name="ck_compatibility_rules_component_types",
+        ),
+        Index("ix_compatibility_rules_component_types_gin", "component_types", postgresql_using="gin"),
+        Index(
+            "ix_compatibility_rules_rule_logic_gin",
+            "rule_logic",
+            postgresql_using="gin",
+            postgresql_ops={"rule_logic": "jsonb_path_ops"},
+        ),
+    )
+
 
 class BuildConfiguration(Base):
     """Saved PC build configurations."""
@@ -129,7 +208,7 @@ class BuildConfiguration(Base):
     total_price_dzd = Column(Float)
     
     # Components (store IDs as JSON)
-    components = Column(JSON)  # {"cpu": 123, "gpu": 456, ...}
+    components = Column(JSONB)  # {"cpu": 123, "gpu": 456, ...}
     
     # Performance scores
     overall_score = Column(Float)
@@ -143,3 +222,206 @@ class BuildConfiguration(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+
+# Materialized view of in-stock, benchmarked components with a usable price.
+# It lives in its own MetaData so create_all() never tries to create it as a
+# table; the DDL hooks below create it alongside the components table instead.
+RECOMMENDABLE_COMPONENTS_VIEW = "recommendable_components"
+
+# Locales with a pre-rendered card column on components
+CARD_LOCALES = ("en", "fr", "ar")
+
+_view_metadata = MetaData()
+
+
+class RecommendableComponent(Base):
+    """Read-only mapping of the recommendable_components materialized view."""
+    __table__ = Table(
+        RECOMMENDABLE_COMPONENTS_VIEW,
+        _view_metadata,
+        Column("id", Integer, primary_key=True),
+        Column("component_type", _varchar_enum(ComponentType)),
+        Column("name", String(500)),
+        Column("price_dzd", BigInteger),
+        Column("condition", _varchar_enum(Condition)),
+        Column("benchmark_score", Float),
+        Column("value_ratio", Float),
+        Column("specs", JSONB),
+        Column("seller_location", String(200)),
+        Column("card_en", Text),
+        Column("card_fr", Text),
+        Column("card_ar", Text),
+    )
+
+
+# component_card() renders one line per component for the agent prompt,
+# preferring the translated name when one exists for the locale.
+COMPONENT_CARD_DDL = """
+    CREATE OR REPLACE FUNCTION component_card(c components, card_locale text) RETURNS text AS $$
+        SELECT concat_ws(' | ',
+            '#' || c.id,
+            COALESCE(c.i18n -> card_locale ->> 'name', c.name),
+            c.manufacturer,
+            c.price_dzd || ' DZD',
+            lower(c.condition::text),
+            'score ' || c.benchmark_score,
+            c.seller_location,
+            (SELECT string_agg(key || ': ' || value, ', ') FROM jsonb_each_text(c.specs))
+        )
+    $$ LANGUAGE sql STABLE;
+
+    CREATE OR REPLACE FUNCTION components_set_cards() RETURNS trigger AS $$
+    BEGIN
+        NEW.card_en := component_card(NEW, 'en');
+        NEW.card_fr := component_card(NEW, 'fr');
+        NEW.card_ar := component_card(NEW, 'ar');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS components_set_cards ON components;
+    CREATE TRIGGER components_set_cards
+        BEFORE INSERT OR UPDATE OF name, manufacturer, price_dzd, condition, benchmark_score, specs, i18n
+        ON components
+        FOR EACH ROW EXECUTE FUNCTION components_set_cards();
+"""
+
+RECOMMENDABLE_COMPONENTS_DDL = f"""
+    CREATE MATERIALIZED VIEW IF NOT EXISTS {RECOMMENDABLE_COMPONENTS_VIEW} AS
+    SELECT id, component_type, name, price_dzd, condition,
+           benchmark_score, value_ratio, specs, seller_location,
+           card_en, card_fr, card_ar
+    FROM components
+    WHERE in_stock = TRUE
+      AND benchmark_score IS NOT NULL
+      AND price_dzd > 0;
+    CREATE UNIQUE INDEX IF NOT EXISTS ix_recommendable_components_id
+        ON {RECOMMENDABLE_COMPONENTS_VIEW} (id);
+    CREATE INDEX IF NOT EXISTS ix_recommendable_components_type_price
+        ON {RECOMMENDABLE_COMPONENTS_VIEW} (component_type, price_dzd);
+    CREATE INDEX IF NOT EXISTS ix_recommendable_components_type_value
+        ON {RECOMMENDABLE_COMPONENTS_VIEW} (component_type, value_ratio DESC);
+"""
+
+# recommend_candidates() returns every component type's candidates in one
+# round trip: {"cpu": [card, ...], "gpu": [...], ...} for the given price caps.
+RECOMMEND_CANDIDATES_DDL = f"""
+    CREATE OR REPLACE FUNCTION recommend_candidates(price_caps jsonb, card_locale text, per_type int)
+    RETURNS json AS $$
+        SELECT json_object_agg(caps.key, (
+            SELECT COALESCE(json_agg(c.card), '[]'::json)
+            FROM (
+                SELECT CASE card_locale
+                           WHEN 'fr' THEN r.card_fr
+                           WHEN 'ar' THEN r.card_ar
+                           ELSE r.card_en
+                       END AS card
+                FROM {RECOMMENDABLE_COMPONENTS_VIEW} r
+                WHERE r.component_type = caps.key
+                  AND r.price_dzd <= caps.value::float8
+                ORDER BY r.value_ratio DESC
+                LIMIT per_type
+            ) c
+        ))
+        FROM jsonb_each_text(price_caps) AS caps
+    $$ LANGUAGE sql STABLE;
+"""
+
+# check_build_compat() evaluates the active compatibility_rules against a set of
+# component ids and returns {"found", "compatible", "issues", "total_tdp_watts"}.
+# DDL() applies %-formatting, hence the doubled %% in format() patterns.
+CHECK_BUILD_COMPAT_DDL = """
+    CREATE OR REPLACE FUNCTION check_build_compat(component_ids int[]) RETURNS json AS $$
+        WITH build AS (
+            SELECT c.component_type, c.tdp_watts, c.wattage, to_jsonb(c) AS doc
+            FROM components c
+            WHERE c.id = ANY(component_ids)
+        ),
+        rules AS (
+            SELECT * FROM compatibility_rules WHERE is_active
+        ),
+        field_rules AS (
+            -- Pairwise rules apply only when both of their types are in the build
+            SELECT * FROM rules
+            WHERE component_types <@ ARRAY(SELECT DISTINCT component_type FROM build)
+        ),
+        field_issues AS (
+            -- equals: both fields must match; compatible: field_2 must contain field_1
+            SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                   COALESCE(r.rule_logic->>'severity', 'critical') AS severity,
+                   format('%%s (%%s vs %%s)', r.description, v.value_1, v.value_2) AS description
+            FROM field_rules r
+            JOIN build a ON a.component_type = r.component_types[1]
+            JOIN build b ON b.component_type = r.component_types[2]
+            CROSS JOIN LATERAL (
+                SELECT a.doc->>(r.rule_logic->>'field_1') AS value_1,
+                       b.doc->>(r.rule_logic->>'field_2') AS value_2
+            ) v
+            WHERE r.rule_logic->>'operator' IN ('equals', 'compatible')
+              AND v.value_1 IS NOT NULL
+              AND v.value_2 IS NOT NULL
+              AND CASE r.rule_logic->>'operator'
+                      WHEN 'equals' THEN v.value_1 <> v.value_2
+                      ELSE strpos(v.value_2, v.value_1) = 0
+                  END
+        ),
+        power AS (
+            SELECT count(*) AS found,
+                   COALESCE(sum(tdp_watts), 0) AS total_tdp,
+                   COALESCE(sum(tdp_watts) FILTER (WHERE component_type <> 'psu'), 0) AS system_tdp,
+                   bool_or(component_type = 'psu') AS has_psu,
+                   COALESCE(max(wattage) FILTER (WHERE component_type = 'psu'), 0) AS psu_wattage
+            FROM build
+        ),
+        power_issues AS (
+            -- greater_than: PSU wattage must exceed the rest of the build's TDP times the multiplier
+            SELECT COALESCE(r.rule_logic->>'issue_type', r.rule_type) AS type,
+                   COALESCE(r.rule_logic->>'severity', 'warning') AS severity,
+                   format(
+                       'PSU %%sW may be insufficient. Recommended: %%sW',
+                       p.psu_wattage,
+                       round(p.system_tdp * (r.rule_logic->>'multiplier')::numeric)
+                   ) AS description
+            FROM rules r
+            CROSS JOIN power p
+            WHERE r.rule_logic->>'operator' = 'greater_than'
+              AND p.has_psu
+              AND p.psu_wattage < p.system_tdp * (r.rule_logic->>'multiplier')::numeric
+        ),
+        issues AS (
+            SELECT * FROM field_issues
+            UNION ALL
+            SELECT * FROM power_issues
+        )
+        SELECT json_build_object(
+            'found', p.found,
+            'compatible', NOT EXISTS (SELECT 1 FROM issues WHERE severity = 'critical'),
+            'issues', COALESCE(
+                (SELECT json_agg(json_build_object('severity', severity, 'type', type, 'description', description))
+                 FROM issues),
+                '[]'::json
+            ),
+            'total_tdp_watts', p.total_tdp
+        )
+        FROM power p
+    $$ LANGUAGE sql STABLE;
+"""
+
+# gin_trgm_ops needs the extension in place before the components indexes are built
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+# Registered on the metadata so every table exists before the functions that
+# read them are created; each statement is idempotent for repeat create_all() runs.
+for _ddl in (
+    COMPONENT_CARD_DDL,
+    RECOMMENDABLE_COMPONENTS_DDL,
+    RECOMMEND_CANDIDATES_DDL,
+    CHECK_BUILD_COMPAT_DDL,
+):
+    event.listen(Base.metadata, "after_create", DDL(_ddl))
+
+event.listen(
+    Component.__table__,
+    "before_drop",
+    DDL(f"DROP MATERIALIZED VIEW IF EXISTS {RECOMMENDABLE_COMPONENTS_VIEW}"),
+)
@@ -1,5 +1,11 @@
 import re
+from functools import lru_cache
 
+_PRICE_RE = re.compile(r"\d+[\.,]?\d*")
+
+
+# Scraped price strings repeat a lot across listings and refreshes
+@lru_cache(maxsize=8192)
 def normalize_price(price_str):
-    match = re.findall(r"\d+[\.,]?\d*", price_str)
-    return float(match[0].replace(",", "")) if match else None
+    match = _PRICE_RE.search(price_str)
+    return float(match.group(0).replace(",", "")) if match else None
@@ -1,17 +1,21 @@
+import re
+
+# One pass over the name; each group sets a feature bit
+_GPU_RE = re.compile(r"(rtx)|(rx)|(12gb|16gb)", re.IGNORECASE)
+_RTX, _RX, _VRAM = 1, 2, 4
+_FEATURE_SCORES = ((_RTX, 5), (_RX, 4), (_VRAM, 3))
+
+
 def score_gpu(gpu, usage):
-    score = 0
-    name = gpu["name"].lower()
+    features = 0
+    for match in _GPU_RE.finditer(gpu["name"]):
+        features |= 1 << (match.lastindex - 1)
 
-    if "rtx" in name:
-        score += 5
-    if "rx" in name:
-        score += 4
-    if "12gb" in name or "16gb" in name:
-        score += 3
+    score = sum(points for bit, points in _FEATURE_SCORES if features & bit)
     if "used" in gpu["condition"].lower():
         score += 1
 
-    if usage == "ai" and "rtx" in name:
+    if usage == "ai" and features & _RTX:
         score += 2
 
     return score
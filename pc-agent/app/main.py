@@ -1,11 +1,13 @@
 """Main FastAPI application for PC build recommendation system."""
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+import logging
 import structlog
 import time
 
+from app.agent.pc_agent import PCBuildAgent
 from app.api.routes import router
 from app.core.config import settings
 from app.db.database import init_db
@@ -16,7 +18,10 @@ structlog.configure(
         structlog.processors.TimeStamper(fmt="iso"),
         structlog.processors.add_log_level,
         structlog.processors.JSONRenderer()
-    ]
+    ],
+    # Calls below LOG_LEVEL return before any processor or renderer runs
+    wrapper_class=structlog.make_filtering_bound_logger(logging.getLevelName(settings.LOG_LEVEL.upper())),
+    cache_logger_on_first_use=True
 )
 
 logger = structlog.get_logger()
@@ -36,6 +41,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Database initialization failed: {str(e)}")
 
+    # Build the agent once per worker; routes read it from app.state
+    try:
+        app.state.agent = PCBuildAgent()
+    except Exception as e:
+        logger.error("agent_init_failed", error=str(e))
+        app.state.agent = None
+
     yield
 
     # Shutdown
@@ -49,7 +61,9 @@ app = FastAPI(
     description="AI-powered PC build recommendation system for the Algerian market",
     docs_url="/docs",
     redoc_url="/redoc",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # Responses are encoded with orjson rather than the stdlib json module
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -97,7 +111,7 @@ async def global_exception_handler(request: Request, exc: Exception):
         exc_info=True
     )
 
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
@@ -1,8 +1,11 @@
 """Parse agent response into structured BuildRecommendation."""
-import json
 import re
 from typing import Dict, Any, Optional, List
 from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import load_only
+import orjson
 import structlog
 
 from app.schemas.response import (
@@ -11,11 +14,84 @@ from app.schemas.response import (
     ComponentResponse,
     CompatibilityIssue,
 )
+from app.core.cache import cached
 from app.db.database import SessionLocal
 from app.db.models import Component
+from app.agent.tools import build_compat
 
 logger = structlog.get_logger()
 
+# Keywords that introduce each component type in the agent output
+_ID_KEYWORDS = {
+    "cpu": "cpu|processor",
+    "gpu": "gpu|graphics|video",
+    "motherboard": "motherboard|mobo|mainboard",
+    "ram": "ram|memory",
+    "storage": "storage|ssd|hdd|disk",
+    "psu": "psu|power",
+    "case": "case|chassis",
+}
+_NAME_KEYWORDS = {
+    "cpu": "cpu|processor",
+    "gpu": "gpu|graphics|video",
+    "motherboard": "motherboard|mobo",
+    "ram": "ram|memory",
+    "storage": "storage|ssd|hdd",
+    "psu": "psu|power",
+}
+
+
+# Parts a BuildRecommendation has a slot for
+_BUILD_SLOTS = ("cpu", "gpu", "motherboard", "ram", "storage", "psu")
+
+# Only the columns ComponentResponse shows; cards, i18n and source_url stay unloaded
+_RESPONSE_COLUMNS = tuple(getattr(Component, field) for field in ComponentResponse.model_fields)
+
+# Placeholder parts for the fallback response; constant, so validated once
+_UNKNOWN_BUILD_COMPONENTS = {
+    comp_type: BuildComponentDetail(
+        component=ComponentResponse(
+            id=0,
+            component_type=comp_type,
+            name="Unknown",
+            manufacturer=None,
+            model=None,
+            price_dzd=0,
+            condition="new",
+            in_stock=False,
+            source_platform="unknown",
+            seller_location=None,
+            specs=None,
+            benchmark_score=None,
+        ),
+        reason="Could not parse agent response",
+        alternatives=[]
+    )
+    for comp_type in _BUILD_SLOTS
+}
+
+
+def _keyword_alternation(keywords: Dict[str, str]) -> str:
+    """One named group per component type, so a match tells which type it found."""
+    return "|".join(f"(?P<{comp_type}>{pattern})" for comp_type, pattern in keywords.items())
+
+
+# Patterns like "CPU ID: 123" or "component_id: 456", all types in one scan.
+# Only the keyword is consumed; the rest sits in a lookahead so one type's
+# match cannot swallow the next type's keyword.
+_ID_RE = re.compile(rf'(?:{_keyword_alternation(_ID_KEYWORDS)})(?=.*?id[:\s]+(?P<id>\d+))', re.IGNORECASE)
+
+# Patterns like "CPU: Intel i5-12400" or "GPU: RTX 3060", all types in one scan
+_NAME_RE = re.compile(
+    rf'(?:{_keyword_alternation(_NAME_KEYWORDS)})(?=[:\s]+(?P<name>[A-Za-z0-9\s\-]+?)(?:\n|,|$))',
+    re.IGNORECASE
+)
+
+
+def _matched_type(match: "re.Match[str]", keywords: Dict[str, str]) -> str:
+    """Component type whose keyword group took part in the match."""
+    return next(comp_type for comp_type in keywords if match.group(comp_type) is not None)
+
 
 def parse_agent_response(
     agent_output: str,
@@ -37,15 +113,36 @@ def parse_agent_response(
     Returns:
         BuildRecommendation object or None if parsing fails
     """
+    parsed = _parse_agent_response(
+        agent_output=agent_output,
+        budget_dzd=budget_dzd,
+        use_case=use_case,
+        locale=locale,
+        db_session=db_session
+    )
+    if isinstance(parsed, dict):
+        # A cache hit is the stored JSON; drop its timestamp so the build is
+        # stamped when it is served, not when it was first parsed
+        parsed.pop("generated_at", None)
+        return BuildRecommendation.model_validate(parsed)
+    return parsed
+
+
+# Parsed builds depend on catalog prices, so they share the "recommendation"
+# prefix the scraper invalidates after refreshing components
+@cached(prefix="recommendation:parsed", ttl=600)
+def _parse_agent_response(
+    agent_output: str,
+    budget_dzd: float,
+    use_case: str,
+    locale: str,
+    db_session
+) -> Optional[BuildRecommendation]:
     try:
         # Try to extract JSON from response
-        json_match = re.search(r'\{[^{}]*\}', agent_output, re.DOTALL)
-        if json_match:
-            try:
-                data = json.loads(json_match.group(0))
-                return _parse_json_response(data, budget_dzd, use_case, locale, db_session)
-            except json.JSONDecodeError:
-                pass
+        data = _extract_json_object(agent_output)
+        if data is not None:
+            return _parse_json_response(data, budget_dzd, use_case, locale, db_session)
         
         # Try to extract component IDs from text
         component_ids = _extract_component_ids(agent_output)
@@ -66,24 +163,30 @@ def parse_agent_response(
         return None
 
 
+def _extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """Parse the whole output as a JSON object, else its outermost {...} span."""
+    candidates = [text]
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        candidates.append(text[start:end + 1])
+    
+    for candidate in candidates:
+        try:
+            data = orjson.loads(candidate)
+        except orjson.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return data
+    
+    return None
+
+
 def _extract_component_ids(text: str) -> Dict[str, int]:
     """Extract component IDs from agent text."""
     ids = {}
-    # Look for patterns like "CPU ID: 123" or "component_id: 456"
-    patterns = {
-        "cpu": r'(?:cpu|processor).*?id[:\s]+(\d+)',
-        "gpu": r'(?:gpu|graphics|video).*?id[:\s]+(\d+)',
-        "motherboard": r'(?:motherboard|mobo|mainboard).*?id[:\s]+(\d+)',
-        "ram": r'(?:ram|memory).*?id[:\s]+(\d+)',
-        "storage": r'(?:storage|ssd|hdd|disk).*?id[:\s]+(\d+)',
-        "psu": r'(?:psu|power).*?id[:\s]+(\d+)',
-        "case": r'(?:case|chassis).*?id[:\s]+(\d+)',
-    }
-    
-    for comp_type, pattern in patterns.items():
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            ids[comp_type] = int(match.group(1))
+    # The first mention of each type wins
+    for match in _ID_RE.finditer(text):
+        ids.setdefault(_matched_type(match, _ID_KEYWORDS), int(match.group("id")))
     
     return ids
 
@@ -91,24 +194,31 @@ def _extract_component_ids(text: str) -> Dict[str, int]:
 def _extract_component_names(text: str) -> Dict[str, str]:
     """Extract component names from agent text."""
     names = {}
-    # Look for patterns like "CPU: Intel i5-12400" or "GPU: RTX 3060"
-    patterns = {
-        "cpu": r'(?:cpu|processor)[:\s]+([A-Za-z0-9\s\-]+?)(?:\n|,|$)',
-        "gpu": r'(?:gpu|graphics|video)[:\s]+([A-Za-z0-9\s\-]+?)(?:\n|,|$)',
-        "motherboard": r'(?:motherboard|mobo)[:\s]+([A-Za-z0-9\s\-]+?)(?:\n|,|$)',
-        "ram": r'(?:ram|memory)[:\s]+([A-Za-z0-9\s\-]+?)(?:\n|,|$)',
-        "storage": r'(?:storage|ssd|hdd)[:\s]+([A-Za-z0-9\s\-]+?)(?:\n|,|$)',
-        "psu": r'(?:psu|power)[:\s]+([A-Za-z0-9\s\-]+?)(?:\n|,|$)',
-    }
-    
-    for comp_type, pattern in patterns.items():
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            names[comp_type] = match.group(1).strip()
+    # The first mention of each type wins
+    for match in _NAME_RE.finditer(text):
+        names.setdefault(_matched_type(match, _NAME_KEYWORDS), match.group("name").strip())
     
     return names
 
 
+def _component_response(comp: Component) -> ComponentResponse:
+    """ComponentResponse for a row just loaded from the database, skipping validation."""
+    return ComponentResponse.model_construct(
+        id=comp.id,
+        component_type=comp.component_type.value,
+        name=comp.name,
+        manufacturer=comp.manufacturer,
+        model=comp.model,
+        price_dzd=float(comp.price_dzd),
+        condition=comp.condition.value,
+        in_stock=comp.in_stock,
+        source_platform=comp.source_platform,
+        seller_location=comp.seller_location,
+        specs=comp.specs,
+        benchmark_score=comp.benchmark_score,
+    )
+
+
 def _build_from_component_ids(
     component_ids: Dict[str, int],
     budget_dzd: float,
@@ -117,11 +227,19 @@ def _build_from_component_ids(
     db_session
 ) -> Optional[BuildRecommendation]:
     """Build recommendation from component IDs."""
+    # One IN query for every part instead of one lookup per type
+    rows = db_session.query(Component).options(
+        load_only(*_RESPONSE_COLUMNS)
+    ).filter(
+        Component.id.in_(set(component_ids.values()))
+    ).all()
+    by_id = {row.id: row for row in rows}
+    
     components = {}
     total_price = 0.0
     
     for comp_type, comp_id in component_ids.items():
-        component = db_session.query(Component).filter(Component.id == comp_id).first()
+        component = by_id.get(comp_id)
         if component:
             components[comp_type] = component
             total_price += component.price_dzd
@@ -131,36 +249,39 @@ def _build_from_component_ids(
     
     # Build response
     build_components = {}
-    for comp_type in ["cpu", "gpu", "motherboard", "ram", "storage", "psu"]:
+    for comp_type in _BUILD_SLOTS:
         if comp_type in components:
             comp = components[comp_type]
-            build_components[comp_type] = BuildComponentDetail(
-                component=ComponentResponse.model_validate(comp),
+            build_components[comp_type] = BuildComponentDetail.model_construct(
+                component=_component_response(comp),
                 reason=f"Selected based on {use_case} requirements",
                 alternatives=[]
             )
     
-    # Check compatibility
+    # Check compatibility on this session; the function returns a dict, so
+    # there is no tool call or JSON round trip. A failed check only drops the
+    # issues: the savepoint keeps the request's transaction usable.
     comp_ids = list(component_ids.values())
-    from app.agent.tools import check_compatibility
-    compat_result = check_compatibility.invoke({"component_ids": comp_ids})
+    try:
+        with db_session.begin_nested():
+            compat_data = build_compat(db_session, comp_ids)
+    except SQLAlchemyError as e:
+        logger.error("compatibility_check_failed", component_ids=comp_ids, error=str(e))
+        compat_data = None
     
     compatibility_issues = []
-    try:
-        compat_data = eval(compat_result) if isinstance(compat_result, str) else compat_result
-        if not compat_data.get("compatible", True):
-            for issue in compat_data.get("issues", []):
-                compatibility_issues.append(
-                    CompatibilityIssue(
-                        severity=issue.get("severity", "warning"),
-                        component_ids=[comp_ids[0]],  # Simplified
-                        issue_type=issue.get("type", "unknown"),
-                        description=issue.get("description", ""),
-                        suggestion=issue.get("suggestion")
-                    )
+    # Unknown ids leave the check incomplete; its issues are not reported
+    if compat_data and compat_data["found"] == len(comp_ids) and not compat_data["compatible"]:
+        for issue in compat_data["issues"]:
+            compatibility_issues.append(
+                CompatibilityIssue(
+                    severity=issue.get("severity", "warning"),
+                    component_ids=[comp_ids[0]],  # Simplified
+                    issue_type=issue.get("type", "unknown"),
+                    description=issue.get("description", ""),
+                    suggestion=issue.get("suggestion")
                 )
-    except:
-        pass
+            )
     
     return BuildRecommendation(
         **build_components,
@@ -188,23 +309,26 @@ def _build_from_component_names(
     db_session
 ) -> Optional[BuildRecommendation]:
     """Build recommendation by searching for component names."""
-    # This is a simplified version - in production, use better matching
-    components = {}
-    
-    for comp_type, name in component_names.items():
-        # Search for component by name
-        component = db_session.query(Component).filter(
-            Component.name.ilike(f"%{name}%")
-        ).first()
-        
-        if component:
-            components[comp_type] = component
+    # Every name is searched in one statement. The ILIKE filter runs on the
+    # trigram index; among the matches of the right type, the closest name wins.
+    rows = db_session.execute(
+        text(
+            "SELECT n.comp_type, m.id "
+            "FROM unnest(CAST(:comp_types AS text[]), CAST(:names AS text[])) AS n(comp_type, name) "
+            "CROSS JOIN LATERAL ("
+            "SELECT id FROM components "
+            "WHERE component_type = n.comp_type AND name ILIKE '%' || n.name || '%' "
+            "ORDER BY similarity(name, n.name) DESC LIMIT 1"
+            ") m"
+        ),
+        {"comp_types": list(component_names), "names": list(component_names.values())}
+    ).all()
     
-    if not components:
+    if not rows:
         return None
     
     # Similar to _build_from_component_ids
-    component_ids = {k: v.id for k, v in components.items()}
+    component_ids = {comp_type: comp_id for comp_type, comp_id in rows}
     return _build_from_component_ids(component_ids, budget_dzd, use_case, locale, db_session)
 
 
@@ -218,7 +342,7 @@ def _parse_json_response(
     """Parse JSON response from agent."""
     # Extract component IDs or names from JSON
     component_ids = {}
-    for key in ["cpu", "gpu", "motherboard", "ram", "storage", "psu"]:
+    for key in _BUILD_SLOTS:
         if key in data:
             comp_data = data[key]
             if isinstance(comp_data, dict):
@@ -239,84 +363,7 @@ def _create_fallback_response(
 ) -> BuildRecommendation:
     """Create a fallback response when parsing fails."""
     return BuildRecommendation(
-        cpu=BuildComponentDetail(
-            component=ComponentResponse(
-                id=0,
-                component_type="cpu",
-                name="Unknown",
-                price_dzd=0,
-                condition="new",
-                in_stock=False,
-                source_platform="unknown",
-            ),
-            reason="Could not parse agent response",
-            alternatives=[]
-        ),
-        gpu=BuildComponentDetail(
-            component=ComponentResponse(
-                id=0,
-                component_type="gpu",
-                name="Unknown",
-                price_dzd=0,
-                condition="new",
-                in_stock=False,
-                source_platform="unknown",
-            ),
-            reason="Could not parse agent response",
-            alternatives=[]
-        ),
-        motherboard=BuildComponentDetail(
-            component=ComponentResponse(
-                id=0,
-                component_type="motherboard",
-                name="Unknown",
-                price_dzd=0,
-                condition="new",
-                in_stock=False,
-                source_platform="unknown",
-            ),
-            reason="Could not parse agent response",
-            alternatives=[]
-        ),
-        ram=BuildComponentDetail(
-            component=ComponentResponse(
-                id=0,
-                component_type="ram",
-                name="Unknown",
-                price_dzd=0,
-                condition="new",
-                in_stock=False,
-                source_platform="unknown",
-            ),
-            reason="Could not parse agent response",
-            alternatives=[]
-        ),
-        storage=BuildComponentDetail(
-            component=ComponentResponse(
-                id=0,
-                component_type="storage",
-                name="Unknown",
-                price_dzd=0,
-                condition="new",
-                in_stock=False,
-                source_platform="unknown",
-            ),
-            reason="Could not parse agent response",
-            alternatives=[]
-        ),
-        psu=BuildComponentDetail(
-            component=ComponentResponse(
-                id=0,
-                component_type="psu",
-                name="Unknown",
-                price_dzd=0,
-                condition="new",
-                in_stock=False,
-                source_platform="unknown",
-            ),
-            reason="Could not parse agent response",
-            alternatives=[]
-        ),
+        **_UNKNOWN_BUILD_COMPONENTS,
         total_price_dzd=0,
         budget_dzd=budget_dzd,
         budget_utilization=0,
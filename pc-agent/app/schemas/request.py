@@ -1,5 +1,5 @@
 """Request schemas for API endpoints."""
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from enum import Enum
 
@@ -32,7 +32,9 @@ class ComponentPreference(BaseModel):
 
 class BuildRequest(BaseModel):
     """Request schema for PC build recommendation."""
-    budget_dzd: float = Field(..., gt=0, description="Budget in Algerian Dinar")
+    # Below 30,000 DZD no complete build fits; above 10M is not a realistic request.
+    # Bounds are checked by pydantic-core rather than a Python validator.
+    budget_dzd: float = Field(..., ge=30_000, le=10_000_000, description="Budget in Algerian Dinar")
     use_case: UseCase = Field(..., description="Primary use case for the PC")
     locale: Locale = Field(default=Locale.FRENCH, description="Preferred language")
     
@@ -51,15 +53,6 @@ class BuildRequest(BaseModel):
     # Constraints
     max_power_consumption_watts: Optional[int] = None
     form_factor: Optional[str] = None  # ATX, mATX, ITX
-    
-    @field_validator('budget_dzd')
-    @classmethod
-    def validate_budget(cls, v):
-        if v < 30000:  
-            raise ValueError("Budget too low for a complete PC build")
-        if v > 10000000: 
-            raise ValueError("Budget exceeds reasonable limits")
-        return v
 
 
 class ComponentQuery(BaseModel):
@@ -73,6 +66,7 @@ class ComponentQuery(BaseModel):
     locale: Locale = Field(default=Locale.FRENCH)
     limit: int = Field(default=50, le=200)
     offset: int = Field(default=0, ge=0)
+    include_total: bool = Field(default=False, description="Also count all matching components")
 
 
 class CompatibilityCheckRequest(BaseModel):
@@ -1,7 +1,12 @@
 """Response schemas for API endpoints."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Dict, Optional, Any
-from datetime import datetime
+from datetime import datetime, timezone
+
+
+def _utcnow() -> datetime:
+    """Timezone-aware UTC timestamp; datetime.utcnow is deprecated."""
+    return datetime.now(timezone.utc)
 
 
 class ComponentResponse(BaseModel):
@@ -19,8 +24,7 @@ class ComponentResponse(BaseModel):
     specs: Optional[Dict[str, Any]]
     benchmark_score: Optional[float]
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class BuildComponentDetail(BaseModel):
@@ -72,7 +76,7 @@ class BuildRecommendation(BaseModel):
     # Metadata
     use_case: str
     locale: str
-    generated_at: datetime = Field(default_factory=datetime.utcnow)
+    generated_at: datetime = Field(default_factory=_utcnow)
     
     # AI explanation
     explanation: str = Field(..., description="Natural language explanation of the build")
@@ -81,7 +85,8 @@ class BuildRecommendation(BaseModel):
 class ComponentListResponse(BaseModel):
     """Paginated list of components."""
     components: List[ComponentResponse]
-    total: int
+    total: Optional[int] = None  # Only counted when include_total is requested
+    has_more: bool
     limit: int
     offset: int
 
@@ -100,7 +105,7 @@ class HealthResponse(BaseModel):
     database: str
     redis: str
     llm: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=_utcnow)
 
 
 class ErrorResponse(BaseModel):
@@ -1,14 +1,48 @@
 """Ouedkniss.dz scraper for PC components."""
+import asyncio
 import re
+import sys
 import time
 from typing import List, Dict, Optional, Any
-from bs4 import BeautifulSoup
-import requests
+from selectolax.lexbor import LexborHTMLParser, LexborNode
+import httpx
 from app.core.config import settings
 import structlog
 
 logger = structlog.get_logger()
 
+# A price followed by its currency, anywhere in a listing's text
+_PRICE_RE = re.compile(r'(\d+[\s,\.]*\d*)\s*(?:DA|DZD|د\.ج)', re.IGNORECASE)
+# Words marking a second-hand listing
+_USED_RE = re.compile(r"occasion|used|مستعمل|usagé", re.IGNORECASE)
+# The numeric part of a cleaned price string
+_PRICE_NUM_RE = re.compile(r"(\d+(?:\.\d+)?)")
+
+
+class _RateLimiter:
+    """Token bucket: bursts of up to `capacity` requests, `capacity` per `period` on average."""
+    
+    def __init__(self, capacity: int, period: float):
+        self._capacity = capacity
+        self._interval = period / capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) / self._interval)
+            self._updated = now
+            
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) * self._interval)
+                self._tokens = 1.0
+                self._updated = time.monotonic()
+            
+            self._tokens -= 1
+
 
 class OuedknissScraper:
     """Scraper for Ouedkniss.dz marketplace."""
@@ -18,7 +52,8 @@ class OuedknissScraper:
         "User-Agent": settings.SCRAPER_USER_AGENT,
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         "Accept-Language": "fr-DZ,fr;q=0.9,ar-DZ;q=0.8,ar;q=0.7,en;q=0.6",
-        "Accept-Encoding": "gzip, deflate, br",
+        # httpx decodes br and zstd when brotli and zstandard are installed
+        "Accept-Encoding": "gzip, deflate, br, zstd",
         "Connection": "keep-alive",
     }
     
@@ -34,10 +69,30 @@ class OuedknissScraper:
         "cooling": "informatique/composants-pc/refroidissement",
     }
     
-    def __init__(self):
-        """Initialize scraper."""
-        self.session = requests.Session()
-        self.session.headers.update(self.HEADERS)
+    # Responses worth retrying: throttling and transient server errors
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    RETRY_BACKOFF_SECONDS = 0.5
+    
+    # Listing patterns seen on Ouedkniss, most specific first:
+    # article tags, divs with specific classes
+    LISTING_SELECTORS = (
+        "article",
+        ".announce-card",
+        ".listing-card",
+        ".classified-card",
+        ".item-card",
+        "[data-id]",
+        ".product-item",
+    )
+    LISTING_SELECTOR = ", ".join(LISTING_SELECTORS)
+    FALLBACK_LISTING_SELECTOR = "a[href*='/store/'], a[href*='/annonce/']"
+    
+    # Field selectors, shared by every listing of a scrape run
+    TITLE_SELECTOR = ".title, .announce-title, h2, h3, h4, .name, [data-title], .product-title"
+    PRICE_SELECTOR = ".price, .announce-price, .prix, [data-price], .product-price, .amount"
+    LOCATION_SELECTOR = ".location, .wilaya, .localisation, .city, [data-location]"
+    LINK_SELECTOR = "a[href]"
+    DESCRIPTION_SELECTOR = ".description, .desc, .details, .summary"
     
     def scrape_category(
         self, 
@@ -60,62 +115,152 @@ class OuedknissScraper:
             logger.error(f"Unknown component type: {component_type}")
             return []
         
+        return self.scrape_categories([component_type], max_pages, wilaya)[component_type]
+    
+    def scrape_categories(
+        self,
+        component_types: List[str],
+        max_pages: int = 5,
+        wilaya: Optional[str] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Scrape several component categories over one connection pool.
+        
+        Args:
+            component_types: Types of component (gpu, cpu, etc.)
+            max_pages: Maximum number of pages to scrape per category
+            wilaya: Filter by wilaya (optional)
+            
+        Returns:
+            Component dictionaries by component type; unknown types are skipped
+        """
+        known_types = []
+        for component_type in component_types:
+            if component_type in self.CATEGORIES:
+                known_types.append(component_type)
+            else:
+                logger.error(f"Unknown component type: {component_type}")
+        
+        results = asyncio.run(self._scrape_categories_async(known_types, max_pages, wilaya))
+        
+        for component_type, components in results.items():
+            logger.info(f"Total {component_type} components scraped: {len(components)}")
+        return results
+    
+    async def _scrape_categories_async(
+        self,
+        component_types: List[str],
+        max_pages: int,
+        wilaya: Optional[str]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Scrape categories concurrently, sharing one client, rate limit and connections."""
+        # Pages are independent downloads, a few at once. Requests are rate
+        # limited on average, SCRAPER_CONCURRENCY per delay window, instead of
+        # sleeping after each page, so parsing never holds up the next fetch.
+        # Every category hits the same host, so the budget is shared by all.
+        semaphore = asyncio.Semaphore(settings.SCRAPER_CONCURRENCY)
+        limiter = _RateLimiter(settings.SCRAPER_CONCURRENCY, settings.SCRAPER_DELAY_SECONDS)
+        # Kept-alive connections reused by every page of every category; over
+        # HTTP/2 the pages share one connection as parallel streams, so a run
+        # does a single TLS handshake. The transport retries failed connects,
+        # _get_page retries bad statuses.
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=settings.SCRAPER_CONCURRENCY,
+                max_keepalive_connections=settings.SCRAPER_CONCURRENCY,
+            ),
+            retries=settings.SCRAPER_MAX_RETRIES,
+        )
+        
+        async with httpx.AsyncClient(headers=self.HEADERS, transport=transport, timeout=10) as client:
+            results = await asyncio.gather(*(
+                self._scrape_category_async(client, semaphore, limiter, component_type, max_pages, wilaya)
+                for component_type in component_types
+            ))
+        
+        return dict(zip(component_types, results))
+    
+    async def _scrape_category_async(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        limiter: _RateLimiter,
+        component_type: str,
+        max_pages: int,
+        wilaya: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Fetch the pages of a category concurrently and parse them in a thread pool."""
         category_path = self.CATEGORIES[component_type]
-        components = []
+        loop = asyncio.get_running_loop()
         
-        for page in range(1, max_pages + 1):
+        async def fetch_page(page: int) -> List[Dict[str, Any]]:
             try:
                 url = f"{self.BASE_URL}/{category_path}?page={page}"
                 if wilaya:
                     url += f"&wilaya={wilaya}"
                 
-                logger.info(f"Scraping {component_type} page {page}: {url}")
-                
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
+                async with semaphore:
+                    logger.info(f"Scraping {component_type} page {page}: {url}")
+                    
+                    response = await self._get_page(client, url, limiter)
                 
-                page_components = self._parse_listing_page(response.text, component_type)
-                components.extend(page_components)
+                # Parsing is CPU work; keep it off the event loop
+                page_components = await loop.run_in_executor(
+                    None, self._parse_listing_page, response.text, component_type
+                )
                 
                 logger.info(f"Found {len(page_components)} components on page {page}")
-                
-                # Respect rate limiting
-                time.sleep(settings.SCRAPER_DELAY_SECONDS)
+                return page_components
                 
             except Exception as e:
                 logger.error(f"Error scraping page {page}: {str(e)}")
-                continue
+                return []
         
-        logger.info(f"Total {component_type} components scraped: {len(components)}")
-        return components
+        pages = await asyncio.gather(*(fetch_page(page) for page in range(1, max_pages + 1)))
+        
+        # Keep page order, as the serial loop did
+        return [component for page_components in pages for component in page_components]
+    
+    async def _get_page(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        limiter: _RateLimiter
+    ) -> httpx.Response:
+        """GET a page, retrying throttling and server errors with exponential backoff."""
+        for attempt in range(settings.SCRAPER_MAX_RETRIES + 1):
+            # Respect rate limiting; retries count against it too
+            await limiter.acquire()
+            response = await client.get(url)
+            if response.status_code not in self.RETRY_STATUSES or attempt == settings.SCRAPER_MAX_RETRIES:
+                break
+            await asyncio.sleep(self.RETRY_BACKOFF_SECONDS * 2 ** attempt)
+        
+        response.raise_for_status()
+        return response
     
     def _parse_listing_page(self, html: str, component_type: str) -> List[Dict[str, Any]]:
         """Parse a listing page and extract component data."""
-        soup = BeautifulSoup(html, "html.parser")
+        # Lexbor builds the tree and matches selectors in C
+        tree = LexborHTMLParser(html)
         components = []
         
-        # Try multiple selector patterns for Ouedkniss
-        # Common patterns: article tags, divs with specific classes
-        selectors = [
-            "article",
-            ".announce-card",
-            ".listing-card",
-            ".classified-card",
-            ".item-card",
-            "[data-id]",
-            ".product-item",
-        ]
-        
-        listings = []
-        for selector in selectors:
-            listings = soup.select(selector)
-            if listings:
+        # One walk of the tree for every listing pattern
+        listings = tree.css(self.LISTING_SELECTOR)
+        
+        # The first pattern that matched anything wins, as when each was tried
+        # in turn; narrowing the matched nodes walks no further than the list
+        for selector in self.LISTING_SELECTORS:
+            matched = [node for node in listings if node.css_matches(selector)]
+            if matched:
                 logger.debug(f"Found listings using selector: {selector}")
+                listings = matched
                 break
         
         if not listings:
             # Fallback: try to find any link that might be a listing
-            listings = soup.select("a[href*='/store/'], a[href*='/annonce/']")
+            listings = tree.css(self.FALLBACK_LISTING_SELECTOR)
         
         for listing in listings:
             try:
@@ -128,34 +273,24 @@ class OuedknissScraper:
         
         return components
     
-    def _parse_listing_item(self, listing, component_type: str) -> Optional[Dict[str, Any]]:
+    def _parse_listing_item(self, listing: LexborNode, component_type: str) -> Optional[Dict[str, Any]]:
         """Parse a single listing item."""
         try:
-            # Extract title - try multiple selectors
-            title_elem = listing.select_one(
-                ".title, .announce-title, h2, h3, h4, .name, [data-title], .product-title"
-            )
-            if not title_elem:
-                # Try getting text from the listing itself
-                title = listing.get_text(strip=True)[:200]  # Limit length
-                if not title or len(title) < 5:
-                    return None
-            else:
-                title = title_elem.get_text(strip=True)
+            # Full listing text, extracted at most once for the price fallback and the condition
+            listing_text = None
             
-            # Extract price - try multiple selectors
-            price_elem = listing.select_one(
-                ".price, .announce-price, .prix, [data-price], .product-price, .amount"
-            )
+            # Extract price first - listings without one (ads, promos) are
+            # dropped before any other field is extracted
+            price_elem = listing.css_first(self.PRICE_SELECTOR)
             if not price_elem:
                 # Try to find price in text
                 price_text = None
-                listing_text = listing.get_text()
-                price_match = re.search(r'(\d+[\s,\.]*\d*)\s*(?:DA|DZD|د\.ج)', listing_text, re.IGNORECASE)
+                listing_text = listing.text()
+                price_match = _PRICE_RE.search(listing_text)
                 if price_match:
                     price_text = price_match.group(0)
             else:
-                price_text = price_elem.get_text(strip=True)
+                price_text = price_elem.text(strip=True)
             
             if not price_text:
                 return None
@@ -164,34 +299,44 @@ class OuedknissScraper:
             if not price_dzd or price_dzd <= 0:
                 return None
             
+            # Extract title - try multiple selectors
+            title_elem = listing.css_first(self.TITLE_SELECTOR)
+            if not title_elem:
+                # Try getting text from the listing itself
+                title = listing.text(strip=True)[:200]  # Limit length
+                if not title or len(title) < 5:
+                    return None
+            else:
+                title = title_elem.text(strip=True)
+            
             # Extract location
-            location_elem = listing.select_one(
-                ".location, .wilaya, .localisation, .city, [data-location]"
-            )
-            location = location_elem.get_text(strip=True) if location_elem else None
+            location_elem = listing.css_first(self.LOCATION_SELECTOR)
+            # A few dozen wilayas across thousands of listings; keep one copy of each
+            location = sys.intern(location_elem.text(strip=True)) if location_elem else None
             
             # Extract URL
-            link_elem = listing.select_one("a[href]")
+            link_elem = listing.css_first(self.LINK_SELECTOR)
             if not link_elem:
                 # If listing itself is a link
-                if listing.name == "a" and listing.get("href"):
+                if listing.tag == "a" and listing.attributes.get("href"):
                     link_elem = listing
                 else:
-                    link_elem = listing.find_parent("a")
+                    link_elem = self._find_parent_link(listing)
             
             url = None
             if link_elem:
-                url = link_elem.get("href")
+                url = link_elem.attributes.get("href")
                 if url and not url.startswith("http"):
                     url = f"{self.BASE_URL}{url}" if url.startswith("/") else f"{self.BASE_URL}/{url}"
             
             # Extract condition (new/used)
-            condition_text = listing.get_text().lower()
-            condition = "used" if any(word in condition_text for word in ["occasion", "used", "مستعمل", "usagé"]) else "new"
+            if listing_text is None:
+                listing_text = listing.text()
+            condition = "used" if _USED_RE.search(listing_text) else "new"
             
             # Extract description if available
-            desc_elem = listing.select_one(".description, .desc, .details, .summary")
-            description = desc_elem.get_text(strip=True) if desc_elem else ""
+            desc_elem = listing.css_first(self.DESCRIPTION_SELECTOR)
+            description = desc_elem.text(strip=True) if desc_elem else ""
             
             return {
                 "name": title,
@@ -209,15 +354,29 @@ class OuedknissScraper:
             logger.warning(f"Error parsing item: {str(e)}")
             return None
     
-    def _extract_price_dzd(self, price_text: str) -> Optional[float]:
-        """Extract numeric price in DZD from price string."""
+    @staticmethod
+    def _find_parent_link(node: LexborNode) -> Optional[LexborNode]:
+        """Nearest enclosing <a> element, if any."""
+        parent = node.parent
+        while parent is not None:
+            if parent.tag == "a":
+                return parent
+            parent = parent.parent
+        return None
+    
+    def _extract_price_dzd(self, price_text: str) -> Optional[int]:
+        """Extract price in whole DZD from price string."""
         # Remove common currency symbols and text
         price_text = price_text.replace("DA", "").replace("DZD", "").replace("د.ج", "")
         price_text = price_text.replace(",", "").replace(" ", "")
         
+        # Usually only digits are left; int() those without running the regex
+        if price_text.isdecimal():
+            return int(price_text)
+        
         # Extract numeric value
-        match = re.search(r"(\d+(?:\.\d+)?)", price_text)
+        match = _PRICE_NUM_RE.search(price_text)
         if match:
-            return float(match.group(1))
+            return round(float(match.group(1)))
         return None
 
@@ -33,5 +33,9 @@ celery_app.conf.beat_schedule = {
         "task": "app.tasks.scraper_tasks.update_component_prices",
         "schedule": 3600.0,  # Every hour
     },
+    "refresh-recommendable-components": {
+        "task": "app.tasks.scraper_tasks.refresh_recommendable_components",
+        "schedule": 900.0,  # Every 15 minutes
+    },
 }
 
@@ -1,20 +1,31 @@
 """Celery tasks for web scraping."""
-from typing import List
+from typing import Any, Dict, List, Tuple
 import structlog
 from sqlalchemy.orm import Session
-from datetime import datetime
+from sqlalchemy import cast, func, literal_column, text
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from datetime import datetime, timezone
 
 from app.tasks.celery_app import celery_app
 from app.scrapers.ouedkniss_scraper import OuedknissScraper
 from app.db.database import SessionLocal
-from app.db.models import Component, ComponentType, Condition
+from app.db.models import (
+    Component,
+    ComponentScore,
+    ComponentType,
+    Condition,
+    RECOMMENDABLE_COMPONENTS_VIEW,
+)
 from app.core.cache import invalidate_cache
 from app.utils.name_parser import parse_component_name
 from app.utils.spec_extractor import extract_specs
-from app.utils.benchmark_calculator import calculate_benchmark_scores
+from app.utils.benchmark_calculator import calculate_benchmark_scores_batch
 
 logger = structlog.get_logger()
 
+# Rows per INSERT ... ON CONFLICT statement when saving scraped listings
+UPSERT_BATCH_SIZE = 500
+
 
 @celery_app.task(name="app.tasks.scraper_tasks.scrape_all_components")
 def scrape_all_components():
@@ -29,21 +40,229 @@ def scrape_all_components():
     
     total_scraped = 0
     
-    for comp_type in component_types:
-        try:
-            count = scrape_component_type(comp_type, max_pages=10)
-            total_scraped += count
-            logger.info(f"Scraped {count} {comp_type} components")
-        except Exception as e:
-            logger.error(f"Error scraping {comp_type}: {str(e)}")
+    # Every category over one client, sharing its connections and the
+    # per-host rate limit, then each category's rows are saved
+    try:
+        scraped = scraper.scrape_categories(component_types, max_pages=10)
+    except Exception as e:
+        logger.error(f"Error scraping components: {str(e)}")
+        scraped = {}
+    
+    for comp_type, components_data in scraped.items():
+        count = save_component_type(comp_type, components_data)
+        total_scraped += count
+        logger.info(f"Scraped {count} {comp_type} components")
+    
+    # A full scrape rewrites a large share of the table; refresh planner statistics
+    analyze_components()
     
-    # Invalidate component cache
+    # Refresh the view first: requests served while it refreshes would
+    # otherwise re-cache builds from the old contents for a full TTL
+    refresh_recommendable_components()
+    
+    # Invalidate component and recommendation caches
     invalidate_cache("components")
+    invalidate_cache("recommendation")
     
     logger.info(f"Daily scraping completed. Total: {total_scraped} components")
     return {"total_scraped": total_scraped}
 
 
+def _build_component_rows(
+    comp_data: Dict[str, Any],
+    specs: Dict[str, Any],
+    scores: Dict[str, float]
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Turn one scraped listing into components and component_scores column values.
+    
+    Args:
+        comp_data: Listing data returned by the scraper
+        specs: Specifications extracted from the listing
+        scores: Benchmark scores calculated from the specifications
+        
+    Returns:
+        Tuple of (component row, score row)
+    """
+    # Parse component name to extract manufacturer and model
+    name_data = parse_component_name(comp_data["name"], comp_data["component_type"])
+    
+    component_row = {
+        "component_type": ComponentType(comp_data["component_type"]),
+        "name": comp_data["name"],
+        "manufacturer": name_data.get("manufacturer"),
+        "model": name_data.get("model"),
+        "price_dzd": comp_data["price_dzd"],
+        "original_price": comp_data.get("original_price"),
+        "condition": Condition(comp_data.get("condition", "new")),
+        "in_stock": True,
+        "source_url": comp_data["source_url"],
+        "source_platform": comp_data.get("source_platform", "ouedkniss"),
+        "seller_location": comp_data.get("seller_location"),
+        "specs": specs,
+        "benchmark_score": scores.get("benchmark_score"),
+        # Compatibility data from specs
+        "socket_type": specs.get("socket_type"),
+        "ram_type": specs.get("ram_type"),
+        "ram_speed": specs.get("ram_speed"),
+        "tdp_watts": specs.get("tdp_watts"),
+        "form_factor": specs.get("form_factor"),
+        "last_scraped_at": datetime.now(timezone.utc),
+    }
+    score_row = {
+        "gaming_score": scores.get("gaming_score"),
+        "productivity_score": scores.get("productivity_score"),
+        "ai_score": scores.get("ai_score"),
+    }
+    return component_row, score_row
+
+
+def _component_upsert():
+    """INSERT ... ON CONFLICT for scraped components, keyed on source_url."""
+    stmt = insert(Component)
+    excluded = stmt.excluded
+    
+    # Refresh price and stock; keep known values where the new parse came up empty
+    return stmt.on_conflict_do_update(
+        index_elements=[Component.source_url],
+        index_where=Component.source_url.isnot(None),
+        set_={
+            "in_stock": True,
+            "last_scraped_at": excluded.last_scraped_at,
+            "price_dzd": excluded.price_dzd,
+            "manufacturer": func.coalesce(excluded.manufacturer, Component.manufacturer),
+            "model": func.coalesce(excluded.model, Component.model),
+            "specs": func.coalesce(func.nullif(excluded.specs, cast({}, JSONB)), Component.specs),
+            "benchmark_score": func.coalesce(excluded.benchmark_score, Component.benchmark_score),
+            "socket_type": func.coalesce(excluded.socket_type, Component.socket_type),
+            "ram_type": func.coalesce(excluded.ram_type, Component.ram_type),
+            "ram_speed": func.coalesce(excluded.ram_speed, Component.ram_speed),
+            "tdp_watts": func.coalesce(excluded.tdp_watts, Component.tdp_watts),
+            "form_factor": func.coalesce(excluded.form_factor, Component.form_factor),
+            "updated_at": func.now(),
+        }
+    ).returning(
+        Component.id,
+        Component.source_url,
+        # xmax is only zero on rows this statement inserted
+        literal_column("xmax = 0").label("inserted")
+    )
+
+
+def _score_upsert():
+    """INSERT ... ON CONFLICT for component_scores, keyed on component_id."""
+    stmt = insert(ComponentScore)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[ComponentScore.component_id],
+        set_={
+            "gaming_score": func.coalesce(excluded.gaming_score, ComponentScore.gaming_score),
+            "productivity_score": func.coalesce(excluded.productivity_score, ComponentScore.productivity_score),
+            "ai_score": func.coalesce(excluded.ai_score, ComponentScore.ai_score),
+        }
+    )
+
+
+# Built once and run as executemany, so SQLAlchemy compiles each statement a
+# single time and batches the parameter sets into multi-row INSERTs itself,
+# instead of compiling a fresh VALUES list of a few thousand binds per batch
+COMPONENT_UPSERT = _component_upsert()
+SCORE_UPSERT = _score_upsert()
+
+
+def _upsert_components(db: Session, rows: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> int:
+    """
+    Insert or update a batch of components, keyed on source_url.
+    
+    Args:
+        db: Database session
+        rows: (component row, score row) pairs with unique source URLs
+        
+    Returns:
+        Number of newly inserted components
+    """
+    upserted = db.execute(COMPONENT_UPSERT, [component_row for component_row, _ in rows]).all()
+    
+    score_rows = {component_row["source_url"]: score_row for component_row, score_row in rows}
+    db.execute(SCORE_UPSERT, [
+        {"component_id": row.id, **score_rows[row.source_url]} for row in upserted
+    ])
+    
+    return sum(1 for row in upserted if row.inserted)
+
+
+def save_scraped_components(db: Session, components_data: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Upsert scraped listings in batches of one statement each, committed together.
+    
+    Args:
+        db: Database session
+        components_data: Listings returned by the scraper
+        
+    Returns:
+        Tuple of (new components, updated components)
+    """
+    # Listings are identified by URL; the last occurrence of a URL wins
+    listings_by_url = {}
+    for comp_data in components_data:
+        if not comp_data.get("source_url"):
+            logger.warning("listing_without_url", name=comp_data.get("name"))
+            continue
+        listings_by_url[comp_data["source_url"]] = comp_data
+    
+    # Extract specifications
+    listings = []
+    listing_specs = []
+    for comp_data in listings_by_url.values():
+        try:
+            specs = extract_specs(
+                comp_data["component_type"], comp_data["name"], comp_data.get("description", "")
+            )
+        except Exception as e:
+            logger.error("prepare_component_failed", url=comp_data["source_url"], error=str(e))
+            continue
+        listings.append(comp_data)
+        listing_specs.append(specs)
+    
+    # Calculate benchmark scores for the whole scrape at once
+    listing_scores = calculate_benchmark_scores_batch(
+        [comp_data["component_type"] for comp_data in listings],
+        [comp_data["name"] for comp_data in listings],
+        listing_specs
+    )
+    
+    rows = []
+    for comp_data, specs, scores in zip(listings, listing_specs, listing_scores):
+        try:
+            rows.append(_build_component_rows(comp_data, specs, scores))
+        except Exception as e:
+            logger.error("prepare_component_failed", url=comp_data["source_url"], error=str(e))
+    
+    saved_count = 0
+    updated_count = 0
+    
+    # One transaction for the whole scrape. Each batch runs in a SAVEPOINT, so a
+    # failing batch is rolled back alone and the others still commit together.
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        batch = rows[start:start + UPSERT_BATCH_SIZE]
+        try:
+            with db.begin_nested():
+                inserted = _upsert_components(db, batch)
+            saved_count += inserted
+            updated_count += len(batch) - inserted
+        except Exception as e:
+            logger.error(f"Error saving components: {str(e)}")
+    
+    try:
+        db.commit()
+    except Exception as e:
+        logger.error(f"Error committing components: {str(e)}")
+        db.rollback()
+        return 0, 0
+    
+    return saved_count, updated_count
+
+
 def scrape_component_type(component_type: str, max_pages: int = 5) -> int:
     """
     Scrape a specific component type and save to database.
@@ -56,111 +275,61 @@ def scrape_component_type(component_type: str, max_pages: int = 5) -> int:
         Number of components scraped
     """
     scraper = OuedknissScraper()
-    db = SessionLocal()
     
     try:
         # Scrape components
         components_data = scraper.scrape_category(component_type, max_pages=max_pages)
+    except Exception as e:
+        logger.error(f"Error in scrape_component_type: {str(e)}")
+        return 0
+    
+    return save_component_type(component_type, components_data)
+
+
+def save_component_type(component_type: str, components_data: List[Dict[str, Any]]) -> int:
+    """
+    Save one category's scraped listings in a session of its own.
+    
+    Args:
+        component_type: Type of the scraped components
+        components_data: Listings returned by the scraper
         
-        saved_count = 0
-        
-        for comp_data in components_data:
-            try:
-                # Check if component already exists (by name and price)
-                existing = db.query(Component).filter(
-                    Component.name == comp_data["name"],
-                    Component.price_dzd == comp_data["price_dzd"]
-                ).first()
-                
-                # Parse component name to extract manufacturer and model
-                name_data = parse_component_name(comp_data["name"], comp_data["component_type"])
-                
-                # Extract specifications
-                description = comp_data.get("description", "")
-                specs = extract_specs(comp_data["component_type"], comp_data["name"], description)
-                
-                # Calculate benchmark scores
-                scores = calculate_benchmark_scores(
-                    comp_data["component_type"],
-                    comp_data["name"],
-                    specs
-                )
-                
-                # Extract compatibility data from specs
-                socket_type = specs.get("socket_type")
-                ram_type = specs.get("ram_type")
-                ram_speed = specs.get("ram_speed")
-                tdp_watts = specs.get("tdp_watts")
-                form_factor = specs.get("form_factor")
-                
-                if existing:
-                    # Update existing component
-                    existing.in_stock = True
-                    existing.last_scraped_at = datetime.utcnow()
-                    existing.price_dzd = comp_data["price_dzd"]
-                    existing.manufacturer = name_data.get("manufacturer") or existing.manufacturer
-                    existing.model = name_data.get("model") or existing.model
-                    existing.specs = specs or existing.specs
-                    existing.benchmark_score = scores.get("benchmark_score") or existing.benchmark_score
-                    existing.gaming_score = scores.get("gaming_score") or existing.gaming_score
-                    existing.productivity_score = scores.get("productivity_score") or existing.productivity_score
-                    existing.ai_score = scores.get("ai_score") or existing.ai_score
-                    if socket_type:
-                        existing.socket_type = socket_type
-                    if ram_type:
-                        existing.ram_type = ram_type
-                    if ram_speed:
-                        existing.ram_speed = ram_speed
-                    if tdp_watts:
-                        existing.tdp_watts = tdp_watts
-                    if form_factor:
-                        existing.form_factor = form_factor
-                else:
-                    # Create new component
-                    component = Component(
-                        component_type=ComponentType(comp_data["component_type"]),
-                        name=comp_data["name"],
-                        manufacturer=name_data.get("manufacturer"),
-                        model=name_data.get("model"),
-                        price_dzd=comp_data["price_dzd"],
-                        original_price=comp_data.get("original_price"),
-                        condition=Condition(comp_data.get("condition", "new")),
-                        in_stock=True,
-                        source_url=comp_data.get("source_url"),
-                        source_platform=comp_data.get("source_platform", "ouedkniss"),
-                        seller_location=comp_data.get("seller_location"),
-                        specs=specs,
-                        benchmark_score=scores.get("benchmark_score"),
-                        gaming_score=scores.get("gaming_score"),
-                        productivity_score=scores.get("productivity_score"),
-                        ai_score=scores.get("ai_score"),
-                        socket_type=socket_type,
-                        ram_type=ram_type,
-                        ram_speed=ram_speed,
-                        tdp_watts=tdp_watts,
-                        form_factor=form_factor,
-                        last_scraped_at=datetime.utcnow()
-                    )
-                    db.add(component)
-                    saved_count += 1
-                
-                db.commit()
-                
-            except Exception as e:
-                logger.error(f"Error saving component: {str(e)}")
-                db.rollback()
-                continue
+    Returns:
+        Number of new components
+    """
+    db = SessionLocal()
+    
+    try:
+        saved_count, _ = save_scraped_components(db, components_data)
         
         logger.info(f"Saved {saved_count} new {component_type} components")
         return saved_count
         
     except Exception as e:
-        logger.error(f"Error in scrape_component_type: {str(e)}")
+        logger.error(f"Error saving {component_type} components: {str(e)}")
         return 0
     finally:
         db.close()
 
 
+def analyze_components():
+    """
+    Refresh planner statistics for the tables the scraper bulk-writes.
+    """
+    db = SessionLocal()
+    
+    try:
+        db.execute(text("ANALYZE components, component_scores"))
+        db.commit()
+        logger.info("Analyzed components tables")
+        
+    except Exception as e:
+        logger.error(f"Error analyzing components: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+
+
 @celery_app.task(name="app.tasks.scraper_tasks.update_component_prices")
 def update_component_prices():
     """
@@ -170,19 +339,27 @@ def update_component_prices():
     logger.info("Starting hourly price update")
     
     # Quick scrape of first page for each category to update prices
+    scraper = OuedknissScraper()
     component_types = ["gpu", "cpu", "motherboard", "ram", "storage", "psu"]
     
     total_updated = 0
     
-    for comp_type in component_types:
-        try:
-            count = scrape_component_type(comp_type, max_pages=2)
-            total_updated += count
-        except Exception as e:
-            logger.error(f"Error updating {comp_type} prices: {str(e)}")
+    # Shared client and rate limit, as in the daily scrape
+    try:
+        scraped = scraper.scrape_categories(component_types, max_pages=2)
+    except Exception as e:
+        logger.error(f"Error updating prices: {str(e)}")
+        scraped = {}
+    
+    for comp_type, components_data in scraped.items():
+        total_updated += save_component_type(comp_type, components_data)
+    
+    # Refresh the view before invalidating, as after the daily scrape
+    refresh_recommendable_components()
     
     # Invalidate cache
     invalidate_cache("components")
+    invalidate_cache("recommendation")
     
     logger.info(f"Price update completed. Updated: {total_updated}")
     return {"total_updated": total_updated}
@@ -197,8 +374,8 @@ def mark_out_of_stock():
     
     try:
         # Mark components not scraped in last 48 hours as out of stock
-        from datetime import datetime, timedelta
-        cutoff = datetime.utcnow() - timedelta(hours=48)
+        from datetime import timedelta
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=48)
         
         updated = db.query(Component).filter(
             Component.last_scraped_at < cutoff,
@@ -217,3 +394,27 @@ def mark_out_of_stock():
     finally:
         db.close()
 
+
+
+@celery_app.task(name="app.tasks.scraper_tasks.refresh_recommendable_components")
+def refresh_recommendable_components():
+    """
+    Refresh the recommendable components materialized view.
+    Scheduled every 15 minutes and run after each scrape.
+    """
+    db = SessionLocal()
+    
+    try:
+        # CONCURRENTLY keeps the view readable by get_parts during the refresh
+        db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {RECOMMENDABLE_COMPONENTS_VIEW}"))
+        db.commit()
+        
+        logger.info("Refreshed recommendable components view")
+        return {"refreshed": True}
+        
+    except Exception as e:
+        logger.error(f"Error refreshing recommendable components: {str(e)}")
+        db.rollback()
+        return {"error": str(e)}
+    finally:
+        db.close()
@@ -1,5 +1,9 @@
 """Calculate benchmark scores for components."""
-from typing import Dict, Optional, Any
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Any
+
+import numpy as np
 
 
 # Base performance scores for common components (simplified - in production, use actual benchmark data)
@@ -37,24 +41,62 @@ GPU_SCORES = {
     "rx 6500": {"base": 35, "gaming": 45, "productivity": 30, "ai": 25},
 }
 
+# Order of the columns in the tier tables below and of the returned scores
+SCORE_FIELDS = ("benchmark_score", "gaming_score", "productivity_score", "ai_score")
+
+# Scores for names that match no tier
+CPU_DEFAULT_SCORES = {"base": 50.0, "gaming": 50.0, "productivity": 50.0, "ai": 45.0}
+GPU_DEFAULT_SCORES = {"base": 40.0, "gaming": 45.0, "productivity": 40.0, "ai": 35.0}
+
+
+def _tier_pattern(tiers: Dict[str, Dict[str, float]]) -> "re.Pattern[str]":
+    """
+    Every tier keyword in one pattern. The lookahead consumes nothing, so one
+    scan reports the keyword starting at each position, however they overlap.
+    """
+    return re.compile("(?=(" + "|".join(re.escape(key) for key in tiers) + "))")
+
+
+def _tier_table(tiers: Dict[str, Dict[str, float]], default: Dict[str, float]) -> np.ndarray:
+    """One row of scores per tier in dict order, plus the default as the last row."""
+    rows = list(tiers.values()) + [default]
+    return np.array(
+        [[row["base"], row["gaming"], row["productivity"], row["ai"]] for row in rows],
+        dtype=float
+    )
+
+
+_CPU_TIER_RE = _tier_pattern(CPU_SCORES)
+_GPU_TIER_RE = _tier_pattern(GPU_SCORES)
+_CPU_TIER_RANK = {key: rank for rank, key in enumerate(CPU_SCORES)}
+_GPU_TIER_RANK = {key: rank for rank, key in enumerate(GPU_SCORES)}
+_CPU_TABLE = _tier_table(CPU_SCORES, CPU_DEFAULT_SCORES)
+_GPU_TABLE = _tier_table(GPU_SCORES, GPU_DEFAULT_SCORES)
+
+
+def _tier_index(name: str, tier_re: "re.Pattern[str]", ranks: Dict[str, int]) -> int:
+    """Row of the earliest tier found in the name, or the default row."""
+    found = tier_re.findall(name.lower())
+    if not found:
+        return len(ranks)
+    return min(ranks[key] for key in found)
+
+
+# The same models are listed over and over; each name is scanned once per worker
+@lru_cache(maxsize=4096)
+def _cpu_tier(name: str) -> int:
+    return _tier_index(name, _CPU_TIER_RE, _CPU_TIER_RANK)
+
+
+@lru_cache(maxsize=4096)
+def _gpu_tier(name: str) -> int:
+    return _tier_index(name, _GPU_TIER_RE, _GPU_TIER_RANK)
+
 
 def calculate_cpu_scores(name: str, specs: Dict[str, Any]) -> Dict[str, float]:
     """Calculate CPU benchmark scores."""
-    name_lower = name.lower()
-    
     # Find matching CPU tier
-    base_score = 50.0
-    gaming_score = 50.0
-    productivity_score = 50.0
-    ai_score = 45.0
-    
-    for key, scores in CPU_SCORES.items():
-        if key in name_lower:
-            base_score = scores["base"]
-            gaming_score = scores["gaming"]
-            productivity_score = scores["productivity"]
-            ai_score = scores["ai"]
-            break
+    base_score, gaming_score, productivity_score, ai_score = _CPU_TABLE[_cpu_tier(name)].tolist()
     
     # Adjust based on specs
     cores = specs.get("cores", 0)
@@ -81,21 +123,8 @@ def calculate_cpu_scores(name: str, specs: Dict[str, Any]) -> Dict[str, float]:
 
 def calculate_gpu_scores(name: str, specs: Dict[str, Any]) -> Dict[str, float]:
     """Calculate GPU benchmark scores."""
-    name_lower = name.lower()
-    
     # Find matching GPU model
-    base_score = 40.0
-    gaming_score = 45.0
-    productivity_score = 40.0
-    ai_score = 35.0
-    
-    for key, scores in GPU_SCORES.items():
-        if key in name_lower:
-            base_score = scores["base"]
-            gaming_score = scores["gaming"]
-            productivity_score = scores["productivity"]
-            ai_score = scores["ai"]
-            break
+    base_score, gaming_score, productivity_score, ai_score = _GPU_TABLE[_gpu_tier(name)].tolist()
     
     # Adjust based on VRAM (important for AI)
     vram = specs.get("vram_gb", 0)
@@ -225,23 +254,109 @@ def calculate_benchmark_scores(component_type: str, name: str, specs: Dict[str,
     Returns:
         Dictionary with benchmark_score, gaming_score, productivity_score, ai_score
     """
-    calculators = {
-        "cpu": calculate_cpu_scores,
-        "gpu": calculate_gpu_scores,
-        "ram": calculate_ram_scores,
-        "storage": calculate_storage_scores,
-        "psu": calculate_psu_scores,
-    }
+    component_type = component_type.lower()
+    if component_type not in _CALCULATORS:
+        # Default scores for unknown components
+        return {
+            "benchmark_score": 50.0,
+            "gaming_score": 50.0,
+            "productivity_score": 50.0,
+            "ai_score": 50.0,
+        }
     
-    calculator = calculators.get(component_type.lower())
-    if calculator:
-        return calculator(name, specs)
+    # Specs of the scored types are flat scalars, so their sorted items make a
+    # hashable cache key (case specs hold a list, but cases are not scored)
+    return dict(zip(SCORE_FIELDS, _cached_scores(component_type, name, tuple(sorted(specs.items())))))
+
+
+_CALCULATORS = {
+    "cpu": calculate_cpu_scores,
+    "gpu": calculate_gpu_scores,
+    "ram": calculate_ram_scores,
+    "storage": calculate_storage_scores,
+    "psu": calculate_psu_scores,
+}
+
+
+@lru_cache(maxsize=4096)
+def _cached_scores(component_type: str, name: str, spec_items: tuple) -> tuple:
+    """Scores in SCORE_FIELDS order; repeated listings of a model are computed once."""
+    scores = _CALCULATORS[component_type](name, dict(spec_items))
+    return tuple(scores[field] for field in SCORE_FIELDS)
+
+
+def _cpu_scores_batch(names: List[str], specs: List[Dict[str, Any]]) -> np.ndarray:
+    """calculate_cpu_scores over a whole batch, as one (N, 4) array."""
+    scores = _CPU_TABLE[[_cpu_tier(name) for name in names]]
+    cores = np.array([spec.get("cores", 0) for spec in specs], dtype=float)
+    clock = np.array([spec.get("base_clock_ghz", 0) for spec in specs], dtype=float)
     
-    # Default scores for unknown components
-    return {
-        "benchmark_score": 50.0,
-        "gaming_score": 50.0,
-        "productivity_score": 50.0,
-        "ai_score": 50.0,
-    }
+    # More cores = better for productivity and AI; higher clock = better for gaming
+    scores[:, 2] += np.where(cores > 0, np.minimum(cores * 2, 20), 0)
+    scores[:, 3] += np.where(cores > 0, np.minimum(cores * 1.5, 15), 0)
+    scores[:, 1] += np.where(clock > 0, np.minimum((clock - 3.0) * 10, 15), 0)
+    return scores
+
+
+def _gpu_scores_batch(names: List[str], specs: List[Dict[str, Any]]) -> np.ndarray:
+    """calculate_gpu_scores over a whole batch, as one (N, 4) array."""
+    scores = _GPU_TABLE[[_gpu_tier(name) for name in names]]
+    vram = np.array([spec.get("vram_gb", 0) for spec in specs], dtype=float)
+    gddr6x = np.array([spec.get("memory_type") == "GDDR6X" for spec in specs], dtype=bool)
+    
+    # VRAM matters for AI; GDDR6X helps gaming and AI
+    scores[:, 3] += np.select([vram >= 24, vram >= 16, vram >= 12, vram >= 8], [20, 15, 10, 5], 0)
+    scores[:, 1] += 5 * gddr6x
+    scores[:, 3] += 5 * gddr6x
+    return scores
+
+
+_BATCH_CALCULATORS = {
+    "cpu": _cpu_scores_batch,
+    "gpu": _gpu_scores_batch,
+}
+
 
+def calculate_benchmark_scores_batch(
+    component_types: List[str],
+    names: List[str],
+    specs: List[Dict[str, Any]]
+) -> List[Dict[str, float]]:
+    """
+    Calculate benchmark scores for many components at once.
+    
+    CPUs and GPUs are scored as arrays, one per type; other types go through
+    calculate_benchmark_scores.
+    
+    Args:
+        component_types: Type of each component
+        names: Name of each component
+        specs: Specifications of each component
+        
+    Returns:
+        Score dictionaries in input order, as calculate_benchmark_scores returns them
+    """
+    results: List[Optional[Dict[str, float]]] = [None] * len(names)
+    
+    positions_by_type: Dict[str, List[int]] = {}
+    for position, component_type in enumerate(component_types):
+        positions_by_type.setdefault(component_type.lower(), []).append(position)
+    
+    for component_type, positions in positions_by_type.items():
+        batch_calculator = _BATCH_CALCULATORS.get(component_type)
+        if batch_calculator is None:
+            for position in positions:
+                results[position] = calculate_benchmark_scores(
+                    component_type, names[position], specs[position]
+                )
+            continue
+        
+        # Cap scores at 100
+        scores = np.minimum(
+            batch_calculator([names[p] for p in positions], [specs[p] for p in positions]),
+            100.0
+        )
+        for position, row in zip(positions, scores.tolist()):
+            results[position] = dict(zip(SCORE_FIELDS, row))
+    
+    return results
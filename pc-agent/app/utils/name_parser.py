@@ -1,5 +1,6 @@
 """Parse component names to extract manufacturer and model."""
 import re
+from functools import lru_cache
 from typing import Dict, Optional, Tuple
 
 # Common manufacturers
@@ -20,7 +21,6 @@ MANUFACTURERS = {
     "rtx": "NVIDIA",
     "gtx": "NVIDIA",
     "gt": "NVIDIA",
-    "amd": "AMD",
     "radeon": "AMD",
     "rx": "AMD",
     
@@ -28,7 +28,6 @@ MANUFACTURERS = {
     "asus": "ASUS",
     "msi": "MSI",
     "gigabyte": "Gigabyte",
-    "asus": "ASUS",
     "asrock": "ASRock",
     "evga": "EVGA",
     "biostar": "Biostar",
@@ -44,20 +43,14 @@ MANUFACTURERS = {
     "patriot": "Patriot",
     
     # Storage
-    "samsung": "Samsung",
     "western digital": "Western Digital",
     "wd": "Western Digital",
     "seagate": "Seagate",
-    "crucial": "Crucial",
-    "intel": "Intel",
-    "kingston": "Kingston",
     "sandisk": "SanDisk",
     "adata": "ADATA",
     
     # PSU
-    "corsair": "Corsair",
     "seasonic": "Seasonic",
-    "evga": "EVGA",
     "be quiet": "be quiet!",
     "cooler master": "Cooler Master",
     "thermaltake": "Thermaltake",
@@ -66,13 +59,30 @@ MANUFACTURERS = {
     # Case
     "nzxt": "NZXT",
     "fractal design": "Fractal Design",
-    "corsair": "Corsair",
-    "cooler master": "Cooler Master",
     "lian li": "Lian Li",
     "phanteks": "Phanteks",
-    "be quiet": "be quiet!",
 }
 
+# Every manufacturer keyword in one pattern, earlier dict entries first. The
+# lookahead consumes nothing, so one scan reports the keyword starting at each
+# position, however the keywords overlap.
+_MANUFACTURER_PRIORITY = {key: rank for rank, key in enumerate(MANUFACTURERS)}
+_MANUFACTURER_RE = re.compile(
+    "(?=(" + "|".join(re.escape(key) for key in MANUFACTURERS) + "))"
+)
+
+# Model number patterns, compiled once for every parsed listing
+# CPU: Intel Core i5-12400, AMD Ryzen 5 5600X
+_CPU_RE = re.compile(r'(?:Intel|AMD|Ryzen|Core|Pentium|Celeron|Threadripper|EPYC)\s+([A-Za-z0-9\-\s]+)', re.IGNORECASE)
+# GPU: RTX 3060, GTX 1660, RX 6600 XT
+_GPU_RE = re.compile(r'(?:RTX|GTX|GT|RX|Radeon|GeForce)\s*([0-9]+(?:\s*[A-Z]+)?)', re.IGNORECASE)
+# Motherboard: B550, X570, Z690, etc.
+_MOBO_RE = re.compile(r'([A-Z][0-9]+[A-Z]?[0-9]*)')
+# RAM: DDR4-3200, DDR5-6000
+_RAM_RE = re.compile(r'DDR[45][\-\s]*([0-9]+)', re.IGNORECASE)
+# Storage: 970 EVO, SN850, etc.
+_STORAGE_RE = re.compile(r'([A-Z0-9]+\s*[A-Z0-9]+)')
+
 
 def parse_component_name(name: str, component_type: str) -> Dict[str, Optional[str]]:
     """
@@ -88,15 +98,23 @@ def parse_component_name(name: str, component_type: str) -> Dict[str, Optional[s
     if not name:
         return {"manufacturer": None, "model": None}
     
+    # Callers get their own dict; the cached result is shared
+    manufacturer, model = _parse_component_name(name, component_type)
+    return {"manufacturer": manufacturer, "model": model}
+
+
+# The same models are listed over and over; each title is parsed once per worker
+@lru_cache(maxsize=4096)
+def _parse_component_name(name: str, component_type: str) -> Tuple[Optional[str], str]:
+    """(manufacturer, model) for a non-empty component name."""
     name_lower = name.lower()
     manufacturer = None
     model = None
     
-    # Try to find manufacturer
-    for key, value in MANUFACTURERS.items():
-        if key in name_lower:
-            manufacturer = value
-            break
+    # Try to find manufacturer; the earliest entry of MANUFACTURERS found anywhere wins
+    found = _MANUFACTURER_RE.findall(name_lower)
+    if found:
+        manufacturer = MANUFACTURERS[min(found, key=_MANUFACTURER_PRIORITY.__getitem__)]
     
     # Extract model number (common patterns)
     # For CPUs: Intel Core i5-12400, AMD Ryzen 5 5600X
@@ -105,37 +123,27 @@ def parse_component_name(name: str, component_type: str) -> Dict[str, Optional[s
     # For Storage: 970 EVO, SN850
     
     if component_type == "cpu":
-        # Pattern: Intel Core i5-12400, AMD Ryzen 5 5600X
-        cpu_pattern = r'(?:Intel|AMD|Ryzen|Core|Pentium|Celeron|Threadripper|EPYC)\s+([A-Za-z0-9\-\s]+)'
-        match = re.search(cpu_pattern, name, re.IGNORECASE)
+        match = _CPU_RE.search(name)
         if match:
             model = match.group(1).strip()
     
     elif component_type == "gpu":
-        # Pattern: RTX 3060, GTX 1660, RX 6600 XT
-        gpu_pattern = r'(?:RTX|GTX|GT|RX|Radeon|GeForce)\s*([0-9]+(?:\s*[A-Z]+)?)'
-        match = re.search(gpu_pattern, name, re.IGNORECASE)
+        match = _GPU_RE.search(name)
         if match:
             model = match.group(1).strip()
     
     elif component_type == "motherboard":
-        # Pattern: B550, X570, Z690, etc.
-        mobo_pattern = r'([A-Z][0-9]+[A-Z]?[0-9]*)'
-        match = re.search(mobo_pattern, name)
+        match = _MOBO_RE.search(name)
         if match:
             model = match.group(1)
     
     elif component_type == "ram":
-        # Pattern: DDR4-3200, DDR5-6000
-        ram_pattern = r'DDR[45][\-\s]*([0-9]+)'
-        match = re.search(ram_pattern, name, re.IGNORECASE)
+        match = _RAM_RE.search(name)
         if match:
             model = f"DDR{name_lower.count('ddr5') > 0 and '5' or '4'}-{match.group(1)}"
     
     elif component_type == "storage":
-        # Pattern: 970 EVO, SN850, etc.
-        storage_pattern = r'([A-Z0-9]+\s*[A-Z0-9]+)'
-        match = re.search(storage_pattern, name)
+        match = _STORAGE_RE.search(name)
         if match:
             model = match.group(1).strip()
     
@@ -147,8 +155,5 @@ def parse_component_name(name: str, component_type: str) -> Dict[str, Optional[s
         if len(filtered) > 1:
             model = ' '.join(filtered[1:3])  # Take 2-3 words after first
     
-    return {
-        "manufacturer": manufacturer,
-        "model": model or name[:100]  # Fallback to truncated name
-    }
+    return manufacturer, model or name[:100]  # Fallback to truncated name
 
@@ -1,46 +1,149 @@
 """Extract component specifications from names and descriptions."""
 import re
-from typing import Dict, Optional, Any
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+# Patterns shared by the extractors, compiled once for every listing
+_RE_WATTS = re.compile(r'(\d+)\s*w(?:atts?)?')
+_RE_MHZ = re.compile(r'(\d+)\s*mhz')
+_RE_GB_TB = re.compile(r'(\d+)\s*(gb|tb)')
+_UNIT_GB = {"gb": 1, "tb": 1000}
+
+# Every numeric spec of a component type in one pattern, one named group per
+# spec. The whole alternation is a lookahead, so nothing is consumed and a
+# single finditer() sees each spec at the same positions its own search would.
+_CPU_SPECS_RE = re.compile(
+    r'(?=(?P<cores>\d+)\s*(?:core|cores)'
+    r'|(?P<threads>\d+)\s*(?:thread|threads)'
+    r'|(?P<ghz>\d+\.?\d*)\s*ghz'
+    r'|(?P<tdp>\d+)\s*w(?:atts?)?)'
+)
+_GPU_SPECS_RE = re.compile(
+    r'(?=(?P<vram>\d+)\s*gb\s*vram'
+    r'|(?P<gddr>\d+)\s*gb\s*gddr'
+    r'|(?P<go>\d+)\s*go'  # French: gigaoctets
+    r'|(?P<tdp>\d+)\s*w(?:atts?)?)'
+)
+_RAM_SPECS_RE = re.compile(
+    r'(?=(?P<capacity>\d+)\s*gb'
+    r'|(?P<mhz>\d+)\s*mhz'
+    r'|ddr[45][\-\s]*(?P<ddr_speed>\d+))'
+)
+
+
+def _first_matches(pattern: "re.Pattern[str]", text: str) -> Dict[str, str]:
+    """First value of each named group of a spec pattern, in one scan of the text."""
+    found = {}
+    for match in pattern.finditer(text):
+        found.setdefault(match.lastgroup, match.group(match.lastgroup))
+    return found
+
+
+class _KeywordScanner:
+    """
+    Answers "is this keyword in the text?" for a fixed keyword list with one
+    scan of the text instead of one substring search per keyword.
+    """
+    
+    def __init__(self, *keyword_groups: Iterable[str]):
+        keywords = sorted({kw for group in keyword_groups for kw in group}, key=len, reverse=True)
+        # Zero-width, so every position is tried; longest first, so each position
+        # reports its longest keyword. Any other keyword starting there is a
+        # prefix of it, and _prefixes adds those back.
+        self._pattern = re.compile("(?=(" + "|".join(re.escape(kw) for kw in keywords) + "))")
+        self._prefixes = {
+            kw: frozenset(other for other in keywords if kw.startswith(other)) for kw in keywords
+        }
+    
+    def found(self, text: str) -> Set[str]:
+        """Every keyword that occurs anywhere in the text."""
+        found = set()
+        for kw in set(self._pattern.findall(text)):
+            found |= self._prefixes[kw]
+        return found
+
+
+# Keyword tables as (needle, value) pairs in priority order; the first needle
+# found in the text decides the value
+SOCKETS = (
+    ("lga1700", "LGA1700"),
+    ("lga1200", "LGA1200"),
+    ("lga1151", "LGA1151"),
+    ("am5", "AM5"),
+    ("am4", "AM4"),
+    ("am3", "AM3+"),
+)
+# Motherboards are not matched on AM3
+BOARD_SOCKETS = tuple((needle, value) for needle, value in SOCKETS if needle != "am3")
+CHIPSETS = ("b550", "x570", "b650", "x670", "z690", "z790", "b660", "h610")
+BOARD_FORM_FACTORS = (
+    ("atx", "ATX"),
+    ("matx", "mATX"),
+    ("micro atx", "mATX"),
+    ("itx", "ITX"),
+    ("mini itx", "ITX"),
+)
+RAM_TYPES = ("ddr5", "ddr4", "ddr3")
+EFFICIENCY_TIERS = (
+    ("80+ titanium", "80+ Titanium"),
+    ("80+ platinum", "80+ Platinum"),
+    ("80+ gold", "80+ Gold"),
+    ("80+ bronze", "80+ Bronze"),
+    ("80+ silver", "80+ Silver"),
+    ("80+", "80+"),
+)
+
+
+def _needles(table: Tuple[Tuple[str, str], ...]) -> Iterable[str]:
+    """Needles of a (needle, value) keyword table."""
+    return (needle for needle, _ in table)
+
+
+_CPU_KEYWORDS = _KeywordScanner(_needles(SOCKETS))
+_GPU_KEYWORDS = _KeywordScanner(["gddr6", "gd6", "gddr6x", "gddr5"])
+_BOARD_KEYWORDS = _KeywordScanner(
+    _needles(BOARD_SOCKETS), CHIPSETS, RAM_TYPES, _needles(BOARD_FORM_FACTORS)
+)
+_RAM_KEYWORDS = _KeywordScanner(RAM_TYPES)
+_STORAGE_KEYWORDS = _KeywordScanner(["nvme", "m.2", "pcie", "ssd", "hdd", "hard drive", "sata"])
+_PSU_KEYWORDS = _KeywordScanner(_needles(EFFICIENCY_TIERS))
+_CASE_KEYWORDS = _KeywordScanner(["atx", "matx", "micro atx", "itx", "mini itx"])
+# Supported form factors for each combination of the ATX, mATX and ITX bits
+_CASE_FORM_FACTORS = tuple(
+    tuple(name for bit, name in enumerate(("ATX", "mATX", "ITX")) if flags >> bit & 1)
+    for flags in range(8)
+)
 
 
 def extract_cpu_specs(name: str, description: str = "") -> Dict[str, Any]:
     """Extract CPU specifications."""
     text = f"{name} {description}".lower()
+    keywords = _CPU_KEYWORDS.found(text)
     specs = {}
     
     # Socket type
-    sockets = {
-        "lga1700": "LGA1700",
-        "lga1200": "LGA1200",
-        "lga1151": "LGA1151",
-        "am5": "AM5",
-        "am4": "AM4",
-        "am3": "AM3+",
-    }
-    for key, value in sockets.items():
-        if key in text:
+    for needle, value in SOCKETS:
+        if needle in keywords:
             specs["socket_type"] = value
             break
     
+    found = _first_matches(_CPU_SPECS_RE, text)
+    
     # Core count
-    core_match = re.search(r'(\d+)\s*(?:core|cores)', text)
-    if core_match:
-        specs["cores"] = int(core_match.group(1))
+    if "cores" in found:
+        specs["cores"] = int(found["cores"])
     
     # Thread count
-    thread_match = re.search(r'(\d+)\s*(?:thread|threads)', text)
-    if thread_match:
-        specs["threads"] = int(thread_match.group(1))
+    if "threads" in found:
+        specs["threads"] = int(found["threads"])
     
     # Clock speed
-    ghz_match = re.search(r'(\d+\.?\d*)\s*ghz', text)
-    if ghz_match:
-        specs["base_clock_ghz"] = float(ghz_match.group(1))
+    if "ghz" in found:
+        specs["base_clock_ghz"] = float(found["ghz"])
     
     # TDP
-    tdp_match = re.search(r'(\d+)\s*w(?:atts?)?', text)
-    if tdp_match:
-        specs["tdp_watts"] = int(tdp_match.group(1))
+    if "tdp" in found:
+        specs["tdp_watts"] = int(found["tdp"])
     
     return specs
 
@@ -48,32 +151,28 @@ def extract_cpu_specs(name: str, description: str = "") -> Dict[str, Any]:
 def extract_gpu_specs(name: str, description: str = "") -> Dict[str, Any]:
     """Extract GPU specifications."""
     text = f"{name} {description}".lower()
+    keywords = _GPU_KEYWORDS.found(text)
     specs = {}
     
-    # VRAM
-    vram_patterns = [
-        r'(\d+)\s*gb\s*vram',
-        r'(\d+)\s*gb\s*gddr',
-        r'(\d+)\s*go',  # French: gigaoctets
-    ]
-    for pattern in vram_patterns:
-        match = re.search(pattern, text)
-        if match:
-            specs["vram_gb"] = int(match.group(1))
+    found = _first_matches(_GPU_SPECS_RE, text)
+    
+    # VRAM, by the most explicit pattern that matched
+    for group in ("vram", "gddr", "go"):
+        if group in found:
+            specs["vram_gb"] = int(found[group])
             break
     
     # Memory type
-    if "gddr6" in text or "gd6" in text:
+    if "gddr6" in keywords or "gd6" in keywords:
         specs["memory_type"] = "GDDR6"
-    elif "gddr6x" in text:
+    elif "gddr6x" in keywords:
         specs["memory_type"] = "GDDR6X"
-    elif "gddr5" in text:
+    elif "gddr5" in keywords:
         specs["memory_type"] = "GDDR5"
     
     # TDP
-    tdp_match = re.search(r'(\d+)\s*w(?:atts?)?', text)
-    if tdp_match:
-        specs["tdp_watts"] = int(tdp_match.group(1))
+    if "tdp" in found:
+        specs["tdp_watts"] = int(found["tdp"])
     
     return specs
 
@@ -81,51 +180,35 @@ def extract_gpu_specs(name: str, description: str = "") -> Dict[str, Any]:
 def extract_motherboard_specs(name: str, description: str = "") -> Dict[str, Any]:
     """Extract motherboard specifications."""
     text = f"{name} {description}".lower()
+    keywords = _BOARD_KEYWORDS.found(text)
     specs = {}
     
     # Socket type
-    sockets = {
-        "lga1700": "LGA1700",
-        "lga1200": "LGA1200",
-        "lga1151": "LGA1151",
-        "am5": "AM5",
-        "am4": "AM4",
-    }
-    for key, value in sockets.items():
-        if key in text:
+    for needle, value in BOARD_SOCKETS:
+        if needle in keywords:
             specs["socket_type"] = value
             break
     
     # Chipset
-    chipsets = ["b550", "x570", "b650", "x670", "z690", "z790", "b660", "h610"]
-    for chipset in chipsets:
-        if chipset in text:
+    for chipset in CHIPSETS:
+        if chipset in keywords:
             specs["chipset"] = chipset.upper()
             break
     
     # RAM type
-    if "ddr5" in text:
-        specs["ram_type"] = "DDR5"
-    elif "ddr4" in text:
-        specs["ram_type"] = "DDR4"
-    elif "ddr3" in text:
-        specs["ram_type"] = "DDR3"
+    for ram_type in RAM_TYPES:
+        if ram_type in keywords:
+            specs["ram_type"] = ram_type.upper()
+            break
     
     # RAM speed
-    ram_speed_match = re.search(r'(\d+)\s*mhz', text)
+    ram_speed_match = _RE_MHZ.search(text)
     if ram_speed_match:
         specs["ram_speed"] = int(ram_speed_match.group(1))
     
     # Form factor
-    form_factors = {
-        "atx": "ATX",
-        "matx": "mATX",
-        "micro atx": "mATX",
-        "itx": "ITX",
-        "mini itx": "ITX",
-    }
-    for key, value in form_factors.items():
-        if key in text:
+    for needle, value in BOARD_FORM_FACTORS:
+        if needle in keywords:
             specs["form_factor"] = value
             break
     
@@ -135,30 +218,27 @@ def extract_motherboard_specs(name: str, description: str = "") -> Dict[str, Any
 def extract_ram_specs(name: str, description: str = "") -> Dict[str, Any]:
     """Extract RAM specifications."""
     text = f"{name} {description}".lower()
+    keywords = _RAM_KEYWORDS.found(text)
     specs = {}
     
+    found = _first_matches(_RAM_SPECS_RE, text)
+    
     # Capacity
-    capacity_match = re.search(r'(\d+)\s*gb', text)
-    if capacity_match:
-        specs["capacity_gb"] = int(capacity_match.group(1))
+    if "capacity" in found:
+        specs["capacity_gb"] = int(found["capacity"])
     
     # RAM type
-    if "ddr5" in text:
-        specs["ram_type"] = "DDR5"
-    elif "ddr4" in text:
-        specs["ram_type"] = "DDR4"
-    elif "ddr3" in text:
-        specs["ram_type"] = "DDR3"
+    for ram_type in RAM_TYPES:
+        if ram_type in keywords:
+            specs["ram_type"] = ram_type.upper()
+            break
     
     # Speed
-    speed_match = re.search(r'(\d+)\s*mhz', text)
-    if speed_match:
-        specs["ram_speed"] = int(speed_match.group(1))
-    else:
+    if "mhz" in found:
+        specs["ram_speed"] = int(found["mhz"])
+    elif "ddr_speed" in found:
         # Try DDR4-3200 format
-        ddr_match = re.search(r'ddr[45][\-\s]*(\d+)', text)
-        if ddr_match:
-            specs["ram_speed"] = int(ddr_match.group(1))
+        specs["ram_speed"] = int(found["ddr_speed"])
     
     return specs
 
@@ -166,28 +246,26 @@ def extract_ram_specs(name: str, description: str = "") -> Dict[str, Any]:
 def extract_storage_specs(name: str, description: str = "") -> Dict[str, Any]:
     """Extract storage specifications."""
     text = f"{name} {description}".lower()
+    keywords = _STORAGE_KEYWORDS.found(text)
     specs = {}
     
     # Capacity
-    capacity_match = re.search(r'(\d+)\s*(?:gb|tb)', text)
+    capacity_match = _RE_GB_TB.search(text)
     if capacity_match:
-        capacity = int(capacity_match.group(1))
-        if "tb" in text:
-            capacity *= 1000
-        specs["capacity_gb"] = capacity
+        specs["capacity_gb"] = int(capacity_match.group(1)) * _UNIT_GB[capacity_match.group(2)]
     
     # Type
-    if "nvme" in text or "m.2" in text or "pcie" in text:
+    if "nvme" in keywords or "m.2" in keywords or "pcie" in keywords:
         specs["type"] = "NVMe SSD"
-    elif "ssd" in text:
+    elif "ssd" in keywords:
         specs["type"] = "SSD"
-    elif "hdd" in text or "hard drive" in text:
+    elif "hdd" in keywords or "hard drive" in keywords:
         specs["type"] = "HDD"
     
     # Interface
-    if "sata" in text:
+    if "sata" in keywords:
         specs["interface"] = "SATA"
-    elif "nvme" in text or "m.2" in text:
+    elif "nvme" in keywords or "m.2" in keywords:
         specs["interface"] = "NVMe"
     
     return specs
@@ -196,26 +274,19 @@ def extract_storage_specs(name: str, description: str = "") -> Dict[str, Any]:
 def extract_psu_specs(name: str, description: str = "") -> Dict[str, Any]:
     """Extract PSU specifications."""
     text = f"{name} {description}".lower()
+    keywords = _PSU_KEYWORDS.found(text)
     specs = {}
     
     # Wattage
-    wattage_match = re.search(r'(\d+)\s*w(?:atts?)?', text)
+    wattage_match = _RE_WATTS.search(text)
     if wattage_match:
         specs["wattage"] = int(wattage_match.group(1))
     
     # Efficiency rating
-    if "80+ titanium" in text:
-        specs["efficiency"] = "80+ Titanium"
-    elif "80+ platinum" in text:
-        specs["efficiency"] = "80+ Platinum"
-    elif "80+ gold" in text:
-        specs["efficiency"] = "80+ Gold"
-    elif "80+ bronze" in text:
-        specs["efficiency"] = "80+ Bronze"
-    elif "80+ silver" in text:
-        specs["efficiency"] = "80+ Silver"
-    elif "80+" in text:
-        specs["efficiency"] = "80+"
+    for needle, value in EFFICIENCY_TIERS:
+        if needle in keywords:
+            specs["efficiency"] = value
+            break
     
     return specs
 
@@ -223,23 +294,48 @@ def extract_psu_specs(name: str, description: str = "") -> Dict[str, Any]:
 def extract_case_specs(name: str, description: str = "") -> Dict[str, Any]:
     """Extract case specifications."""
     text = f"{name} {description}".lower()
+    keywords = _CASE_KEYWORDS.found(text)
     specs = {}
     
-    # Form factor support
-    form_factors = []
-    if "atx" in text:
-        form_factors.append("ATX")
-    if "matx" in text or "micro atx" in text:
-        form_factors.append("mATX")
-    if "itx" in text or "mini itx" in text:
-        form_factors.append("ITX")
+    # Form factor support, one bit per form factor
+    flags = (
+        ("atx" in keywords)
+        | ("matx" in keywords or "micro atx" in keywords) << 1
+        | ("itx" in keywords or "mini itx" in keywords) << 2
+    )
     
-    if form_factors:
-        specs["form_factor"] = form_factors
+    if flags:
+        specs["form_factor"] = list(_CASE_FORM_FACTORS[flags])
     
     return specs
 
 
+_EXTRACTORS = {
+    "cpu": extract_cpu_specs,
+    "gpu": extract_gpu_specs,
+    "motherboard": extract_motherboard_specs,
+    "ram": extract_ram_specs,
+    "storage": extract_storage_specs,
+    "psu": extract_psu_specs,
+    "case": extract_case_specs,
+}
+
+# What a listing must contain for its extractor to find anything. Every socket,
+# chipset, memory type, clock, wattage and capacity has a digit in it; only form
+# factors and storage kinds are words. Listings that fail are skipped after one
+# scan instead of running every extractor pattern.
+_HAS_DIGIT = re.compile(r'\d')
+_SNIFFERS = {
+    "cpu": _HAS_DIGIT,
+    "gpu": _HAS_DIGIT,
+    "motherboard": re.compile(r'\d|atx|itx', re.IGNORECASE),
+    "ram": _HAS_DIGIT,
+    "storage": re.compile(r'\d|nvme|pcie|ssd|hdd|hard drive|sata', re.IGNORECASE),
+    "psu": _HAS_DIGIT,
+    "case": re.compile(r'atx|itx', re.IGNORECASE),
+}
+
+
 def extract_specs(component_type: str, name: str, description: str = "") -> Dict[str, Any]:
     """
     Extract specifications based on component type.
@@ -252,18 +348,15 @@ def extract_specs(component_type: str, name: str, description: str = "") -> Dict
     Returns:
         Dictionary of extracted specifications
     """
-    extractors = {
-        "cpu": extract_cpu_specs,
-        "gpu": extract_gpu_specs,
-        "motherboard": extract_motherboard_specs,
-        "ram": extract_ram_specs,
-        "storage": extract_storage_specs,
-        "psu": extract_psu_specs,
-        "case": extract_case_specs,
-    }
-    
-    extractor = extractors.get(component_type.lower())
-    if extractor:
+    # Callers get their own dict; the cached result is shared
+    return dict(_extract_specs(component_type.lower(), name, description))
+
+
+# Titles recur across pages and re-scrapes; each listing text is parsed once per worker
+@lru_cache(maxsize=8192)
+def _extract_specs(component_type: str, name: str, description: str) -> Dict[str, Any]:
+    extractor = _EXTRACTORS.get(component_type)
+    if extractor and _SNIFFERS[component_type].search(f"{name} {description}"):
         return extractor(name, description)
     
     return {}
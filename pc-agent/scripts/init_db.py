@@ -5,8 +5,17 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from sqlalchemy import insert, text
+
 from app.db.database import engine, Base, SessionLocal
-from app.db.models import Component, ComponentType, Condition, CompatibilityRule
+from app.db.models import (
+    Component,
+    ComponentScore,
+    ComponentType,
+    Condition,
+    CompatibilityRule,
+    RECOMMENDABLE_COMPONENTS_VIEW,
+)
 import structlog
 
 logger = structlog.get_logger()
@@ -14,75 +23,75 @@ logger = structlog.get_logger()
 
 def create_tables():
     """Create all database tables."""
-    logger.info("Creating database tables...")
+    logger.info("creating_tables")
     Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created successfully")
+    logger.info("tables_created")
 
 
 def seed_compatibility_rules():
     """Seed basic compatibility rules."""
-    logger.info("Seeding compatibility rules...")
+    logger.info("seeding_rules")
     
     db = SessionLocal()
     
     try:
         rules = [
             {
-                "component_type_1": ComponentType.CPU,
-                "component_type_2": ComponentType.MOTHERBOARD,
+                "component_types": [ComponentType.CPU, ComponentType.MOTHERBOARD],
                 "rule_type": "socket_match",
                 "rule_logic": {
                     "field_1": "socket_type",
                     "field_2": "socket_type",
-                    "operator": "equals"
+                    "operator": "equals",
+                    "issue_type": "socket_mismatch"
                 },
                 "description": "CPU and Motherboard must have matching socket types"
             },
             {
-                "component_type_1": ComponentType.RAM,
-                "component_type_2": ComponentType.MOTHERBOARD,
+                "component_types": [ComponentType.RAM, ComponentType.MOTHERBOARD],
                 "rule_type": "ram_type_match",
                 "rule_logic": {
                     "field_1": "ram_type",
                     "field_2": "ram_type",
-                    "operator": "equals"
+                    "operator": "equals",
+                    "issue_type": "ram_type_mismatch"
                 },
                 "description": "RAM and Motherboard must support the same RAM type (DDR4/DDR5)"
             },
             {
-                "component_type_1": ComponentType.PSU,
-                "component_type_2": ComponentType.GPU,
+                "component_types": [ComponentType.PSU, ComponentType.GPU],
                 "rule_type": "power_requirement",
                 "rule_logic": {
                     "psu_field": "wattage",
                     "component_field": "tdp_watts",
                     "operator": "greater_than",
-                    "multiplier": 1.3
+                    "multiplier": 1.3,
+                    "issue_type": "insufficient_psu",
+                    "severity": "warning"
                 },
                 "description": "PSU wattage must be 30% higher than total system TDP"
             },
             {
-                "component_type_1": ComponentType.MOTHERBOARD,
-                "component_type_2": ComponentType.CASE,
+                "component_types": [ComponentType.MOTHERBOARD, ComponentType.CASE],
                 "rule_type": "form_factor_match",
                 "rule_logic": {
                     "field_1": "form_factor",
                     "field_2": "form_factor",
-                    "operator": "compatible"
+                    "operator": "compatible",
+                    "issue_type": "form_factor_mismatch"
                 },
                 "description": "Motherboard form factor must fit in case"
             }
         ]
         
-        for rule_data in rules:
-            rule = CompatibilityRule(**rule_data)
-            db.add(rule)
+        # One executemany INSERT; plain rows need no unit-of-work bookkeeping
+        db.execute(insert(CompatibilityRule), rules)
         
         db.commit()
-        logger.info(f"Seeded {len(rules)} compatibility rules")
+        logger.info("rules_seeded", count=len(rules))
         
     except Exception as e:
-        logger.error(f"Error seeding compatibility rules: {str(e)}")
+        logger.error("seed_rules_failed", error=str(e))
         db.rollback()
     finally:
         db.close()
@@ -90,7 +99,7 @@ def seed_compatibility_rules():
 
 def seed_sample_components():
     """Seed sample components for testing."""
-    logger.info("Seeding sample components...")
+    logger.info("seeding_components")
     
     db = SessionLocal()
     
@@ -170,24 +179,48 @@ def seed_sample_components():
             }
         ]
         
-        for comp_data in sample_components:
-            component = Component(**comp_data)
-            db.add(component)
+        score_fields = ("gaming_score", "productivity_score", "ai_score")
+        score_rows = [
+            {field: comp_data.pop(field) for field in score_fields}
+            for comp_data in sample_components
+        ]
+        
+        # Bulk INSERT of the components, then of their scores keyed on the
+        # returned ids, which come back in parameter order
+        component_ids = db.scalars(
+            insert(Component).returning(Component.id, sort_by_parameter_order=True),
+            sample_components
+        ).all()
+        db.execute(insert(ComponentScore), [
+            {"component_id": component_id, **score_row}
+            for component_id, score_row in zip(component_ids, score_rows)
+        ])
         
         db.commit()
-        logger.info(f"Seeded {len(sample_components)} sample components")
+        logger.info("components_seeded", count=len(sample_components))
         
     except Exception as e:
-        logger.error(f"Error seeding sample components: {str(e)}")
+        logger.error("seed_components_failed", error=str(e))
         db.rollback()
     finally:
         db.close()
 
 
+def refresh_views():
+    """Refresh materialized views so seeded components are visible to the agent."""
+    logger.info("refreshing_views")
+    with engine.begin() as conn:
+        # Fresh statistics first, so the refresh and the first agent queries plan against the seeded rows
+        conn.execute(text("ANALYZE components, component_scores"))
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW {RECOMMENDABLE_COMPONENTS_VIEW}"))
+    logger.info("views_refreshed")
+
+
 if __name__ == "__main__":
-    logger.info("Starting database initialization...")
+    logger.info("init_db_started")
     create_tables()
     seed_compatibility_rules()
     seed_sample_components()
-    logger.info("Database initialization completed!")
+    refresh_views()
+    logger.info("init_db_completed")
 
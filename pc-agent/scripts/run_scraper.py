@@ -6,14 +6,20 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import argparse
+from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
 from app.scrapers.ouedkniss_scraper import OuedknissScraper
 from app.db.database import SessionLocal
-from app.db.models import Component, ComponentType, Condition
+from app.tasks.scraper_tasks import save_scraped_components
 import structlog
 
 logger = structlog.get_logger()
 
 
+# Stateless, so one instance serves every category of the run
+_SCRAPER = OuedknissScraper()
+
+
 def scrape_and_save(component_type: str, max_pages: int = 5, wilaya: str = None):
     """
     Scrape components and save to database.
@@ -23,67 +29,44 @@ def scrape_and_save(component_type: str, max_pages: int = 5, wilaya: str = None)
         max_pages: Maximum number of pages to scrape
         wilaya: Filter by wilaya (optional)
     """
-    logger.info(f"Starting scrape for {component_type}, max_pages={max_pages}")
-    
-    scraper = OuedknissScraper()
-    db = SessionLocal()
+    logger.info("scrape_started", component_type=component_type, max_pages=max_pages)
     
     try:
         # Scrape components
-        components_data = scraper.scrape_category(
+        components_data = _SCRAPER.scrape_category(
             component_type=component_type,
             max_pages=max_pages,
             wilaya=wilaya
         )
+    except Exception as e:
+        logger.error("scrape_failed", component_type=component_type, error=str(e))
+        return 0, 0
+    
+    return save_components(component_type, components_data)
+
+
+def save_components(component_type: str, components_data: List[Dict[str, Any]]):
+    """
+    Save scraped components to database.
+    
+    Args:
+        component_type: Type of the scraped components
+        components_data: Listings returned by the scraper
+    """
+    logger.info("scraped_components", component_type=component_type, count=len(components_data))
+    
+    db = SessionLocal()
+    
+    try:
+        # Same batched upsert as the scheduled task: one statement per batch
+        # instead of a lookup and a commit per listing
+        saved_count, updated_count = save_scraped_components(db, components_data)
         
-        logger.info(f"Scraped {len(components_data)} components")
-        
-        saved_count = 0
-        updated_count = 0
-        
-        for comp_data in components_data:
-            try:
-                # Check if component already exists
-                existing = db.query(Component).filter(
-                    Component.name == comp_data["name"],
-                    Component.source_url == comp_data.get("source_url")
-                ).first()
-                
-                if existing:
-                    # Update existing component
-                    existing.price_dzd = comp_data["price_dzd"]
-                    existing.in_stock = True
-                    existing.last_scraped_at = db.func.now()
-                    updated_count += 1
-                else:
-                    # Create new component
-                    component = Component(
-                        component_type=ComponentType(comp_data["component_type"]),
-                        name=comp_data["name"],
-                        price_dzd=comp_data["price_dzd"],
-                        original_price=comp_data.get("original_price"),
-                        condition=Condition(comp_data.get("condition", "new")),
-                        in_stock=True,
-                        source_url=comp_data.get("source_url"),
-                        source_platform=comp_data.get("source_platform", "ouedkniss"),
-                        seller_location=comp_data.get("seller_location"),
-                        last_scraped_at=db.func.now()
-                    )
-                    db.add(component)
-                    saved_count += 1
-                
-                db.commit()
-                
-            except Exception as e:
-                logger.error(f"Error saving component: {str(e)}")
-                db.rollback()
-                continue
-        
-        logger.info(f"Saved {saved_count} new components, updated {updated_count} existing")
+        logger.info("saved", component_type=component_type, new=saved_count, updated=updated_count)
         return saved_count, updated_count
         
     except Exception as e:
-        logger.error(f"Error in scrape_and_save: {str(e)}")
+        logger.error("save_failed", component_type=component_type, error=str(e))
         return 0, 0
     finally:
         db.close()
@@ -109,6 +92,12 @@ def main():
         default=None,
         help="Filter by wilaya (optional)"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Categories saved at once with 'all' (default: 8)"
+    )
     
     args = parser.parse_args()
     
@@ -117,15 +106,31 @@ def main():
         total_saved = 0
         total_updated = 0
         
-        for comp_type in component_types:
-            saved, updated = scrape_and_save(comp_type, args.pages, args.wilaya)
-            total_saved += saved
-            total_updated += updated
+        logger.info("scrape_started", component_type="all", max_pages=args.pages)
+        
+        # Every category is fetched over one client, so the run reuses a single
+        # connection pool instead of opening one per category
+        try:
+            scraped = _SCRAPER.scrape_categories(component_types, args.pages, args.wilaya)
+        except Exception as e:
+            logger.error("scrape_failed", component_type="all", error=str(e))
+            scraped = {}
+        
+        # Saves are independent; each save_components call opens its own
+        # session, so threads share nothing
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            results = executor.map(
+                lambda comp_type: save_components(comp_type, scraped.get(comp_type, [])),
+                component_types
+            )
+            for saved, updated in results:
+                total_saved += saved
+                total_updated += updated
         
-        logger.info(f"Total: {total_saved} saved, {total_updated} updated")
+        logger.info("scrape_all_completed", new=total_saved, updated=total_updated)
     else:
         saved, updated = scrape_and_save(args.component_type, args.pages, args.wilaya)
-        logger.info(f"Results: {saved} saved, {updated} updated")
+        logger.info("scrape_completed", new=saved, updated=updated)
 
 
 if __name__ == "__main__":